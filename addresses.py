@@ -1,22 +1,92 @@
-from pathlib import Path
-
-
-class Tile_dir:
-    def __init__(self, game) -> None:
-        """
-        Initialize the Tile_dir class with paths for various resources like sprites
-        and the tile map JSON.
-        """
-        self.Base_Dir = game.settings.BASE_DIR
-
-        # Paths for different tile images
-        self.simple_tiles = (
-            self.Base_Dir / "sprites" / "sprites" / "tilesets" / "decor_8x8.png"
-        )
-        self.wooden_floor = (
-            self.Base_Dir / "sprites" / "sprites" / "tilesets" / "floors" / "wooden.png"
-        )
-        self.grass = self.Base_Dir / "sprites" / "2" / "Texture" / "grass.png"
-
-        # Path to the tile map JSON file
-        self.tile_map = self.Base_Dir / "data" / "tile_map.json"
+from pathlib import Path
+
+
+class Tile_dir:
+    def __init__(self, game) -> None:
+        """
+        Initialize the Tile_dir class with paths for various resources like sprites
+        and the tile map JSON.
+        """
+        self.Base_Dir = game.settings.BASE_DIR
+
+        # Paths for different tile images
+        self.simple_tiles = (
+            self.Base_Dir / "sprites" / "sprites" / "tilesets" / "decor_8x8.png"
+        )
+        self.wooden_floor = (
+            self.Base_Dir / "sprites" / "sprites" / "tilesets" / "floors" / "wooden.png"
+        )
+        self.grass = self.Base_Dir / "sprites" / "2" / "Texture" / "grass.png"
+
+        # Paths for Sprout Lands tiles and animal sprite sheets
+        self.sprout_lands = (
+            self.Base_Dir / "sprites" / "Sprout Lands - Sprites - Basic pack"
+        )
+        self.water = self.sprout_lands / "Tilesets" / "Water.png"
+        self.tilled_dirt = self.sprout_lands / "Tilesets" / "Tilled_Dirt.png"
+        self.plants = self.sprout_lands / "Objects" / "Basic_Plants.png"
+        self.cow = self.sprout_lands / "Characters" / "Free Cow Sprites.png"
+        self.chicken = self.sprout_lands / "Characters" / "Free Chicken Sprites.png"
+
+        # Sheets loaded on demand by the asset manager (see assets.py):
+        # name -> (path, grid (columns, rows), groups the sheet belongs to).
+        # Only paths are built here, nothing is read until a sheet is used.
+        hana = self.Base_Dir / "sprites" / "Hana Caraka - Topdown Tileset [sample]"
+        ground, props = hana / "Tileset", hana / "Props"
+        objects = self.sprout_lands / "Objects"
+        building = self.sprout_lands / "Tilesets"
+        tilesets = self.Base_Dir / "sprites" / "sprites" / "tilesets"
+        particles = self.Base_Dir / "sprites" / "sprites" / "particles"
+        green = ("spring", "summer")
+        growing = ("spring", "summer", "fall")
+        seasons = ("spring", "summer", "fall", "winter")
+        self.sheets = {
+            # Seasonal ground tiles
+            "spring": (ground / "Spring - simplified.png", (5, 3), ("spring",)),
+            "summer": (ground / "Summer - simplified.png", (5, 3), ("summer",)),
+            "fall": (ground / "Fall - simplified.png", (5, 3), ("fall",)),
+            "winter": (ground / "Winter - simplified.png", (5, 3), ("winter",)),
+            "dirt": (ground / "Dirt - simplified.png", (5, 4), growing),
+            "tufts": (ground / "Tufts and Lumps.png", (6, 4), green),
+            # Props
+            "trees": (props / "Tree.png", (4, 1), growing),
+            "bushes": (props / "Bush.png", (2, 1), growing),
+            "flowers": (props / "Flower.png", (6, 4), green),
+            "tall_grass": (props / "Grass.png", (6, 3), green),
+            "rocks": (props / "Stone and Rock.png", (12, 2), ("props",)),
+            "water_plants": (props / "Water Plants.png", (6, 2), ("props",)),
+            "props": (props / "Props-All.png", (15, 12), ("props",)),
+            "biome": (objects / "Basic_Grass_Biom_things.png", (9, 5), ("props",)),
+            "water_decor": (tilesets / "water_decorations.png", (6, 2), ("props",)),
+            "water_lilies": (tilesets / "water_lillies.png", (6, 1), ("props",)),
+            "decor_small": (tilesets / "decor_8x8.png", (4, 4), growing),
+            "decor": (tilesets / "decor_16x16.png", (4, 5), growing),
+            # Buildings and furniture
+            "furniture": (objects / "Basic_Furniture.png", (9, 6), ("house",)),
+            "house_walls": (
+                building / "Wooden_House_Walls_Tilset.png",
+                (5, 3),
+                ("house",),
+            ),
+            "house_roof": (
+                building / "Wooden_House_Roof_Tilset.png",
+                (7, 5),
+                ("house",),
+            ),
+            "doors": (building / "Doors.png", (1, 4), ("house",)),
+            "walls": (tilesets / "walls" / "walls.png", (8, 8), ("house",)),
+            "carpet": (tilesets / "floors" / "carpet.png", (6, 8), ("house",)),
+            "flooring": (tilesets / "floors" / "flooring.png", (5, 3), ("house",)),
+            # Farm
+            "fences": (building / "Fences.png", (4, 4), ("farm",)),
+            "paths": (objects / "Paths.png", (4, 4), ("farm",)),
+            "hills": (building / "Hills.png", (11, 7), ("farm",)),
+            "bridge": (objects / "Wood_Bridge.png", (5, 3), ("farm",)),
+            "chicken_house": (objects / "Free_Chicken_House.png", (1, 1), ("farm",)),
+            # Particle effects (see particles.py)
+            "dust": (particles / "dust_particles_01.png", (4, 1), seasons),
+        }
+
+        # Paths to the tile map files (the binary map is used when it exists)
+        self.tile_map = self.Base_Dir / "data" / "tile_map.json"
+        self.tile_map_bin = self.Base_Dir / "data" / "tile_map.bin"
@@ -0,0 +1,81 @@
+import numpy as np
+
+from animation import Animation
+from entities import FEET_OFFSET, KEEP_FLIP, WANDER
+
+
+class Animals:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Animals class that registers the animal kinds in the
+        entity store and spawns them.
+        """
+        self.game = game
+        self.entities = game.entities
+        tiles = game.tile_directory
+        scale = game.settings.asset_scale
+        formats = game.surface_formats
+
+        # --- Animal Kinds ---
+        # Both sheets face right: idle frames on row 0, walking frames on row 1
+        self.cow = self.entities.add_kind(
+            Animation(
+                tiles.cow,
+                (3, 2),
+                (32, 32),
+                scale=scale,
+                cache=game.sprite_cache,
+                formats=formats,
+            ),
+            idle_rows=(0, 0, 0, 0),
+            walk_rows=(1, 1, 1, 1),
+            flips=(KEEP_FLIP, KEEP_FLIP, 1, 0),
+            frame_delay=200,
+            speed=game.settings.cow_speed,
+            row_lengths=(3, 2),
+        )
+        self.chicken = self.entities.add_kind(
+            Animation(
+                tiles.chicken,
+                (4, 2),
+                (16, 16),
+                scale=scale,
+                cache=game.sprite_cache,
+                formats=formats,
+            ),
+            idle_rows=(0, 0, 0, 0),
+            walk_rows=(1, 1, 1, 1),
+            flips=(KEEP_FLIP, KEEP_FLIP, 1, 0),
+            frame_delay=150,
+            speed=game.settings.chicken_speed,
+            row_lengths=(2, 4),
+        )
+
+    def spawn(self, count, tile_map, attempts=10):
+        """
+        Spawns count animals (a mix of cows and chickens) at random places
+        on the map, away from solid tiles such as water.
+
+        :param tile_map: Tile_Map to spawn on.
+        :param attempts: How many times to re-roll spots that land on solid tiles.
+        """
+        random = self.entities.random
+        kinds = random.choice([self.cow, self.chicken], count)
+        size = self.entities.sizes[kinds]
+        width = np.maximum(tile_map.pixel_width - size[:, 0], 0)
+        height = np.maximum(tile_map.pixel_height - size[:, 1], 0)
+
+        position = np.zeros((count, 2), dtype=np.float32)
+        pending = np.arange(count)
+        for _ in range(attempts):
+            position[pending, 0] = random.uniform(0, width[pending])
+            position[pending, 1] = random.uniform(0, height[pending])
+            feet = position[pending] + size[pending] * FEET_OFFSET
+            pending = pending[tile_map.is_solid_at(feet[:, 0], feet[:, 1])]
+            if not len(pending):
+                break
+
+        # Animals that never found a free spot are not spawned
+        placed = np.setdiff1d(np.arange(count), pending)
+        for kind, (x, y) in zip(kinds[placed].tolist(), position[placed].tolist()):
+            self.entities.spawn(kind, x, y, WANDER)
@@ -1,45 +1,118 @@
-import pygame
-
-
-class Animation:
-    def __init__(self, sheet, grid, size=None) -> None:
-        """
-        Initializes the Animation class to extract frames from a sprite sheet.
-
-        :param sheet: Path to the sprite sheet image.
-        :param grid: Tuple (columns, rows) representing the grid structure of the sprite sheet.
-        :param size: Optional size of each sprite frame. If not provided, it is inferred from the sheet's size.
-        """
-        self.sheet = pygame.image.load(str(sheet)).convert_alpha()
-
-        # If no specific size is given, calculate it based on the grid size
-        if size is None:
-            self.columns, self.rows = grid
-            self.width = self.sheet.get_width() // self.columns
-            self.height = self.sheet.get_height() // self.rows
-        else:
-            self.width, self.height = size
-            self.columns, self.rows = grid
-
-        self.frames = []
-        self.extract_frames()
-
-    def extract_frames(self):
-        """
-        Extracts frames from the sprite sheet based on the grid structure and stores them in self.frames.
-        """
-        for row in range(self.rows):
-            frame_row = []
-            for column in range(self.columns):
-                frame = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                frame.blit(
-                    self.sheet,
-                    (0, 0),
-                    (column * self.width, row * self.height, self.width, self.height),
-                )
-                frame.set_colorkey((0, 0, 0))  # Assuming black (0,0,0) is transparent
-                frame = pygame.transform.scale_by(
-                    frame, 2
-                )  # Scaling the frame for better display
-                frame_row.append(frame)
-            self.frames.append(frame_row)
+import pygame
+from surface_cache import SurfaceCache
+from surface_format import SurfaceFormats, tint_surface
+
+
+class Animation:
+    def __init__(
+        self,
+        sheet,
+        grid,
+        size=None,
+        scale=2,
+        cache=None,
+        variant_budget=4 * 1024 * 1024,
+        formats=None,
+    ) -> None:
+        """
+        Initializes the Animation class to extract frames from a sprite sheet.
+
+        :param sheet: Path to the sprite sheet image.
+        :param grid: Tuple (columns, rows) representing the grid structure of the sprite sheet.
+        :param size: Optional size of each sprite frame. If not provided, it is inferred from the sheet's size.
+        :param scale: Factor every frame is scaled by after slicing.
+        :param cache: Optional SpriteCache holding frames baked on an earlier launch.
+        :param variant_budget: Max bytes of flipped/scaled/tinted frames kept around.
+        :param formats: Optional SurfaceFormats counting the formats of the frames.
+        """
+        self.columns, self.rows = grid
+        self.scale = scale
+        self.frames = []
+
+        # Flipped, scaled and tinted frames are made once and then reused
+        self.variants = SurfaceCache(variant_budget)
+
+        # Reuse the frames baked on an earlier launch when possible
+        baked = cache.load(sheet, grid, size, scale) if cache is not None else None
+        if baked is not None:
+            self.sheet = None
+            if size is None:
+                self.width = baked[0].get_width() // scale
+                self.height = baked[0].get_height() // scale
+            else:
+                self.width, self.height = size
+            frames = baked
+        else:
+            self.sheet = pygame.image.load(str(sheet)).convert_alpha()
+
+            # If no specific size is given, calculate it based on the grid size
+            if size is None:
+                self.width = self.sheet.get_width() // self.columns
+                self.height = self.sheet.get_height() // self.rows
+            else:
+                self.width, self.height = size
+
+            self.extract_frames()
+            frames = [frame for row in self.frames for frame in row]
+            if cache is not None:
+                cache.store(sheet, grid, size, scale, frames)
+
+        # Frames without see-through edges become RLE colorkey surfaces
+        frames = (formats or SurfaceFormats()).optimize(sheet, frames)
+        self.frames = [
+            frames[row * self.columns : (row + 1) * self.columns]
+            for row in range(self.rows)
+        ]
+
+    def extract_frames(self):
+        """
+        Extracts frames from the sprite sheet based on the grid structure and stores them in self.frames.
+        """
+        for row in range(self.rows):
+            frame_row = []
+            for column in range(self.columns):
+                frame = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+                frame.blit(
+                    self.sheet,
+                    (0, 0),
+                    (column * self.width, row * self.height, self.width, self.height),
+                )
+                frame = pygame.transform.scale_by(
+                    frame, self.scale
+                )  # Scaling the frame for better display
+                frame_row.append(frame)
+            self.frames.append(frame_row)
+
+    def get_frame(self, row, frame, flip=False, scale=1, tint=None):
+        """
+        Returns a frame, creating a flipped, scaled or tinted variant of it on
+        first use. Variants are cached so drawing never transforms surfaces.
+
+        :param row: Row of the frame in the sprite sheet.
+        :param frame: Column of the frame in the sprite sheet.
+        :param flip: Whether to flip the frame horizontally.
+        :param scale: Extra scale factor on top of the sheet's own scale.
+        :param tint: Optional (r, g, b) color the frame is multiplied by.
+        """
+        if not flip and scale == 1 and tint is None:
+            return self.frames[row][frame]
+
+        key = (row, frame, flip, scale, tint)
+        variant = self.variants.get(key)
+        if variant is None:
+            variant = self.variants.put(
+                key, self.make_variant(self.frames[row][frame], flip, scale, tint)
+            )
+        return variant
+
+    def make_variant(self, frame, flip, scale, tint):
+        """
+        Builds a transformed copy of a frame.
+        """
+        if flip:
+            frame = pygame.transform.flip(frame, True, False)
+        if scale != 1:
+            frame = pygame.transform.scale_by(frame, scale)
+        if tint is not None:
+            frame = tint_surface(frame, tint)
+        return frame
@@ -0,0 +1,170 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pygame
+
+from surface_cache import SurfaceCache
+
+# --- Placeholder ---
+PLACEHOLDER_COLORS = ((90, 90, 90), (120, 120, 120))  # Checkerboard squares
+PLACEHOLDER_SQUARES = 4  # Squares per side
+
+logger = logging.getLogger(__name__)
+
+
+def decode_sheet(path, scale):
+    """
+    Reads and scales a sheet. Runs on a loader thread, so it must not touch
+    the display (converting to the screen format happens on the game thread).
+    """
+    sheet = pygame.image.load(str(path))
+    return pygame.transform.scale_by(sheet, scale)
+
+
+class AssetManager:
+    def __init__(self, game) -> None:
+        """
+        Initializes the AssetManager class that loads the sheets declared in
+        Tile_dir.sheets on first use (or ahead of time, by group) instead of at
+        startup. Files are decoded on a pool of loader threads; until a sheet
+        is ready its frames are drawn as placeholders. Sheets that were not used
+        for a while are unloaded to stay within a memory budget.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.declarations = game.tile_directory.sheets
+        self.scale = self.settings.asset_scale
+        self.formats = game.surface_formats
+
+        # --- Loading ---
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.settings.asset_workers, thread_name_prefix="assets"
+        )
+        self.loading = {}  # Sheet name -> Future of the decoded surface
+        self.listeners = []  # Functions called with the name of every ready sheet
+        # Sheet name -> why it could not be loaded; its frames stay placeholders
+        self.failed = {}
+
+        # --- Loaded Sheets ---
+        # The cache holds the converted frames of every sheet (or, without a
+        # display, the sheet surface its frames share), so the budget counts
+        # every byte exactly once
+        self.sheets = SurfaceCache(self.settings.asset_budget, on_evict=self.unload)
+        self.frames = {}  # Sheet name -> list of frame surfaces in row order
+
+        # --- Placeholder ---
+        size = self.settings.TILE_SIZE
+        square = size // PLACEHOLDER_SQUARES
+        self.placeholder = pygame.Surface((size, size))
+        for row in range(PLACEHOLDER_SQUARES):
+            for column in range(PLACEHOLDER_SQUARES):
+                color = PLACEHOLDER_COLORS[(row + column) % 2]
+                self.placeholder.fill(
+                    color, (column * square, row * square, square, square)
+                )
+
+    # --- Requests ---
+    def request(self, name):
+        """
+        Starts loading a sheet in the background unless it is loaded or loading.
+        """
+        if name in self.frames or name in self.loading or name in self.failed:
+            return
+        path, _, _ = self.declarations[name]
+        self.loading[name] = self.pool.submit(decode_sheet, path, self.scale)
+
+    def preload(self, group):
+        """
+        Starts loading every sheet of a group (a season, region, etc.).
+        """
+        for name, (_, _, groups) in self.declarations.items():
+            if group in groups:
+                self.request(name)
+
+    def is_ready(self, name):
+        return name in self.frames
+
+    # --- Access ---
+    def get_frames(self, name):
+        """
+        Returns the frames of a sheet, or None while it is still loading (the
+        load is started if needed).
+        """
+        frames = self.frames.get(name)
+        if frames is None:
+            self.request(name)
+            return None
+
+        self.sheets.get(name)  # Mark the sheet as recently used
+        return frames
+
+    def get_frame(self, name, index):
+        """
+        Returns one frame of a sheet, or the placeholder while it is loading.
+        """
+        frames = self.get_frames(name)
+        if frames is None:
+            return self.placeholder
+        return frames[index]
+
+    # --- Updates ---
+    def update(self):
+        """
+        Finishes the sheets the loader threads have decoded. Called once per
+        frame on the game thread.
+        """
+        done = [name for name, future in self.loading.items() if future.done()]
+        for name in done:
+            try:
+                sheet = self.loading.pop(name).result()
+                if pygame.display.get_surface() is not None:
+                    sheet = sheet.convert_alpha()
+                self.add_sheet(name, sheet)
+            except Exception as error:
+                # A missing or corrupt file must not stop the game
+                logger.error("Could not load sheet %r: %s", name, error)
+                self.failed[name] = error
+                continue
+            for listener in self.listeners:
+                listener(name)
+
+    def add_sheet(self, name, sheet):
+        """
+        Slices a decoded sheet into frames and puts it in the cache. With a
+        display, every frame is converted to its cheapest format (which
+        copies it); without one the frames share the pixels of the sheet.
+        """
+        _, (columns, rows), _ = self.declarations[name]
+        width, height = sheet.get_width() // columns, sheet.get_height() // rows
+        frames = [
+            sheet.subsurface((column * width, row * height, width, height))
+            for row in range(rows)
+            for column in range(columns)
+        ]
+        if pygame.display.get_surface() is None:
+            self.sheets.put(name, sheet)
+        else:
+            frames = self.formats.optimize(name, frames)
+            size = sum(map(SurfaceCache.surface_bytes, frames))
+            self.sheets.put(name, frames, size)
+        self.frames[name] = frames
+
+    def unload(self, name):
+        """
+        Drops the frames of a sheet the cache evicted. Using it again reloads it.
+        """
+        self.frames.pop(name, None)
+
+    def wait(self):
+        """
+        Blocks until every requested sheet is loaded.
+        """
+        while self.loading:
+            wait(list(self.loading.values()))
+            self.update()
+
+    def shutdown(self):
+        """
+        Stops the loader threads, dropping loads that have not started.
+        """
+        self.pool.shutdown(wait=False, cancel_futures=True)
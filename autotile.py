@@ -0,0 +1,329 @@
+import numpy as np
+
+# --- Neighbour Bits ---
+# Bit of every neighbour in an 8-neighbour mask, clockwise from north,
+# with the (x, y) offset of that neighbour
+N, NE, E, SE, S, SW, W, NW = (1 << bit for bit in range(8))
+NEIGHBOURS = (
+    (N, 0, -1),
+    (NE, 1, -1),
+    (E, 1, 0),
+    (SE, 1, 1),
+    (S, 0, 1),
+    (SW, -1, 1),
+    (W, -1, 0),
+    (NW, -1, -1),
+)
+# A corner only connects when both edges next to it do: (corner, edge, edge)
+CORNERS = ((NE, N, E), (SE, S, E), (SW, S, W), (NW, N, W))
+
+# --- Blob Layout ---
+# (column, row) of the tile drawn for each of the 47 reduced masks in the blob
+# tilesets of the Sprout Lands pack (Grass, Hills, Tilled_Dirt), which all
+# follow the 11 x 5 layout of "Bitmask references 1.png"
+BLOB_COLUMNS = 11
+BLOB_LAYOUT = {
+    0: (3, 3),
+    N: (3, 2),
+    E: (0, 3),
+    N | E: (4, 3),
+    N | NE | E: (0, 2),
+    S: (3, 0),
+    N | S: (3, 1),
+    E | S: (4, 0),
+    N | E | S: (4, 4),
+    N | NE | E | S: (4, 1),
+    E | SE | S: (0, 0),
+    N | E | SE | S: (4, 2),
+    N | NE | E | SE | S: (0, 1),
+    W: (2, 3),
+    N | W: (7, 3),
+    E | W: (1, 3),
+    N | E | W: (8, 3),
+    N | NE | E | W: (6, 3),
+    S | W: (7, 0),
+    N | S | W: (7, 4),
+    E | S | W: (8, 0),
+    N | E | S | W: (8, 4),
+    N | NE | E | S | W: (9, 3),
+    E | SE | S | W: (6, 0),
+    N | E | SE | S | W: (9, 2),
+    N | NE | E | SE | S | W: (6, 4),
+    S | SW | W: (2, 0),
+    N | S | SW | W: (7, 2),
+    E | S | SW | W: (5, 0),
+    N | E | S | SW | W: (10, 2),
+    N | NE | E | S | SW | W: (9, 1),
+    E | SE | S | SW | W: (1, 0),
+    N | E | SE | S | SW | W: (8, 2),
+    N | NE | E | SE | S | SW | W: (6, 2),
+    N | W | NW: (2, 2),
+    N | E | W | NW: (5, 3),
+    N | NE | E | W | NW: (1, 2),
+    N | S | W | NW: (7, 1),
+    N | E | S | W | NW: (10, 3),
+    N | NE | E | S | W | NW: (8, 1),
+    N | E | SE | S | W | NW: (9, 0),
+    N | NE | E | SE | S | W | NW: (6, 1),
+    N | S | SW | W | NW: (2, 1),
+    N | E | S | SW | W | NW: (5, 4),
+    N | NE | E | S | SW | W | NW: (5, 1),
+    N | E | SE | S | SW | W | NW: (5, 2),
+    0xFF: (1, 1),
+}
+
+
+def reduce_mask(mask):
+    """
+    Clears the corner bits whose two neighbouring edges are not both set,
+    leaving one of the 47 masks a blob tileset has a tile for.
+    """
+    for corner, first, second in CORNERS:
+        if mask & corner and not (mask & first and mask & second):
+            mask &= ~corner
+    return mask
+
+
+def build_lookup(layout=BLOB_LAYOUT, columns=BLOB_COLUMNS):
+    """
+    Builds the table mapping every raw 8-bit mask to a tile index of the sheet.
+    """
+    lookup = np.zeros(256, dtype=np.int16)
+    for mask in range(256):
+        column, row = layout[reduce_mask(mask)]
+        lookup[mask] = row * columns + column
+    return lookup
+
+
+def compute_masks(terrain):
+    """
+    Returns the 8-neighbour mask of every cell of a boolean terrain grid in one
+    vectorized pass. Cells outside the grid count as not connected.
+    """
+    height, width = terrain.shape
+    padded = np.pad(terrain, 1)
+    masks = np.zeros((height, width), dtype=np.uint8)
+    for bit, dx, dy in NEIGHBOURS:
+        neighbour = padded[1 + dy : 1 + dy + height, 1 + dx : 1 + dx + width]
+        masks |= neighbour.astype(np.uint8) * np.uint8(bit)
+    return masks
+
+
+def get_mask(rows, x, y):
+    """
+    Returns the 8-neighbour mask of one cell of a terrain given as nested lists.
+    """
+    height, width = len(rows), len(rows[0])
+    mask = 0
+    for bit, dx, dy in NEIGHBOURS:
+        neighbour_x, neighbour_y = x + dx, y + dy
+        if (
+            0 <= neighbour_x < width
+            and 0 <= neighbour_y < height
+            and rows[neighbour_y][neighbour_x]
+        ):
+            mask |= bit
+    return mask
+
+
+class AutotileLayer:
+    def __init__(self, lookup=None, chunk_size=16) -> None:
+        """
+        Initializes the AutotileLayer class that picks the visual tile of every
+        cell of a terrain (tilled soil, water...) from its 8 neighbours.
+
+        The terrain is kept per chunk and only chunks holding some of it are
+        stored, so a huge map with a few plots costs a few small arrays.
+
+        :param lookup: Mask to tile index table, see build_lookup.
+        :param chunk_size: Width and height of a stored chunk in cells.
+        """
+        self.lookup = build_lookup() if lookup is None else lookup
+        self.lookup_list = self.lookup.tolist()  # Faster for single lookups
+        self.chunk_size = chunk_size
+        self.width = self.height = 0  # Size of the grid in cells
+        # (chunk_x, chunk_y) -> which cells of the chunk have the terrain
+        self.terrain = {}
+        # (chunk_x, chunk_y) -> tile index of every cell of the chunk, -1 for none
+        self.tiles = {}
+
+    def load(self, cells, width, height):
+        """
+        Sets the whole terrain and computes the tiles of every chunk holding
+        some of it.
+
+        :param cells: Iterable of the (x, y) cells that have the terrain.
+        :param width: Width of the grid in cells.
+        :param height: Height of the grid in cells.
+        """
+        self.width, self.height = width, height
+        self.terrain, self.tiles = {}, {}
+        size = self.chunk_size
+        for x, y in cells:
+            if 0 <= x < width and 0 <= y < height:
+                chunk = self.terrain.get((x // size, y // size))
+                if chunk is None:
+                    chunk = self.terrain[x // size, y // size] = np.zeros(
+                        (size, size), dtype=bool
+                    )
+                chunk[y % size, x % size] = True
+
+        for chunk_x, chunk_y in list(self.terrain):
+            left, top = chunk_x * size, chunk_y * size
+            self.recompute(left, top, left + size - 1, top + size - 1)
+
+    # --- Chunk Access ---
+    def get_fill(self, chunks):
+        """
+        Returns (value of the cells of missing chunks, dtype) of the terrain
+        or tile chunks.
+        """
+        return (False, bool) if chunks is self.terrain else (-1, np.int16)
+
+    def get_region(self, chunks, left, top, right, bottom):
+        """
+        Copies a rectangle of cells (right and bottom exclusive) out of the
+        terrain or tile chunks. Cells of missing chunks get the fill value.
+        """
+        fill, dtype = self.get_fill(chunks)
+        region = np.full((bottom - top, right - left), fill, dtype=dtype)
+        size = self.chunk_size
+        for chunk_y in range(top // size, (bottom - 1) // size + 1):
+            for chunk_x in range(left // size, (right - 1) // size + 1):
+                chunk = chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    continue
+                first_x, first_y = chunk_x * size, chunk_y * size
+                from_x, from_y = max(left, first_x), max(top, first_y)
+                to_x = min(right, first_x + size)
+                to_y = min(bottom, first_y + size)
+                region[from_y - top : to_y - top, from_x - left : to_x - left] = chunk[
+                    from_y - first_y : to_y - first_y, from_x - first_x : to_x - first_x
+                ]
+        return region
+
+    def put_region(self, chunks, left, top, region):
+        """
+        Writes a rectangle of cells into the terrain or tile chunks, creating
+        the chunks that get something other than the fill value.
+        """
+        fill, dtype = self.get_fill(chunks)
+        size = self.chunk_size
+        bottom, right = top + region.shape[0], left + region.shape[1]
+        for chunk_y in range(top // size, (bottom - 1) // size + 1):
+            for chunk_x in range(left // size, (right - 1) // size + 1):
+                first_x, first_y = chunk_x * size, chunk_y * size
+                from_x, from_y = max(left, first_x), max(top, first_y)
+                to_x = min(right, first_x + size)
+                to_y = min(bottom, first_y + size)
+                part = region[from_y - top : to_y - top, from_x - left : to_x - left]
+                chunk = chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    if (part == fill).all():
+                        continue
+                    chunk = chunks[chunk_x, chunk_y] = np.full(
+                        (size, size), fill, dtype=dtype
+                    )
+                chunk[
+                    from_y - first_y : to_y - first_y, from_x - first_x : to_x - first_x
+                ] = part
+
+    def prune(self, left, top, right, bottom):
+        """
+        Drops the chunks of a rectangle of cells (inclusive) that no longer
+        hold any of the terrain.
+        """
+        size = self.chunk_size
+        for chunk_y in range(top // size, bottom // size + 1):
+            for chunk_x in range(left // size, right // size + 1):
+                chunk = self.terrain.get((chunk_x, chunk_y))
+                if chunk is not None and not chunk.any():
+                    del self.terrain[chunk_x, chunk_y]
+                    self.tiles.pop((chunk_x, chunk_y), None)
+
+    def get_tile(self, x, y):
+        """
+        Returns the tile index of one cell, -1 if it does not have the terrain.
+        """
+        size = self.chunk_size
+        chunk = self.tiles.get((x // size, y // size))
+        return -1 if chunk is None else int(chunk[y % size, x % size])
+
+    # --- Edits ---
+    def set(self, x, y, value):
+        """
+        Adds or removes the terrain on one cell.
+
+        :return: List of (x, y) cells whose tile changed.
+        """
+        self.put_region(self.terrain, x, y, np.full((1, 1), value))
+
+        # Nine cells are too few for NumPy to pay off: copy the 5x5 window
+        # their masks depend on into lists and work on those
+        top, left = max(y - 2, 0), max(x - 2, 0)
+        window = self.get_region(
+            self.terrain,
+            left,
+            top,
+            min(x + 3, self.width),
+            min(y + 3, self.height),
+        ).tolist()
+
+        changed = []
+        for cell_y in range(max(y - 1, 0), min(y + 2, self.height)):
+            for cell_x in range(max(x - 1, 0), min(x + 2, self.width)):
+                tile = -1
+                if window[cell_y - top][cell_x - left]:
+                    mask = get_mask(window, cell_x - left, cell_y - top)
+                    tile = self.lookup_list[mask]
+                if self.get_tile(cell_x, cell_y) != tile:
+                    self.put_region(self.tiles, cell_x, cell_y, np.full((1, 1), tile))
+                    changed.append((cell_x, cell_y))
+        if not value:
+            self.prune(x, y, x, y)
+        return changed
+
+    def set_area(self, left, top, right, bottom, value):
+        """
+        Adds or removes the terrain on a rectangle of cells (inclusive).
+
+        :return: List of (x, y) cells whose tile changed.
+        """
+        area = np.full((bottom - top + 1, right - left + 1), value)
+        self.put_region(self.terrain, left, top, area)
+        changed = self.recompute(left, top, right, bottom)
+        if not value:
+            self.prune(left, top, right, bottom)
+        return changed
+
+    def recompute(self, left, top, right, bottom):
+        """
+        Recomputes the tiles of an edited rectangle of cells (inclusive) and of
+        the ring of cells around it, the only ones whose masks can change.
+
+        :return: List of (x, y) cells whose tile changed.
+        """
+        left, top = max(left - 1, 0), max(top - 1, 0)
+        right, bottom = min(right + 2, self.width), min(bottom + 2, self.height)
+
+        # Include one more ring of terrain so the masks of the border are right
+        outer_left, outer_top = max(left - 1, 0), max(top - 1, 0)
+        outer = self.get_region(
+            self.terrain,
+            outer_left,
+            outer_top,
+            min(right + 1, self.width),
+            min(bottom + 1, self.height),
+        )
+        masks = compute_masks(outer)[
+            top - outer_top : bottom - outer_top, left - outer_left : right - outer_left
+        ]
+        terrain = outer[
+            top - outer_top : bottom - outer_top, left - outer_left : right - outer_left
+        ]
+        tiles = np.where(terrain, self.lookup[masks], -1).astype(np.int16)
+
+        old = self.get_region(self.tiles, left, top, right, bottom)
+        changed = np.argwhere(tiles != old)
+        self.put_region(self.tiles, left, top, tiles)
+        return [(int(x) + left, int(y) + top) for y, x in changed]
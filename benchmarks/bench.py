@@ -0,0 +1,424 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Run without a display; must be set before pygame opens a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import numpy as np
+import pygame
+
+from animation import Animation
+from coop import CoopServer
+from entities import FEET_OFFSET
+from main import StardewValley2
+from map_generator import MapGenerator
+from settings import Settings
+from tile_system import GROUND, OVERHEAD, PROPS, SOLID, TileSet
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Keys held by the scripted player, each for a number of frames
+PLAYER_SCRIPT = [
+    (pygame.K_d, 90),
+    (pygame.K_s, 90),
+    (pygame.K_a, 90),
+    (pygame.K_w, 90),
+]
+
+
+# --- Helpers ---
+def percentile(samples, percent):
+    """
+    Returns the given percentile of a list of samples (nearest rank).
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Turns a list of durations in seconds into millisecond statistics.
+    """
+    total = sum(samples)
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.mean(samples) * 1000,
+        "per_second": len(samples) / total if total else 0.0,
+    }
+
+
+def time_calls(function, repeat):
+    """
+    Calls function repeat times and returns the duration of every call.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def random_map(width, height, seed=1):
+    """
+    Builds a random tile map with the same tile range as data/tile_map.json.
+    """
+    generator = random.Random(seed)
+    return [[generator.randint(0, 15) for _ in range(width)] for _ in range(height)]
+
+
+def village_map(width, height, seed=1):
+    """
+    Builds a dense village: generated land with thick woods, plus a grid of
+    houses with roofs over them and trees lining the streets between.
+    """
+    generator = MapGenerator(seed, water_level=0, forest_level=0.3, tree_density=0.6)
+    layers = generator.generate_chunk(0, 0, width, height)
+    layers[OVERHEAD] = np.zeros_like(layers[GROUND])
+    for top in range(4, height - 6, 10):
+        for left in range(4, width - 8, 12):
+            layers[PROPS][top : top + 4, left : left + 6] = 0
+            layers[OVERHEAD][top : top + 3, left : left + 6] = 9  # Roof
+            layers[PROPS][top + 5, left : left + 6 : 2] = 1  # Trees by the street
+    return layers
+
+
+# --- Benchmarks ---
+def bench_tileset(game, repeat):
+    return summarize(
+        time_calls(lambda: TileSet(game.tile_directory.grass, (7, 7)), repeat)
+    )
+
+
+def bench_animation(game, repeat):
+    return summarize(
+        time_calls(
+            lambda: Animation(game.player.player_sheet_path, (6, 9), (48, 48)), repeat
+        )
+    )
+
+
+def bench_tile_screen(game, size, repeat):
+    tile_map = random_map(size, size)
+    return summarize(time_calls(lambda: game.BG.create_tile_screen(tile_map), repeat))
+
+
+def bench_frames(game, frames, tile_map=None):
+    """
+    Runs full game frames while a scripted player walks around in a loop.
+    """
+    if tile_map is not None:
+        game.BG.load_map(tile_map)
+        game.camera.set_world_size(game.BG.pixel_width, game.BG.pixel_height)
+    game.player.x = game.player.y = 0
+    game.settings.fps = 0  # Do not let clock.tick() cap the frame rate
+
+    # Expand the script into the key to hold on every frame
+    keys = [key for key, length in PLAYER_SCRIPT for _ in range(length)]
+
+    samples = []
+    held = None
+    for frame in range(frames):
+        key = keys[frame % len(keys)]
+        if key != held:
+            if held is not None:
+                pygame.event.post(pygame.event.Event(pygame.KEYUP, key=held))
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+            held = key
+
+        start = time.perf_counter()
+        game.run_frame()
+        samples.append(time.perf_counter() - start)
+
+    pygame.event.post(pygame.event.Event(pygame.KEYUP, key=held))
+    game.handle_events()
+    return summarize(samples)
+
+
+def bench_tile_edits(game, repeat, cells=64):
+    """
+    Paints cells scattered over the screen and bakes them into the cached
+    chunks, like one frame of painting tiles (compare with tile_screen_*,
+    which rebuilds everything).
+    """
+    tile_map = game.BG
+    view = game.camera.get_rect()
+    generator = np.random.default_rng(1)
+    game.BG.draw_tile_screen(game)  # Cache the chunks on screen
+
+    def paint():
+        tile_map.set_tiles(
+            generator.integers(view.left, view.right, cells) // tile_map.size,
+            generator.integers(view.top, view.bottom, cells) // tile_map.size,
+            generator.integers(0, 16, cells),
+        )
+        tile_map.flush_edits()
+
+    return summarize(time_calls(paint, repeat))
+
+
+def bench_farm_edits(game, repeat, cells=16):
+    """
+    Works a row of plots in front of the player (tilling, planting and
+    watering them) and bakes the plots into the cached chunks.
+    """
+    farm = game.farm
+    tile_x, tile_y = game.player.get_facing_tile()
+    game.BG.draw_tile_screen(game)  # Cache the chunks on screen
+
+    def work():
+        for column in range(tile_x, tile_x + cells):
+            farm.use(column, tile_y)
+            farm.water(column, tile_y)
+        game.BG.flush_edits()
+
+    return summarize(time_calls(work, repeat))
+
+
+def bench_pathfinding(game, steps, tile_map):
+    """
+    Sends a few hundred animals across a map: most of them to one goal along
+    a shared flow field, the rest along their own A* routes. Times the
+    pathfinder for every simulation step, searches included.
+    """
+    game.BG.load_map(tile_map)
+    entities = game.entities
+    pathfinder = game.pathfinder
+    generator = np.random.default_rng(1)
+
+    # Start everyone (and every route goal) where the shared goal can be reached
+    free = np.argwhere((game.BG.attributes & SOLID) == 0)
+    center = free[
+        np.argmin(((free - np.array(tile_map[GROUND].shape) // 2) ** 2).sum(1))
+    ]
+    goal = (int(center[1]), int(center[0]))
+    field = pathfinder.get_flow_field(goal)
+    while field is None:
+        pathfinder.run_searches()
+        field = pathfinder.get_flow_field(goal)
+    reachable = np.argwhere(field.distance >= 0) + field.area[1::-1]
+
+    first = entities.count
+    game.animals.spawn(300, game.BG)
+    ids = np.arange(first, entities.count)
+    cells = reachable[generator.integers(len(reachable), size=len(ids))]
+    feet = (cells[:, ::-1] + 0.5) * game.BG.size
+    entities.position[ids] = feet - entities.sizes[entities.kind[ids]] * FEET_OFFSET
+    entities.previous_position[ids] = entities.position[ids]
+
+    pathfinder.gather(ids[20:], goal)
+    for entity in ids[:20].tolist():
+        row, column = reachable[generator.integers(len(reachable))]
+        pathfinder.move_to(entity, (int(column), int(row)))
+
+    samples = []
+    for _ in range(steps):
+        start = time.perf_counter()
+        pathfinder.update()
+        samples.append(time.perf_counter() - start)
+        entities.update(game.settings.sim_step_ms, game.BG)
+    pathfinder.release(ids)
+    return summarize(samples)
+
+
+def bench_rain(game, steps, drops=20_000):
+    """
+    Lets it rain and times a simulation step of the particles plus drawing
+    every visible raindrop (the budget is lifted, so the work stays the same).
+    """
+    particles = game.particles
+    renderer = game.renderer
+    settings = game.settings
+    time_limit = settings.particle_time_ms
+    settings.particle_time_ms = float("inf")
+    particles.set_rain(drops)
+    view = game.camera.get_rect()
+
+    def step():
+        particles.update(game.sim_time)
+        particles.draw(renderer, view)
+        renderer.draw_effects()
+        renderer.effects = []
+
+    for _ in range(60):  # Until the first drops land
+        step()
+    samples = time_calls(step, steps)
+    particles.set_rain(0)
+    settings.particle_time_ms = time_limit
+    return summarize(samples)
+
+
+class NullTransport:
+    def sendto(self, data, address):
+        """
+        Drops a datagram; the server counts the bytes it sends itself.
+        """
+
+
+def bench_coop(game, steps, tile_map, players=8):
+    """
+    Runs a co-op server for scripted clients without a network: they walk a
+    new way every second and ack every snapshot right away. Times every
+    simulation step, snapshots included, and reports their size.
+    """
+    game.BG.load_map(tile_map)
+    server = CoopServer(game)
+    server.transport = NullTransport()
+    peers = [server.join() for _ in range(players)]
+    generator = np.random.default_rng(1)
+    directions = np.zeros(players, dtype=np.int64)
+    keys = (2, 1, 4, 8)  # Held keys of every entity direction (see player.py)
+
+    def step(number):
+        if number % game.settings.sim_rate == 0:
+            directions[:] = generator.integers(0, 4, players)
+        for peer, direction in zip(peers, directions.tolist()):
+            peer.address = ("bench", 0)
+            peer.received += 1
+            peer.inputs.append((peer.received, keys[direction], direction, 0))
+        server.simulate()
+        for peer in peers:
+            peer.acked = server.snapshot
+
+    samples = []
+    for number in range(steps):
+        start = time.perf_counter()
+        step(number)
+        samples.append(time.perf_counter() - start)
+    for peer in peers:
+        server.leave(peer)
+
+    results = summarize(samples)
+    results["bytes_per_snapshot"] = server.bytes_sent / max(server.snapshots_sent, 1)
+    return results
+
+
+def run_benchmarks(frames, repeat):
+    """
+    Runs every benchmark and returns a dictionary of results by name.
+    """
+    game = StardewValley2()
+    results = {
+        "tileset_grass": bench_tileset(game, repeat),
+        "animation_player": bench_animation(game, repeat),
+    }
+    for size in (25, 64, 128):
+        results[f"tile_screen_{size}x{size}"] = bench_tile_screen(game, size, repeat)
+
+    results["frames_default_map"] = bench_frames(game, frames)
+    results["frames_512x512_map"] = bench_frames(game, frames, random_map(512, 512))
+    results["frames_village_map"] = bench_frames(game, frames, village_map(128, 128))
+    results["tile_edits_64_cells"] = bench_tile_edits(game, repeat)
+    results["pathfinding_village_map"] = bench_pathfinding(
+        game, frames, village_map(128, 128)
+    )
+    results["rain_20000_drops"] = bench_rain(game, frames)
+    # The same players on a map 16 times bigger cost the same
+    results["coop_8_players_village"] = bench_coop(game, frames, village_map(128, 128))
+    results["coop_8_players_512x512"] = bench_coop(game, frames, random_map(512, 512))
+
+    # Edits right after a first launch, with every sheet sliced at load
+    settings = Settings()
+    settings.use_sprite_cache = False
+    cold = StardewValley2(settings)
+    results["tile_edits_cold_cache"] = bench_tile_edits(cold, repeat)
+    results["farm_edits_cold_cache"] = bench_farm_edits(cold, repeat)
+
+    # The same walk, drawn at the art's resolution and scaled up once a frame
+    settings = Settings()
+    settings.set_render_scale(2)
+    native = StardewValley2(settings)
+    results["frames_village_map_native"] = bench_frames(
+        native, frames, village_map(128, 128)
+    )
+    return results
+
+
+# --- Baseline Comparison ---
+def get_name_width(results):
+    """
+    Returns the width of the name column: the longest benchmark name.
+    """
+    return max(map(len, ["benchmark", *results]))
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints how every p50/p95 changed against the baseline.
+
+    :return: List of (benchmark, metric) pairs that got slower than the tolerance.
+    """
+    regressions = []
+    width = get_name_width(results)
+    for name, stats in results.items():
+        if name not in baseline:
+            print(f"{name:{width}} (new, no baseline)")
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            old, new = baseline[name][metric], stats[metric]
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > tolerance:
+                regressions.append((name, metric))
+                flag = "  <-- REGRESSION"
+            print(
+                f"{name:{width}} {metric:7} {old:9.3f} -> {new:9.3f} ms ({change:+7.1%}){flag}"
+            )
+    return regressions
+
+
+def print_results(results):
+    width = get_name_width(results)
+    print(
+        f"{'benchmark':{width}} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per sec':>10}"
+    )
+    for name, stats in results.items():
+        print(
+            f"{name:{width}} {stats['p50_ms']:9.3f} {stats['p95_ms']:9.3f} "
+            f"{stats['p99_ms']:9.3f} {stats['per_second']:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Headless benchmarks for the rendering and asset pipelines."
+    )
+    parser.add_argument("--frames", type=int, default=600, help="Frames per run")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeats per asset test")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15, help="Allowed slowdown (0.15 = 15%%)"
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.frames, args.repeat)
+    print_results(results)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"\nBaseline saved to {args.baseline}")
+    elif args.baseline.exists():
+        print("\nCompared to baseline:")
+        regressions = compare(
+            results, json.loads(args.baseline.read_text()), args.tolerance
+        )
+        if regressions:
+            sys.exit(1)
+    else:
+        print("\nNo baseline found, run with --save-baseline to create one.")
@@ -0,0 +1,50 @@
+import pygame
+
+
+class Camera:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Camera class that maps world coordinates to the screen.
+        """
+        # Viewport size in pixels
+        self.width, self.height = game.settings.get_render_size()
+        self.x = self.y = 0  # Top-left corner of the viewport in world pixels
+
+        # Size of the world the camera is allowed to look at
+        self.world_width = self.width
+        self.world_height = self.height
+
+    def set_world_size(self, width, height):
+        """
+        Sets the size of the world in pixels so the camera can stay inside it.
+        """
+        self.world_width, self.world_height = width, height
+        self.clamp()
+
+    def follow(self, x, y):
+        """
+        Centers the viewport on a world position (usually the player).
+        """
+        self.x = int(x) - self.width // 2
+        self.y = int(y) - self.height // 2
+        self.clamp()
+
+    def clamp(self):
+        """
+        Keeps the viewport inside the world. Worlds smaller than the screen
+        are pinned to the top-left corner.
+        """
+        self.x = max(0, min(self.x, self.world_width - self.width))
+        self.y = max(0, min(self.y, self.world_height - self.height))
+
+    def apply(self, x, y):
+        """
+        Converts a world position into a screen position.
+        """
+        return x - self.x, y - self.y
+
+    def get_rect(self):
+        """
+        Returns the viewport as a rect in world coordinates.
+        """
+        return pygame.Rect(self.x, self.y, self.width, self.height)
@@ -0,0 +1,774 @@
+import asyncio
+import json
+import secrets
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque
+from itertools import islice
+
+import numpy as np
+import pygame
+
+from entities import CONTROLLED
+from farming import PLOT_DTYPE
+from map_format import TILE_DTYPE
+from player import (
+    DIRECTION_KEYS,
+    DOWN_KEY,
+    LEFT_KEY,
+    RIGHT_KEY,
+    UP_KEY,
+    USE,
+    WATER,
+    Player,
+)
+
+# --- Protocol ---
+# Players join over TCP: the client sends a hello line and the server answers
+# with a welcome line (both JSON). The session lasts as long as that
+# connection. Everything sent every step travels as UDP datagrams to the same
+# port number:
+#   INPUT    - client to server: header, then the client's last few inputs
+#              (repeated until the server applied them, so a lost datagram
+#              loses nothing) as records of input step, keys, direction and
+#              actions (see Player.get_input)
+#   SNAPSHOT - server to client: header, then the entity records that differ
+#              from the snapshot the client acked, the ids of the entities
+#              that left the client's area, and the edited chunks of the area
+#              the client lacks (zlib-compressed ground tiles and plots)
+# Only what is around a client's player is sent to it, so the size of a
+# snapshot does not grow with the world.
+VERSION = 1
+INPUT, SNAPSHOT = range(2)
+INPUT_HEADER = struct.Struct("<BHIIB")  # Type, client, token, acked snapshot, inputs
+INPUT_RECORD = struct.Struct("<IBBB")
+# Bits of the keys and actions of an input that mean something (see Player)
+KEY_BITS = UP_KEY | DOWN_KEY | LEFT_KEY | RIGHT_KEY
+ACTION_BITS = USE | WATER
+# Type, snapshot, baseline snapshot (0 = none), last input applied, simulation
+# time, changed entities, removed entities, chunks
+SNAPSHOT_HEADER = struct.Struct("<BIIIdHHH")
+# Chunk x and y, revision, height and width in tiles, plots, compressed bytes
+CHUNK_HEADER = struct.Struct("<iiIHHHI")
+ID_DTYPE = np.dtype("<u4")
+
+# One record per entity of a snapshot. Animation frames are not sent: clients
+# animate the entities themselves from their velocity and direction.
+ENTITY_RECORD = np.dtype(
+    [
+        ("id", ID_DTYPE),
+        ("kind", "<i2"),
+        ("direction", "i1"),
+        ("flip", "?"),
+        ("position", "<f4", (2,)),
+        ("velocity", "<f4", (2,)),
+    ]
+)
+RECORD_FIELDS = ("kind", "direction", "flip", "position", "velocity")
+EMPTY_TABLE = np.zeros(0, dtype=ENTITY_RECORD)
+
+INPUT_REPEATS = 8  # Inputs in every INPUT datagram
+SNAPSHOT_HISTORY = 32  # Snapshots kept to decode deltas against
+INPUT_HISTORY = 256  # Most inputs a client keeps waiting for the server
+
+# Far outside every map: entities without a player here are never in anyone's
+# area (players who left, entities a client does not see)
+PARKED = -(1 << 19)
+
+
+# --- Entity Tables ---
+def get_entity_table(store, ids):
+    """
+    Returns the snapshot records of entities, ordered by id.
+    """
+    ids = np.sort(ids)
+    table = np.empty(len(ids), dtype=ENTITY_RECORD)
+    table["id"] = ids
+    for name in RECORD_FIELDS:
+        table[name] = getattr(store, name)[ids]
+    return table
+
+
+def diff_tables(baseline, table):
+    """
+    Returns what changed from one entity table to another.
+
+    :return: Tuple (records of table that baseline lacks or holds differently,
+             ids of the entities of baseline missing from table).
+    """
+    if not len(baseline):
+        return table, baseline["id"]
+
+    # Records are compared as raw bytes, much faster than field by field
+    index = np.minimum(np.searchsorted(baseline["id"], table["id"]), len(baseline) - 1)
+    width = ENTITY_RECORD.itemsize
+    old = baseline[index].view(np.uint8).reshape(-1, width)
+    same = (old == table.view(np.uint8).reshape(-1, width)).all(axis=1)
+    kept = np.zeros(len(baseline), dtype=bool)
+    kept[index[baseline["id"][index] == table["id"]]] = True
+    return table[~same], baseline["id"][~kept]
+
+
+def patch_table(baseline, changed, removed):
+    """
+    Applies what diff_tables returned to the baseline table.
+    """
+    replaced = np.isin(baseline["id"], np.concatenate([changed["id"], removed]))
+    table = np.concatenate([baseline[~replaced], changed])
+    return table[np.argsort(table["id"], kind="stable")]
+
+
+# --- Chunks ---
+def pack_chunk(key, revision, tiles, plots):
+    """
+    Packs the ground tiles and plots of a chunk (see Farm.get_chunk_state).
+    """
+    tiles = np.asarray(tiles, dtype=TILE_DTYPE)
+    data = zlib.compress(tiles.tobytes() + plots.tobytes())
+    height, width = tiles.shape
+    header = CHUNK_HEADER.pack(*key, revision, height, width, len(plots), len(data))
+    return header + data
+
+
+def unpack_chunk(data, offset):
+    """
+    Unpacks a chunk written by pack_chunk.
+
+    :return: Tuple ((key, revision, tiles, plots), offset after the chunk).
+    """
+    chunk_x, chunk_y, revision, height, width, plots, size = CHUNK_HEADER.unpack_from(
+        data, offset
+    )
+    offset += CHUNK_HEADER.size
+    raw = zlib.decompress(data[offset : offset + size])
+    tiles = np.frombuffer(raw, TILE_DTYPE, height * width).reshape(height, width)
+    plots = np.frombuffer(raw, PLOT_DTYPE, plots, height * width * TILE_DTYPE.itemsize)
+    return ((chunk_x, chunk_y), revision, tiles, plots), offset + size
+
+
+class Snapshot:
+    __slots__ = ("number", "last_input", "sim_time", "entities", "chunks")
+
+    def __init__(self, number, last_input, sim_time, entities, chunks) -> None:
+        """
+        Initializes the Snapshot class holding a snapshot as a client rebuilt it.
+        """
+        self.number = number
+        self.last_input = last_input  # Last input step the server applied
+        self.sim_time = sim_time  # Simulation time of the server
+        self.entities = entities  # Entity table of everything around the player
+        self.chunks = chunks  # (key, revision, tiles, plots) of sent chunks
+
+
+# --- Server ---
+class Peer:
+    __slots__ = (
+        "client",
+        "token",
+        "player",
+        "address",
+        "inputs",
+        "received",
+        "last_input",
+        "sent",
+        "acked",
+    )
+
+    def __init__(self, client, token, player) -> None:
+        """
+        Initializes the Peer class holding what a server knows of a client.
+        """
+        self.client = client  # Id the client puts in its datagrams
+        self.token = token  # Secret proving that a datagram comes from it
+        self.player = player
+        self.address = None  # UDP address, known from the first input
+        self.inputs = deque()  # (step, keys, direction, actions) not applied yet
+        self.received = 0  # Last input step queued
+        self.last_input = 0  # Last input step applied
+        # Snapshot -> (entity table, {chunk: revision}) the client has after it
+        self.sent = OrderedDict()
+        self.acked = 0  # Last snapshot the client rebuilt
+
+
+class CoopServer(asyncio.DatagramProtocol):
+    def __init__(self, game) -> None:
+        """
+        Initializes the CoopServer class that runs a game authoritatively for
+        up to coop_max_players clients. Every client steers a player with its
+        inputs and gets a snapshot of the world around that player every
+        coop_snapshot_interval steps. The server does not render; its own
+        player is parked and handed to the first client that joins.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.peers = {}  # Client id -> Peer
+        self.next_client = 1
+        self.snapshot = 0  # Number of the last snapshot sent
+        self.transport = None  # UDP endpoint
+        self.packed_chunks = {}  # Chunk -> (revision, pack_chunk bytes)
+
+        # Every player entity (of a loaded save too) waits for a client
+        store = game.entities
+        self.free_players = [game.player]
+        for entity in np.flatnonzero(store.kind[: store.count] == game.player.kind):
+            if entity != game.player.entity:
+                self.free_players.append(
+                    Player(game, template=game.player, entity=int(entity))
+                )
+        for player in self.free_players:
+            self.park(player)
+
+        # --- Statistics ---
+        self.step_times = deque(maxlen=game.settings.sim_rate)  # Seconds
+        self.bytes_sent = 0
+        self.snapshots_sent = 0
+
+    # --- Sessions ---
+    def park(self, player):
+        """
+        Stops a player and moves it out of the world.
+        """
+        player.up = player.down = player.left = player.right = False
+        player.actions = 0
+        player.x = player.y = PARKED
+        self.game.entities.velocity[player.entity] = 0
+
+    def join(self):
+        """
+        Adds a client and gives it a player at the start of the map.
+
+        :return: The client's Peer, or None if the server is full.
+        """
+        if len(self.peers) >= self.settings.coop_max_players:
+            return None
+        if self.free_players:
+            player = self.free_players.pop()
+        else:
+            player = Player(self.game, template=self.game.player)
+        player.x = player.y = 0
+
+        peer = Peer(self.next_client, secrets.randbits(32), player)
+        self.peers[peer.client] = peer
+        self.next_client += 1
+        return peer
+
+    def leave(self, peer):
+        """
+        Removes a client; its player waits for the next one.
+        """
+        del self.peers[peer.client]
+        self.park(peer.player)
+        self.free_players.append(peer.player)
+
+    async def handle_session(self, reader, writer):
+        """
+        Runs the TCP session of a client: the handshake, then waiting for the
+        client to disconnect.
+        """
+        try:
+            hello = json.loads(await reader.readline())
+        except (ValueError, ConnectionError):
+            hello = None
+        peer = None
+        if not isinstance(hello, dict) or hello.get("version") != VERSION:
+            reply = {"error": f"The server speaks version {VERSION} of the protocol"}
+        else:
+            peer = self.join()
+            reply = {"error": "The server is full"}
+        if peer is not None:
+            reply = {
+                "client": peer.client,
+                "token": peer.token,
+                "entity": peer.player.entity,
+                "tile_size": self.game.BG.size,
+                "sim_rate": self.settings.sim_rate,
+                "sim_time": self.game.sim_time,
+            }
+
+        writer.write((json.dumps(reply) + "\n").encode())
+        try:
+            await writer.drain()
+            while peer is not None and await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            if peer is not None:
+                self.leave(peer)
+            writer.close()
+
+    def datagram_received(self, data, address):
+        """
+        Queues the new inputs of a client and notes the snapshot it acked.
+        Inputs with a direction the player does not have are dropped.
+        """
+        if len(data) < INPUT_HEADER.size:
+            return
+        kind, client, token, acked, count = INPUT_HEADER.unpack_from(data)
+        peer = self.peers.get(client)
+        if kind != INPUT or peer is None or token != peer.token:
+            return
+        end = INPUT_HEADER.size + count * INPUT_RECORD.size
+        if len(data) < end:
+            return
+
+        peer.address = address
+        if acked > peer.acked and acked in peer.sent:
+            peer.acked = acked
+        records = INPUT_RECORD.iter_unpack(data[INPUT_HEADER.size : end])
+        for step, keys, direction, actions in records:
+            if step > peer.received and direction in DIRECTION_KEYS:
+                peer.inputs.append(
+                    (step, keys & KEY_BITS, direction, actions & ACTION_BITS)
+                )
+                peer.received = step
+
+    # --- Simulation ---
+    def apply_input(self, peer):
+        """
+        Steers the player of a client with its next input. Without one the
+        player keeps doing what it did.
+        """
+        inputs = peer.inputs
+        player = peer.player
+
+        # A client running ahead of the server would lag further behind with
+        # every step: drop its oldest inputs, but not their farming actions
+        actions = 0
+        while len(inputs) > self.settings.coop_input_buffer:
+            actions |= inputs.popleft()[3]
+        if inputs:
+            step, keys, direction, step_actions = inputs.popleft()
+            player.set_input(keys, direction, actions | step_actions)
+            peer.last_input = step
+        else:
+            player.actions = actions
+
+        player.check_idle()
+        player.update_player_pos()
+        player.use_tools()
+
+    def simulate(self):
+        """
+        Advances the world by one fixed timestep and sends snapshots when due.
+        """
+        start = time.perf_counter()
+        game = self.game
+        for peer in self.peers.values():
+            self.apply_input(peer)
+        game.update_entities()
+        game.farm.update(game.sim_time)
+
+        game.sim_time += self.settings.sim_step_ms
+        game.sim_steps += 1
+        game.save_system.update(game.sim_time)
+
+        if game.sim_steps % self.settings.coop_snapshot_interval == 0:
+            self.send_snapshots()
+        self.step_times.append(time.perf_counter() - start)
+
+    # --- Snapshots ---
+    def get_area(self, player):
+        """
+        Returns the chunks a client sees: the chunk holding its player and
+        coop_interest_chunks chunks around it.
+
+        :return: Tuple (area as a rect in world coordinates, chunk keys).
+        """
+        tile_map = self.game.BG
+        size = tile_map.chunk_size
+        radius = self.settings.coop_interest_chunks
+        chunks_x = -(-tile_map.map_width // tile_map.chunk_tiles)
+        chunks_y = -(-tile_map.map_height // tile_map.chunk_tiles)
+        center_x, center_y = player.get_center()
+        chunk_x, chunk_y = int(center_x // size), int(center_y // size)
+        columns = range(max(chunk_x - radius, 0), min(chunk_x + radius + 1, chunks_x))
+        rows = range(max(chunk_y - radius, 0), min(chunk_y + radius + 1, chunks_y))
+
+        area = pygame.Rect(
+            columns.start * size,
+            rows.start * size,
+            len(columns) * size,
+            len(rows) * size,
+        )
+        return area, [(x, y) for y in rows for x in columns]
+
+    def get_packed_chunk(self, key, revision):
+        """
+        Returns a chunk packed by pack_chunk, packing it once per revision.
+        """
+        packed = self.packed_chunks.get(key)
+        if packed is None or packed[0] != revision:
+            tile_map = self.game.BG
+            size = tile_map.chunk_tiles
+            tiles = tile_map.tile_map[
+                key[1] * size : (key[1] + 1) * size, key[0] * size : (key[0] + 1) * size
+            ]
+            plots = self.game.farm.get_chunk_state(key)
+            packed = (revision, pack_chunk(key, revision, tiles, plots))
+            self.packed_chunks[key] = packed
+        return packed[1]
+
+    def pack_snapshot(self, peer):
+        """
+        Packs the next snapshot of a client as a delta against the last one it
+        acked (a full snapshot if it acked none still kept), and records it.
+        """
+        area, keys = self.get_area(peer.player)
+        store = self.game.entities
+        table = get_entity_table(store, store.query(area))
+
+        baseline = peer.acked if peer.acked in peer.sent else 0
+        base_table, base_revisions = peer.sent.get(baseline, (EMPTY_TABLE, {}))
+        changed, removed = diff_tables(base_table, table)
+
+        # Edited chunks the client lacks, a few per snapshot; the rest follow
+        # in the next ones. Chunks never edited come from the map file.
+        revisions = {}
+        chunks = []
+        chunk_revisions = self.game.BG.chunk_revisions
+        for key in keys:
+            revision = chunk_revisions.get(key)
+            if revision is None:
+                continue
+            if base_revisions.get(key) == revision:
+                revisions[key] = revision
+            elif len(chunks) < self.settings.coop_chunks_per_snapshot:
+                chunks.append(self.get_packed_chunk(key, revision))
+                revisions[key] = revision
+
+        peer.sent[self.snapshot] = (table, revisions)
+        while len(peer.sent) > SNAPSHOT_HISTORY:
+            peer.sent.popitem(last=False)
+
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT,
+            self.snapshot,
+            baseline,
+            peer.last_input,
+            self.game.sim_time,
+            len(changed),
+            len(removed),
+            len(chunks),
+        )
+        return b"".join(
+            [header, changed.tobytes(), removed.astype(ID_DTYPE).tobytes(), *chunks]
+        )
+
+    def send_snapshots(self):
+        """
+        Sends every client that sent an input its next snapshot.
+        """
+        self.snapshot += 1
+        for peer in self.peers.values():
+            if peer.address is None:
+                continue
+            data = self.pack_snapshot(peer)
+            self.transport.sendto(data, peer.address)
+            self.bytes_sent += len(data)
+            self.snapshots_sent += 1
+
+    # --- Running ---
+    async def run(self, host=None, port=None):
+        """
+        Serves clients and runs the simulation at sim_rate steps per second.
+        """
+        host = host or self.settings.coop_host
+        port = port or self.settings.coop_port
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle_session, host, port)
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, local_addr=(host, port)
+        )
+
+        step = self.settings.sim_step_ms / 1000
+        next_step = loop.time()
+        async with server:
+            while True:
+                steps = 0
+                while loop.time() >= next_step:
+                    self.simulate()
+                    next_step += step
+                    steps += 1
+                    # Drop the time a slow machine cannot catch up on
+                    if steps == self.settings.max_sim_steps:
+                        next_step = loop.time()
+                        break
+                await asyncio.sleep(max(next_step - loop.time(), 0))
+
+    def get_report(self):
+        """
+        Returns a line of statistics since the last report: players, time
+        per simulation step and the size of the snapshots.
+        """
+        times = np.array(self.step_times) * 1000
+        size = self.bytes_sent / max(self.snapshots_sent, 1)
+        line = (
+            f"{len(self.peers)} players, step {times.mean() if len(times) else 0:.2f} "
+            f"ms (max {times.max(initial=0):.2f}), {self.snapshots_sent} snapshots "
+            f"of {size:.0f} bytes on average"
+        )
+        self.bytes_sent = self.snapshots_sent = 0
+        return line
+
+
+# --- Client ---
+class CoopConnection(asyncio.DatagramProtocol):
+    def __init__(self) -> None:
+        """
+        Initializes the CoopConnection class, the client end of the protocol:
+        it joins a server, sends inputs and rebuilds the snapshots from their
+        deltas. on_snapshot is called with every new snapshot.
+        """
+        self.welcome = None  # Welcome message of the server
+        self.reader = self.writer = None  # TCP session
+        self.transport = None  # UDP endpoint
+        self.connected = False
+
+        self.step = 0  # Last input step sent
+        self.inputs = deque(maxlen=INPUT_HISTORY)  # Inputs not applied yet
+        self.tables = OrderedDict()  # Snapshot -> its rebuilt entity table
+        self.last_snapshot = 0  # Number of the newest snapshot rebuilt
+
+        # --- Statistics ---
+        self.bytes_received = 0
+        self.snapshots_received = 0
+
+    async def connect(self, host, port):
+        """
+        Joins a server.
+
+        :return: The welcome message (client id, player entity, tile size...).
+        """
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write((json.dumps({"version": VERSION}) + "\n").encode())
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        welcome = json.loads(line)
+        if "error" in welcome:
+            raise ConnectionError(welcome["error"])
+
+        self.welcome = welcome
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: self, remote_addr=(host, port)
+        )
+        self.connected = True
+        loop.create_task(self.watch_session())
+        return welcome
+
+    async def watch_session(self):
+        """
+        Waits for the server to end the session.
+        """
+        try:
+            while await self.reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        self.connected = False
+
+    def close(self):
+        """
+        Leaves the server.
+        """
+        if self.transport is not None:
+            self.transport.close()
+        if self.writer is not None:
+            self.writer.close()
+        self.connected = False
+
+    def send_input(self, keys, direction, actions):
+        """
+        Sends the input of the next step (see Player.get_input), along with
+        the inputs before it that the server did not apply yet.
+        """
+        self.step += 1
+        self.inputs.append((self.step, keys, direction, actions))
+        start = max(len(self.inputs) - INPUT_REPEATS, 0)
+        recent = list(islice(self.inputs, start, None))
+        header = INPUT_HEADER.pack(
+            INPUT,
+            self.welcome["client"],
+            self.welcome["token"],
+            self.last_snapshot,
+            len(recent),
+        )
+        records = b"".join(INPUT_RECORD.pack(*record) for record in recent)
+        self.transport.sendto(header + records)
+
+    def datagram_received(self, data, address):
+        """
+        Rebuilds a snapshot from its delta. Snapshots older than the newest
+        one, or against a baseline that is no longer kept, are dropped.
+        """
+        if len(data) < SNAPSHOT_HEADER.size:
+            return
+        (
+            kind,
+            number,
+            baseline,
+            last_input,
+            sim_time,
+            changed,
+            removed,
+            chunks,
+        ) = SNAPSHOT_HEADER.unpack_from(data)
+        if kind != SNAPSHOT or number <= self.last_snapshot:
+            return
+        if baseline and baseline not in self.tables:
+            return
+        self.bytes_received += len(data)
+        self.snapshots_received += 1
+
+        offset = SNAPSHOT_HEADER.size
+        records = np.frombuffer(data, ENTITY_RECORD, changed, offset)
+        offset += records.nbytes
+        ids = np.frombuffer(data, ID_DTYPE, removed, offset)
+        offset += ids.nbytes
+        sent_chunks = []
+        for _ in range(chunks):
+            chunk, offset = unpack_chunk(data, offset)
+            sent_chunks.append(chunk)
+
+        table = patch_table(self.tables.get(baseline, EMPTY_TABLE), records, ids)
+        self.tables[number] = table
+        while len(self.tables) > SNAPSHOT_HISTORY:
+            self.tables.popitem(last=False)
+        self.last_snapshot = number
+
+        while self.inputs and self.inputs[0][0] <= last_input:
+            self.inputs.popleft()
+        self.on_snapshot(Snapshot(number, last_input, sim_time, table, sent_chunks))
+
+    def on_snapshot(self, snapshot):
+        """
+        Called with every new snapshot.
+        """
+
+
+class CoopClient(CoopConnection):
+    def __init__(self, game) -> None:
+        """
+        Initializes the CoopClient class that plays a game on a server. The
+        server runs the world: the client draws the snapshots it sends,
+        moving the other entities on with their last velocity in between.
+        The local player is predicted: it walks on every input right away and
+        every snapshot puts it where the server has it, then applies the
+        inputs the server had not got to yet again.
+        """
+        super().__init__()
+        self.game = game
+        self.visible = np.zeros(0, dtype=np.int64)  # Entities of the last snapshot
+        self.scale = 1.0  # Client world pixels per server world pixel
+        game.coop = self
+
+    async def connect(self, host, port):
+        welcome = await super().connect(host, port)
+        game = self.game
+        store = game.entities
+        self.scale = game.BG.size / welcome["tile_size"]
+
+        # Every entity belongs to the server: hide the local ones until the
+        # snapshots place them
+        count = store.count
+        store.position[:count] = store.previous_position[:count] = PARKED
+        store.velocity[:count] = 0
+        store.behaviour[:count] = CONTROLLED
+        store.spatial_dirty = True
+        game.pathfinder.clear()
+        self.reserve(welcome["entity"])
+        game.player.entity = welcome["entity"]
+        game.sim_time = welcome["sim_time"]
+        return welcome
+
+    def reserve(self, entity):
+        """
+        Makes sure that the entity store has a slot for an entity id.
+        """
+        store = self.game.entities
+        while store.count <= entity:
+            store.spawn(0, PARKED, PARKED, CONTROLLED)
+
+    def on_snapshot(self, snapshot):
+        """
+        Puts the entities and chunks of a snapshot into the game.
+        """
+        game = self.game
+        store = game.entities
+        table = snapshot.entities
+        ids = table["id"].astype(np.int64)
+        if len(ids):
+            self.reserve(ids[-1])
+
+        # Hide what left the area around the player
+        left = np.setdiff1d(self.visible, ids, assume_unique=True)
+        store.position[left] = store.previous_position[left] = PARKED
+        store.velocity[left] = 0
+        entered = np.setdiff1d(ids, self.visible, assume_unique=True)
+        self.visible = ids
+
+        others = ids != game.player.entity
+        records = table[others]
+        ids = ids[others]
+        store.kind[ids] = records["kind"]
+        store.direction[ids] = records["direction"]
+        store.flip[ids] = records["flip"]
+        store.position[ids] = records["position"] * self.scale
+        store.velocity[ids] = records["velocity"] * self.scale
+        store.behaviour[ids] = CONTROLLED
+        own = table[~others]
+        if len(own):
+            self.reconcile(own[0])
+        # Whatever just came into the area appears where it is
+        store.previous_position[entered] = store.position[entered]
+        store.spatial_dirty = True
+
+        game.sim_time = snapshot.sim_time
+        for chunk in snapshot.chunks:
+            self.apply_chunk(*chunk)
+
+    def reconcile(self, record):
+        """
+        Moves the local player to where the server has it, then walks it
+        through the inputs the server had not applied yet, exactly as
+        Player.update_player_pos and the entity store did the first time.
+        """
+        player = self.game.player
+        store = self.game.entities
+        entity = player.entity
+        held = player.get_input()
+
+        store.position[entity] = record["position"] * self.scale
+        for _, keys, direction, _ in self.inputs:
+            player.set_input(keys, direction)
+            player.check_idle()
+            player.update_player_pos()
+            store.position[entity] += store.velocity[entity]
+        player.set_input(*held)
+
+    def apply_chunk(self, key, revision, tiles, plots):
+        """
+        Puts the ground tiles and plots of a chunk sent by the server into
+        the tile map and farm.
+        """
+        game = self.game
+        size = game.BG.chunk_tiles
+        rows, columns = np.indices(tiles.shape)
+        game.BG.set_tiles(
+            columns.ravel() + key[0] * size, rows.ravel() + key[1] * size, tiles.ravel()
+        )
+        game.farm.replace_chunk_state(key, plots)
+
+    async def run(self, host=None, port=None):
+        """
+        Joins a server and plays until the window is closed or the server
+        goes away.
+        """
+        settings = self.game.settings
+        await self.connect(host or settings.coop_host, port or settings.coop_port)
+        while self.connected:
+            self.game.run_frame()
+            await asyncio.sleep(0)  # Handle the datagrams that came in
@@ -0,0 +1,76 @@
+import numpy as np
+
+# Rank of entities that were not drawn last frame; sorts them after the rest
+NOT_DRAWN = np.iinfo(np.int64).max
+
+
+class DrawList:
+    def __init__(self, game) -> None:
+        """
+        Initializes the DrawList class that draws the props of the map and the
+        entities as one list ordered by where they stand on the ground, so
+        whatever is lower on screen is drawn in front.
+
+        Props come sorted per chunk from the tile map. The entities are kept
+        in the order of the last frame, which hardly changes from one frame to
+        the next, so sorting them again is close to a single linear pass.
+        """
+        self.game = game
+        self.order = np.zeros(0, dtype=np.int64)  # Entity ids drawn last frame
+        self.rank = np.zeros(0, dtype=np.int64)  # Entity id -> index in order
+
+    def sort_entities(self, ids, feet):
+        """
+        Orders entities by the y of their feet, starting from last frame's order.
+
+        :param ids: Ids of the entities to draw.
+        :param feet: Y of their feet, in the same order.
+        :return: Index array putting ids in drawing order.
+        """
+        capacity = self.game.entities.capacity
+        if len(self.rank) < capacity:
+            self.rank = np.concatenate(
+                [self.rank, np.full(capacity - len(self.rank), NOT_DRAWN)]
+            )
+
+        # Put the entities in last frame's order (new ones last), then sort by
+        # their feet. The stable sort is a timsort, which finds the long runs
+        # in keys that are nearly sorted already.
+        previous = np.argsort(self.rank[ids], kind="stable")
+        order = previous[np.argsort(feet[previous], kind="stable")]
+
+        self.rank[self.order] = NOT_DRAWN
+        self.order = ids[order]
+        self.rank[self.order] = np.arange(len(order))
+        return order
+
+    def draw(self, renderer, view, alpha=1.0):
+        """
+        Draws the props and entities that overlap the camera viewport.
+
+        :param renderer: Renderer to draw with.
+        :param view: Camera viewport as a rect in world coordinates.
+        :param alpha: How far the frame is between the last two simulation steps.
+        """
+        entities = self.game.entities
+        tile_map = self.game.BG
+
+        ids, positions = entities.get_visible(view, alpha)
+        feet = entities.get_feet(ids, positions)
+        order = self.sort_entities(ids, feet)
+        sprites = entities.get_sprites(ids[order], positions[order])
+
+        bottoms, columns, rows, tile_ids = tile_map.get_visible_props(view)
+        props = tile_map.get_prop_sprites(columns, rows, tile_ids)
+
+        # Merge the two sorted lists: every entity goes after the props that
+        # stand above (or level with) its feet
+        slots = np.searchsorted(bottoms, feet[order], side="right").tolist()
+        drawn = 0
+        for (surface, position), slot in zip(sprites, slots):
+            for prop_surface, prop_position in props[drawn:slot]:
+                renderer.draw(prop_surface, prop_position)
+            drawn = slot
+            renderer.draw(surface, position)
+        for prop_surface, prop_position in props[drawn:]:
+            renderer.draw(prop_surface, prop_position)
@@ -0,0 +1,329 @@
+import numpy as np
+import pygame
+
+from spatial import SpatialHash
+
+# --- Directions ---
+DOWN, UP, LEFT, RIGHT = range(4)
+DIRECTION_VECTORS = np.array([(0, 1), (0, -1), (-1, 0), (1, 0)], dtype=np.float32)
+
+# --- Behaviours ---
+CONTROLLED = 0  # Moved by someone else (e.g. the player's keyboard input)
+WANDER = 1  # Walks around randomly
+NAVIGATE = 2  # Steered towards a goal by the pathfinder (see pathfinding.py)
+
+# Point of a sprite (as a fraction of its size) that stands on the ground
+FEET_OFFSET = np.array((0.5, 0.85), dtype=np.float32)
+
+# Flip value meaning "keep facing the way you faced before"
+KEEP_FLIP = 2
+
+# Per-entity arrays: name -> (shape of one entry, dtype)
+ENTITY_FIELDS = {
+    "position": ((2,), np.float32),  # Top-left corner in world pixels
+    "previous_position": ((2,), np.float32),  # Position before the last step
+    "velocity": ((2,), np.float32),  # Pixels per simulation step
+    "direction": ((), np.int8),  # DOWN, UP, LEFT or RIGHT
+    "flip": ((), np.bool_),  # Whether the sprite is flipped horizontally
+    "kind": ((), np.int16),  # Index of the entity kind
+    "behaviour": ((), np.int8),  # CONTROLLED, WANDER or NAVIGATE
+    "anim_row": ((), np.int16),  # Current animation row
+    "anim_frame": ((), np.int16),  # Current frame in that row
+    "anim_timer": ((), np.float32),  # Ms since the frame last changed
+    "wander_timer": ((), np.float32),  # Ms until the next wander decision
+}
+
+
+class EntityStore:
+    def __init__(self, capacity=256, seed=None, cell_size=256) -> None:
+        """
+        Initializes the EntityStore class that keeps every moving entity
+        (player, animals, NPCs) in flat NumPy arrays, one slot per entity,
+        so movement and animation are updated for all of them at once.
+
+        :param capacity: Number of entity slots to allocate up front.
+        :param seed: Optional seed for the wandering behaviour.
+        :param cell_size: Cell size of the spatial hash in pixels.
+        """
+        self.count = 0
+        self.random = np.random.default_rng(seed)
+        self.spatial = SpatialHash(cell_size)  # Finds entities near a spot
+        self.spatial_dirty = True  # Whether the hash misses recent changes
+
+        # --- Entity Kinds ---
+        self.animations = []  # Animation used by every kind
+        self.idle_rows = np.zeros((0, 4), dtype=np.int16)  # Row per kind and direction
+        self.walk_rows = np.zeros((0, 4), dtype=np.int16)
+        self.flips = np.zeros((0, 4), dtype=np.int8)  # 0, 1 or KEEP_FLIP
+        self.frame_counts = np.zeros((0, 0), dtype=np.int16)  # Frames per kind and row
+        self.row_lengths = []  # Frames per row of every kind (source of frame_counts)
+        self.frame_delays = np.zeros(0, dtype=np.float32)  # Ms per animation frame
+        self.speeds = np.zeros(0, dtype=np.float32)  # Wander speed in px per step
+        self.sizes = np.zeros((0, 2), dtype=np.float32)  # Sprite size in pixels
+
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        """
+        (Re)allocates the per-entity arrays, keeping the existing entities.
+        """
+        for name, (shape, dtype) in ENTITY_FIELDS.items():
+            array = np.zeros((capacity,) + shape, dtype=dtype)
+            old = getattr(self, name, None)
+            if old is not None:
+                array[: self.count] = old[: self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    # --- Setup ---
+    def add_kind(
+        self,
+        animation,
+        idle_rows,
+        walk_rows,
+        flips,
+        frame_delay,
+        speed=0,
+        row_lengths=None,
+    ):
+        """
+        Registers a kind of entity (player, cow, chicken...).
+
+        :param animation: Animation holding the kind's frames.
+        :param idle_rows: Idle animation row for (down, up, left, right).
+        :param walk_rows: Walking animation row for (down, up, left, right).
+        :param flips: Horizontal flip for (down, up, left, right), or KEEP_FLIP.
+        :param frame_delay: Milliseconds between animation frames.
+        :param speed: Wandering speed in pixels per simulation step.
+        :param row_lengths: Optional number of used frames in every row, for
+                            sheets whose rows are not all full.
+        :return: The id of the new kind.
+        """
+        # Rebuild the (kind, row) frame count table with the new kind added
+        if row_lengths is None:
+            row_lengths = [len(row) for row in animation.frames]
+        self.row_lengths.append(list(row_lengths))
+        rows = max(len(lengths) for lengths in self.row_lengths)
+        self.frame_counts = np.ones((len(self.row_lengths), rows), dtype=np.int16)
+        for kind, lengths in enumerate(self.row_lengths):
+            self.frame_counts[kind, : len(lengths)] = lengths
+
+        self.animations.append(animation)
+        self.idle_rows = np.vstack([self.idle_rows, [idle_rows]]).astype(np.int16)
+        self.walk_rows = np.vstack([self.walk_rows, [walk_rows]]).astype(np.int16)
+        self.flips = np.vstack([self.flips, [flips]]).astype(np.int8)
+        self.frame_delays = np.append(self.frame_delays, np.float32(frame_delay))
+        self.speeds = np.append(self.speeds, np.float32(speed))
+        self.sizes = np.vstack(
+            [self.sizes, [animation.frames[0][0].get_size()]]
+        ).astype(np.float32)
+        return len(self.animations) - 1
+
+    def spawn(self, kind, x, y, behaviour=WANDER):
+        """
+        Adds an entity and returns its id (its slot in the arrays).
+        """
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+
+        entity = self.count
+        self.count += 1
+        self.position[entity] = self.previous_position[entity] = (x, y)
+        self.velocity[entity] = 0
+        self.direction[entity] = DOWN
+        self.flip[entity] = False
+        self.kind[entity] = kind
+        self.behaviour[entity] = behaviour
+        self.anim_row[entity] = self.idle_rows[kind, DOWN]
+        self.anim_frame[entity] = 0
+        self.anim_timer[entity] = 0
+        self.wander_timer[entity] = 0
+        self.spatial_dirty = True
+        return entity
+
+    # --- Updates ---
+    def update(self, step_ms, tile_map):
+        """
+        Advances every entity by one simulation step.
+
+        :param step_ms: Length of the simulation step in milliseconds.
+        :param tile_map: Tile_Map the entities walk on (wanderers stay inside
+                         it and off solid tiles).
+        """
+        if not self.count:
+            return
+
+        self.update_wandering(step_ms)
+        self.update_positions(tile_map)
+        self.update_animations(step_ms)
+        self.update_spatial_hash()
+
+    def update_wandering(self, step_ms):
+        """
+        Picks a new random heading (or a rest) for wanderers whose timer ran out.
+        """
+        count = self.count
+        timer = self.wander_timer[:count]
+        timer -= step_ms
+        ready = np.flatnonzero((timer <= 0) & (self.behaviour[:count] == WANDER))
+        if not len(ready):
+            return
+
+        # Choice 4 means standing still for a while
+        choice = self.random.integers(0, 5, len(ready))
+        walking = choice < 4
+        speed = self.speeds[self.kind[ready]]
+        heading = DIRECTION_VECTORS[np.minimum(choice, 3)]
+        self.velocity[ready] = heading * (speed * walking)[:, None]
+        self.direction[ready[walking]] = choice[walking]
+        timer[ready] = self.random.uniform(1000, 4000, len(ready))
+
+    def update_positions(self, tile_map):
+        """
+        Moves every entity by its velocity. Wanderers and navigators are kept
+        inside the world and stop when they would step onto a solid tile (the
+        pathfinder steers around them, but a tile can change under its feet).
+        The player resolves its own collisions before it sets its velocity.
+        """
+        count = self.count
+        position = self.position[:count]
+        self.previous_position[:count] = position
+        position += self.velocity[:count]
+
+        roaming = np.flatnonzero(self.behaviour[:count] != CONTROLLED)
+        if not len(roaming):
+            return
+
+        size = self.sizes[self.kind[roaming]]
+        limit = np.array((tile_map.pixel_width, tile_map.pixel_height), np.float32)
+        position[roaming] = np.clip(position[roaming], 0, np.maximum(limit - size, 0))
+
+        # Step back and pick a new heading next step if the feet hit a solid tile
+        feet = position[roaming] + size * FEET_OFFSET
+        blocked = roaming[tile_map.is_solid_at(feet[:, 0], feet[:, 1])]
+        if len(blocked):
+            position[blocked] = self.previous_position[blocked]
+            self.velocity[blocked] = 0
+            self.wander_timer[blocked] = 0
+
+    def update_animations(self, step_ms):
+        """
+        Picks the animation row of every entity and advances its frame timer.
+        """
+        count = self.count
+        kind = self.kind[:count]
+        direction = self.direction[:count]
+        moving = self.velocity[:count].any(axis=1)
+
+        row = np.where(
+            moving, self.walk_rows[kind, direction], self.idle_rows[kind, direction]
+        )
+        flip = self.flips[kind, direction]
+        keep = flip == KEEP_FLIP
+        self.flip[:count] = np.where(keep, self.flip[:count], flip == 1)
+
+        # Restart the animation whenever the row changes
+        changed = row != self.anim_row[:count]
+        self.anim_row[:count] = row
+        self.anim_frame[:count][changed] = 0
+        self.anim_timer[:count][changed] = 0
+
+        timer = self.anim_timer[:count]
+        timer += step_ms
+        advance = timer > self.frame_delays[kind]
+        timer[advance] = 0
+        frame = self.anim_frame[:count]
+        frame[advance] = (frame[advance] + 1) % self.frame_counts[
+            kind[advance], row[advance]
+        ]
+
+    def update_spatial_hash(self):
+        """
+        Re-sorts the entities into the spatial hash by the center of their sprite.
+        """
+        count = self.count
+        self.spatial.rebuild(self.position[:count] + self.sizes[self.kind[:count]] / 2)
+        self.spatial_dirty = False
+
+    # --- Queries ---
+    def query(self, rect, alpha=1.0):
+        """
+        Returns the ids of the entities whose sprite overlaps a rect. Only the
+        spatial hash cells around the rect are looked at.
+
+        :param rect: A rect in world coordinates.
+        :param alpha: Use positions interpolated this far between the last two
+                      simulation steps (as drawn on screen).
+        """
+        if not self.count:
+            return np.zeros(0, dtype=np.int64)
+        if self.spatial_dirty:
+            self.update_spatial_hash()
+
+        # Entities are hashed by their center, so widen the search by half
+        # the biggest sprite plus the distance moved since the last step
+        margin = int(self.sizes.max() / 2 + self.speeds.max(initial=0)) + 8
+        candidates = self.spatial.query(
+            pygame.Rect(rect).inflate(margin * 2, margin * 2)
+        )
+
+        previous = self.previous_position[candidates]
+        position = previous + (self.position[candidates] - previous) * alpha
+        size = self.sizes[self.kind[candidates]]
+        inside = (
+            (position[:, 0] + size[:, 0] > rect.left)
+            & (position[:, 0] < rect.right)
+            & (position[:, 1] + size[:, 1] > rect.top)
+            & (position[:, 1] < rect.bottom)
+        )
+        return candidates[inside]
+
+    # --- Drawing ---
+    def get_visible(self, view, alpha=1.0):
+        """
+        Returns the entities that overlap the camera viewport.
+
+        :param view: Camera viewport as a rect in world coordinates.
+        :param alpha: How far the frame is between the last two simulation steps.
+        :return: Tuple (ids in ascending order, (n, 2) array of the positions
+                 they are drawn at).
+        """
+        visible = np.sort(self.query(view, alpha))
+        previous = self.previous_position[visible]
+        return visible, previous + (self.position[visible] - previous) * alpha
+
+    def get_feet(self, ids, positions):
+        """
+        Returns the y of the point where each entity stands on the ground.
+        """
+        return positions[:, 1] + self.sizes[self.kind[ids], 1] * FEET_OFFSET[1]
+
+    def get_sprites(self, ids, positions):
+        """
+        Returns the current animation frame of every entity with its position.
+
+        :return: List of (surface, (x, y)).
+        """
+        animations = self.animations
+        return [
+            (animations[kind].get_frame(row, frame, flip=flip), (x, y))
+            for kind, row, frame, flip, x, y in zip(
+                self.kind[ids].tolist(),
+                self.anim_row[ids].tolist(),
+                self.anim_frame[ids].tolist(),
+                self.flip[ids].tolist(),
+                *positions.T.tolist(),
+            )
+        ]
+
+    def draw(self, renderer, view, alpha=1.0):
+        """
+        Draws the entities that overlap the camera viewport.
+
+        :param renderer: Renderer to draw with.
+        :param view: Camera viewport as a rect in world coordinates.
+        :param alpha: How far the frame is between the last two simulation steps.
+        """
+        visible, positions = self.get_visible(view, alpha)
+        for surface, position in self.get_sprites(visible, positions):
+            renderer.draw(surface, position)
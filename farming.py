@@ -0,0 +1,416 @@
+import heapq
+from itertools import count
+
+import numpy as np
+import pygame
+
+from autotile import AutotileLayer
+from surface_format import tint_surface
+from tile_system import TileSet
+
+# --- Crops ---
+# Row of every crop in Basic_Plants.png; columns 1-4 are its growth stages
+CROPS = {"wheat": 0, "eggplant": 1}
+FIRST_STAGE_COLUMN = 1
+STAGES = 4
+
+# --- Colors ---
+WET_SOIL_TINT = (170, 140, 120)  # Multiplied into the soil when watered
+WITHERED_TINT = (150, 120, 90)  # Multiplied into dead crops
+
+# --- Event Kinds ---
+GROW = "grow"
+DRY = "dry"
+WITHER = "wither"
+EVENT_KINDS = (GROW, DRY, WITHER)
+
+# --- Saved Plot Layout ---
+# One record per plot. crop is an index into CROPS (-1 for none) and the
+# event columns hold the due time of the pending event (NaN for none).
+PLOT_DTYPE = np.dtype(
+    [
+        ("x", "<i4"),
+        ("y", "<i4"),
+        ("crop", "i1"),
+        ("stage", "i1"),
+        ("watered", "?"),
+        ("dead", "?"),
+        ("waiting", "?"),
+    ]
+    + [(kind, "<f8") for kind in EVENT_KINDS]
+)
+
+
+class EventQueue:
+    def __init__(self) -> None:
+        """
+        Initializes the EventQueue class, a priority queue of timed events.
+        Nothing is polled: each update only pops the events that are due.
+        """
+        self.heap = []
+        self.counter = count()  # Keeps events with equal times in order
+
+    def push(self, time, event):
+        """
+        Schedules an event at a simulation time (milliseconds).
+        """
+        heapq.heappush(self.heap, (time, next(self.counter), event))
+
+    def pop_due(self, now):
+        """
+        Yields every event that is due at simulation time now, in time order.
+        """
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            yield heapq.heappop(heap)[2]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class Plot:
+    __slots__ = ("tile", "crop", "stage", "watered", "dead", "waiting", "pending")
+
+    def __init__(self, tile) -> None:
+        """
+        Initializes the Plot class holding the state of one tilled tile.
+        """
+        self.tile = tile  # (column, row) on the tile map
+        self.crop = None  # Name of the planted crop
+        self.stage = 0  # Growth stage, STAGES - 1 is ripe
+        self.watered = False
+        self.dead = False
+        self.waiting = False  # A growth step is waiting for water
+        self.pending = {}  # Event kind -> (due time, id) of its only valid event
+
+    def is_ripe(self):
+        return self.crop is not None and not self.dead and self.stage == STAGES - 1
+
+
+class Farm:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Farm class that handles tilled soil and crops on the
+        tile map. Growth, drying and withering are timed events, so only the
+        plots whose state changes cost anything.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.tile_map = game.BG
+        size = self.tile_map.size
+        tiles = game.tile_directory
+
+        # --- Sprites ---
+        # Tilled_Dirt.png is a blob tileset: the soil tile of a plot depends on
+        # which of its neighbours are tilled too (see autotile.py)
+        soil = TileSet(
+            tiles.tilled_dirt,
+            (11, 7),
+            cache=game.sprite_cache,
+            formats=game.surface_formats,
+        )
+        self.soil_tiles = [
+            pygame.transform.scale(tile, (size, size)) for tile in soil.tiles
+        ]
+        self.wet_soil_tiles = []
+        for tile in self.soil_tiles:
+            self.wet_soil_tiles.append(tint_surface(tile, WET_SOIL_TINT))
+
+        plants = TileSet(
+            tiles.plants, (6, 2), cache=game.sprite_cache, formats=game.surface_formats
+        )
+        self.crop_stages = {}  # (crop, stage, dead) -> surface
+        for crop, row in CROPS.items():
+            for stage in range(STAGES):
+                tile = plants.get_tile(row * 6 + FIRST_STAGE_COLUMN + stage)
+                tile = pygame.transform.scale(tile, (size, size))
+                withered = tint_surface(tile, WITHERED_TINT)
+                self.crop_stages[crop, stage, False] = tile
+                self.crop_stages[crop, stage, True] = withered
+
+        # --- State ---
+        self.plots = {}  # (column, row) -> Plot
+        self.chunk_plots = {}  # (chunk_x, chunk_y) -> set of plot tiles
+        self.events = EventQueue()
+        self.event_ids = count()
+        # Which cells are tilled and their soil tiles, kept per map chunk
+        self.soil = AutotileLayer(chunk_size=self.tile_map.chunk_tiles)
+        self.load_map()
+
+        self.tile_map.overlays.append(self)
+
+    # --- Scheduling ---
+    def schedule(self, plot, kind, delay):
+        """
+        Schedules an event for a plot, replacing any pending event of that kind.
+        """
+        self.schedule_at(plot, kind, self.game.sim_time + delay)
+
+    def schedule_at(self, plot, kind, time):
+        """
+        Schedules an event for a plot at a simulation time.
+        """
+        event_id = next(self.event_ids)
+        plot.pending[kind] = (time, event_id)
+        self.events.push(time, (plot, kind, event_id))
+
+    def cancel(self, plot, kind):
+        """
+        Cancels the pending event of a kind (it is skipped when it comes due).
+        """
+        plot.pending.pop(kind, None)
+
+    def update(self, now):
+        """
+        Handles every event that is due.
+
+        :param now: Simulation time in milliseconds.
+        """
+        for plot, kind, event_id in self.events.pop_due(now):
+            # Skip events that were replaced, cancelled or whose plot is gone
+            pending = plot.pending.get(kind)
+            if (
+                pending is None
+                or pending[1] != event_id
+                or self.plots.get(plot.tile) is not plot
+            ):
+                continue
+            del plot.pending[kind]
+
+            if kind == GROW:
+                self.grow(plot)
+            elif kind == DRY:
+                self.dry(plot)
+            elif kind == WITHER:
+                self.wither(plot)
+
+    def grow(self, plot):
+        """
+        Moves a crop to its next stage if the soil is wet, otherwise waits for
+        the next watering.
+        """
+        if not plot.watered:
+            plot.waiting = True
+            return
+
+        plot.stage += 1
+        if plot.stage < STAGES - 1:
+            self.schedule(plot, GROW, self.settings.crop_stage_time)
+        self.redraw(plot)
+
+    def dry(self, plot):
+        """
+        Dries the soil of a plot. Unripe crops start withering.
+        """
+        plot.watered = False
+        if plot.crop is not None and not plot.dead and not plot.is_ripe():
+            self.schedule(plot, WITHER, self.settings.wither_time)
+        self.redraw(plot)
+
+    def wither(self, plot):
+        """
+        Kills the crop of a plot that stayed dry for too long.
+        """
+        plot.dead = True
+        self.cancel(plot, GROW)
+        plot.waiting = False
+        self.redraw(plot)
+
+    # --- Actions ---
+    def use(self, tile_x, tile_y):
+        """
+        Does the obvious thing on a tile: till it, plant on it, harvest a ripe
+        crop or clear a dead one.
+        """
+        plot = self.plots.get((tile_x, tile_y))
+        if plot is None:
+            self.till(tile_x, tile_y)
+        elif plot.crop is None:
+            self.plant(tile_x, tile_y, self.settings.default_crop)
+        elif plot.dead or plot.is_ripe():
+            self.harvest(tile_x, tile_y)
+
+    def till(self, tile_x, tile_y):
+        """
+        Turns a walkable tile into an empty plot.
+        """
+        if (tile_x, tile_y) in self.plots or self.tile_map.is_solid(tile_x, tile_y):
+            return None
+
+        plot = Plot((tile_x, tile_y))
+        self.plots[plot.tile] = plot
+        self.chunk_plots.setdefault(self.get_chunk_key(plot.tile), set()).add(plot.tile)
+
+        # Only the 3x3 cells around the new plot can get a different soil tile
+        for cell in self.soil.set(tile_x, tile_y, True):
+            self.tile_map.redraw_cell(*cell)
+        return plot
+
+    def plant(self, tile_x, tile_y, crop):
+        """
+        Plants a crop on an empty plot.
+        """
+        plot = self.plots.get((tile_x, tile_y))
+        if plot is None or plot.crop is not None:
+            return
+
+        plot.crop, plot.stage, plot.dead = crop, 0, False
+        self.schedule(plot, GROW, self.settings.crop_stage_time)
+        if not plot.watered:
+            self.schedule(plot, WITHER, self.settings.wither_time)
+        self.redraw(plot)
+
+    def water(self, tile_x, tile_y):
+        """
+        Waters a plot. The soil stays wet for a while and a crop that was
+        waiting for water carries on growing.
+        """
+        plot = self.plots.get((tile_x, tile_y))
+        if plot is None:
+            return
+
+        plot.watered = True
+        self.cancel(plot, WITHER)
+        self.schedule(plot, DRY, self.settings.water_time)
+        if plot.waiting:
+            plot.waiting = False
+            self.schedule(plot, GROW, self.settings.crop_stage_time)
+        self.redraw(plot)
+
+    def harvest(self, tile_x, tile_y):
+        """
+        Removes the crop of a plot (ripe or dead) and leaves the soil tilled.
+
+        :return: The name of the harvested crop, or None if it was dead.
+        """
+        plot = self.plots.get((tile_x, tile_y))
+        if plot is None or plot.crop is None:
+            return None
+
+        crop = None if plot.dead else plot.crop
+        plot.crop, plot.stage, plot.dead, plot.waiting = None, 0, False, False
+        for kind in (GROW, WITHER):
+            self.cancel(plot, kind)
+        self.redraw(plot)
+        return crop
+
+    # --- Drawing ---
+    def load_map(self):
+        """
+        Computes the soil tile of every plot in one pass. Called by the tile map
+        whenever a map is loaded.
+        """
+        self.soil.load(self.plots, self.tile_map.map_width, self.tile_map.map_height)
+
+    def get_chunk_key(self, tile):
+        """
+        Returns the (chunk_x, chunk_y) of the chunk holding a tile.
+        """
+        chunk_tiles = self.tile_map.chunk_tiles
+        return tile[0] // chunk_tiles, tile[1] // chunk_tiles
+
+    def redraw(self, plot):
+        """
+        Redraws the cell of a plot in the cached background.
+        """
+        self.tile_map.redraw_cell(*plot.tile)
+
+    def draw_chunk(self, chunk, chunk_x, chunk_y):
+        """
+        Draws every plot of a chunk that is being rendered.
+        """
+        chunk_tiles = self.tile_map.chunk_tiles
+        size = self.tile_map.size
+        for tile_x, tile_y in self.chunk_plots.get((chunk_x, chunk_y), ()):
+            position = (
+                (tile_x - chunk_x * chunk_tiles) * size,
+                (tile_y - chunk_y * chunk_tiles) * size,
+            )
+            self.draw_cell(chunk, tile_x, tile_y, position)
+
+    def draw_cell(self, chunk, tile_x, tile_y, position):
+        """
+        Draws the plot on a tile (if any) at a position inside a chunk.
+        """
+        plot = self.plots.get((tile_x, tile_y))
+        if plot is None:
+            return
+
+        soil = self.wet_soil_tiles if plot.watered else self.soil_tiles
+        chunk.blit(soil[self.soil.get_tile(tile_x, tile_y)], position)
+        if plot.crop is not None:
+            chunk.blit(self.crop_stages[plot.crop, plot.stage, plot.dead], position)
+
+    # --- Saving ---
+    def get_chunk_state(self, key):
+        """
+        Returns the plots of a chunk as a PLOT_DTYPE array.
+
+        :param key: (chunk_x, chunk_y) of the chunk.
+        """
+        crops = list(CROPS)
+        tiles = sorted(self.chunk_plots.get(key, ()))
+        state = np.zeros(len(tiles), dtype=PLOT_DTYPE)
+        for record, tile in zip(state, tiles):
+            plot = self.plots[tile]
+            record["x"], record["y"] = tile
+            record["crop"] = -1 if plot.crop is None else crops.index(plot.crop)
+            record["stage"] = plot.stage
+            record["watered"] = plot.watered
+            record["dead"] = plot.dead
+            record["waiting"] = plot.waiting
+            for kind in EVENT_KINDS:
+                pending = plot.pending.get(kind)
+                record[kind] = np.nan if pending is None else pending[0]
+        return state
+
+    def load_chunk_state(self, state):
+        """
+        Adds the plots saved by get_chunk_state and reschedules their events.
+        The cached background is not redrawn; load the tile map afterwards,
+        which empties the chunk cache and recomputes the soil tiles.
+        """
+        crops = list(CROPS)
+        for record in state.tolist():
+            x, y, crop, stage, watered, dead, waiting, *due = record
+            plot = Plot((x, y))
+            plot.crop = None if crop < 0 else crops[crop]
+            plot.stage = stage
+            plot.watered, plot.dead, plot.waiting = watered, dead, waiting
+            self.plots[plot.tile] = plot
+            self.chunk_plots.setdefault(self.get_chunk_key(plot.tile), set()).add(
+                plot.tile
+            )
+            for kind, time in zip(EVENT_KINDS, due):
+                if not np.isnan(time):
+                    self.schedule_at(plot, kind, time)
+
+    def replace_chunk_state(self, key, state):
+        """
+        Replaces the plots of a chunk with ones saved by get_chunk_state and
+        redraws the cells that changed (co-op clients mirror the server's
+        plots with it).
+
+        :param key: (chunk_x, chunk_y) of the chunk.
+        """
+        old = self.chunk_plots.pop(key, set())
+        for tile in old:
+            del self.plots[tile]
+        self.load_chunk_state(state)
+        new = self.chunk_plots.get(key, set())
+
+        cells = set(old | new)
+        for tile in old - new:
+            cells.update(self.soil.set(*tile, False))
+        for tile in new - old:
+            cells.update(self.soil.set(*tile, True))
+        for cell in cells:
+            self.tile_map.redraw_cell(*cell)
+
+    def clear(self):
+        """
+        Removes every plot and pending event.
+        """
+        self.plots.clear()
+        self.chunk_plots.clear()
+        self.events = EventQueue()
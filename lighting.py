@@ -0,0 +1,287 @@
+import numpy as np
+import pygame
+
+from tile_system import PROPS
+
+# --- Time of Day ---
+# Ambient light over a day as (time of day, color), where the time of day runs
+# from 0 at midnight to 1 at the next midnight
+AMBIENT_KEYS = (
+    (0.0, (45, 55, 100)),  # Night
+    (0.22, (45, 55, 100)),
+    (0.3, (255, 185, 145)),  # Dawn
+    (0.38, (255, 255, 255)),  # Day
+    (0.72, (255, 255, 255)),
+    (0.8, (255, 155, 105)),  # Dusk
+    (0.88, (45, 55, 100)),
+    (1.0, (45, 55, 100)),
+)
+DAYLIGHT = (255, 255, 255)  # Multiplying by it changes nothing
+
+# Light maps live in the tile map's chunk cache under (LIGHT_MAP, ambient, x, y)
+LIGHT_MAP = "light"
+
+
+def get_ambient(time_of_day):
+    """
+    Returns the ambient light color at a time of day, interpolated between
+    the AMBIENT_KEYS around it.
+    """
+    for (start, first), (end, second) in zip(AMBIENT_KEYS, AMBIENT_KEYS[1:]):
+        if start <= time_of_day <= end:
+            fraction = (time_of_day - start) / (end - start)
+            return tuple(round(a + (b - a) * fraction) for a, b in zip(first, second))
+    return AMBIENT_KEYS[-1][1]
+
+
+def make_light_sprite(radius, color):
+    """
+    Draws the falloff of a light once: its color at the center, fading
+    quadratically to black at the radius. It is added onto the ambient light.
+    """
+    offsets = np.arange(radius * 2) - radius + 0.5
+    distance = np.hypot(offsets[:, None], offsets[None, :]) / radius
+    falloff = np.clip(1 - distance, 0, 1) ** 2
+    pixels = (falloff[:, :, None] * np.array(color)).astype(np.uint8)
+
+    sprite = pygame.Surface((radius * 2, radius * 2))
+    pygame.surfarray.blit_array(sprite, pixels)
+    return sprite
+
+
+class Lighting:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Lighting class that darkens the world at night and
+        lights it up around lamps and windows.
+
+        The ambient light and the falloff of every light are drawn into one
+        light map per chunk of the tile map. A light map is only drawn again
+        when the time of day moves into the next bucket or a light in the
+        chunk changes; each frame it is applied with a single multiplying
+        blit per chunk, so the number of lights costs nothing per frame.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.tile_map = game.BG
+
+        # --- Time of Day ---
+        self.bucket = None  # Current step of the day, see update
+        self.ambient = DAYLIGHT  # Ambient light color of that step
+
+        # --- Lights ---
+        # Lights added at runtime; props listed in settings.prop_lights light
+        # up on their own. Prop lights must not reach further than one chunk.
+        self.lights = {}  # Light id -> (x, y, radius, color)
+        self.chunk_lights = {}  # (chunk_x, chunk_y) -> ids of lights reaching it
+        self.next_light = 0
+        self.sprites = {}  # (radius, color) -> falloff surface
+        self.tile_map.edit_listeners.append(self.on_tiles_edited)
+
+    # --- Time of Day ---
+    def get_time_of_day(self, sim_time):
+        """
+        Returns the time of day (0 at midnight, 0.5 at noon) at a simulation time.
+        """
+        day = sim_time / self.settings.day_length
+        return (self.settings.day_start + day) % 1
+
+    def update(self, sim_time):
+        """
+        Moves the ambient light to the current step of the day. Light maps of
+        other ambient colors are left to age out of the chunk cache (the
+        steps of the night all share theirs).
+
+        :param sim_time: Simulation time in milliseconds.
+        """
+        buckets = self.settings.light_buckets
+        bucket = int(self.get_time_of_day(sim_time) * buckets)
+        if bucket == self.bucket:
+            return
+
+        self.bucket = bucket
+        ambient = get_ambient((bucket + 0.5) / buckets)
+        if ambient != self.ambient:
+            self.ambient = ambient
+            self.game.renderer.invalidate()
+
+    # --- Lights ---
+    def add_light(self, x, y, radius, color):
+        """
+        Adds a light (a lamp, a lantern...).
+
+        :param x: X of the center of the light in world pixels.
+        :param y: Y of the center of the light in world pixels.
+        :param radius: Distance in pixels at which the light fades out.
+        :param color: RGB color at the center.
+        :return: Id of the light, for move_light and remove_light.
+        """
+        light = self.next_light
+        self.next_light += 1
+        self.lights[light] = (x, y, radius, color)
+        self.index_light(light, True)
+        return light
+
+    def move_light(self, light, x, y):
+        """
+        Moves a light. Only the light maps of the chunks it leaves or enters
+        are drawn again.
+        """
+        self.index_light(light, False)
+        _, _, radius, color = self.lights[light]
+        self.lights[light] = (x, y, radius, color)
+        self.index_light(light, True)
+
+    def remove_light(self, light):
+        self.index_light(light, False)
+        del self.lights[light]
+
+    def index_light(self, light, add):
+        """
+        Adds a light to (or removes it from) the chunks it reaches and drops
+        their light maps.
+        """
+        x, y, radius, _ = self.lights[light]
+        area = pygame.Rect(x - radius, y - radius, radius * 2, radius * 2)
+        chunks = set(self.tile_map.get_visible_chunks(area))
+        for key in chunks:
+            lights = self.chunk_lights.setdefault(key, set())
+            if add:
+                lights.add(light)
+            else:
+                lights.discard(light)
+        self.drop_light_maps(chunks)
+        self.game.renderer.mark_dirty(area)
+
+    def drop_light_maps(self, chunks):
+        """
+        Drops the cached light maps of chunks at every ambient color, so one
+        made before a light changed is not reused when that color comes back.
+        """
+        cache = self.tile_map.chunk_cache
+        for key in cache.keys():
+            if key[0] == LIGHT_MAP and key[2:] in chunks:
+                cache.discard(key)
+
+    def on_tiles_edited(self, layer, first_x, first_y, last_x, last_y):
+        """
+        Tile_Map edit listener: drops the light maps around edited props,
+        which may have gained or lost a light. (Loading a map drops every
+        cached chunk anyway.)
+        """
+        prop_lights = self.settings.prop_lights
+        if layer != PROPS or not prop_lights:
+            return
+
+        size = self.tile_map.size
+        reach = max(radius for radius, _ in prop_lights.values())
+        area = pygame.Rect(
+            first_x * size,
+            first_y * size,
+            (last_x - first_x + 1) * size,
+            (last_y - first_y + 1) * size,
+        ).inflate(reach * 2, reach * 2)
+        self.drop_light_maps(set(self.tile_map.get_visible_chunks(area)))
+        self.game.renderer.mark_dirty(area)
+
+    def get_lights(self, chunk_x, chunk_y):
+        """
+        Yields every light that reaches into a chunk as (x, y, radius, color):
+        the added ones, then those of the props in it and around it.
+        """
+        for light in self.chunk_lights.get((chunk_x, chunk_y), ()):
+            yield self.lights[light]
+
+        prop_lights = self.settings.prop_lights
+        tile_map = self.tile_map
+        if not prop_lights or PROPS not in tile_map.layers:
+            return
+        size = tile_map.size
+        area = pygame.Rect(
+            (chunk_x - 1) * tile_map.chunk_size,
+            (chunk_y - 1) * tile_map.chunk_size,
+            tile_map.chunk_size * 3,
+            tile_map.chunk_size * 3,
+        )
+        for key in tile_map.get_visible_chunks(area):
+            _, columns, rows, tile_ids = tile_map.get_chunk_props(*key)
+            for column, row, tile_id in zip(
+                columns.tolist(), rows.tolist(), tile_ids.tolist()
+            ):
+                light = prop_lights.get(tile_id)
+                if light is not None:
+                    # Windows and lamps sit about a cell above the ground
+                    yield (column * size + size // 2, row * size, *light)
+
+    # --- Light Maps ---
+    def get_light_sprite(self, radius, color):
+        key = (radius, tuple(color))
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = make_light_sprite(radius, color)
+        return sprite
+
+    def render_light_map(self, chunk_x, chunk_y):
+        """
+        Draws the light map of a chunk: the ambient light plus the falloff of
+        every light reaching into it.
+        """
+        tile_map = self.tile_map
+        left, top = chunk_x * tile_map.chunk_size, chunk_y * tile_map.chunk_size
+        width = min(tile_map.chunk_size, tile_map.pixel_width - left)
+        height = min(tile_map.chunk_size, tile_map.pixel_height - top)
+
+        light_map = pygame.Surface((width, height))
+        if pygame.display.get_surface() is not None:
+            light_map = light_map.convert()
+        light_map.fill(self.ambient)
+
+        for x, y, radius, color in self.get_lights(chunk_x, chunk_y):
+            light_map.blit(
+                self.get_light_sprite(radius, color),
+                (x - radius - left, y - radius - top),
+                special_flags=pygame.BLEND_ADD,
+            )
+        return light_map
+
+    def get_light_map(self, chunk_x, chunk_y):
+        """
+        Returns the light map of a chunk for the current ambient light,
+        drawing and caching it on a cache miss.
+        """
+        key = (LIGHT_MAP, self.ambient, chunk_x, chunk_y)
+        cache = self.tile_map.chunk_cache
+        light_map = cache.get(key)
+        if light_map is None:
+            light_map = cache.put(key, self.render_light_map(chunk_x, chunk_y))
+        return light_map
+
+    def draw(self, game, area=None):
+        """
+        Multiplies the frame inside the camera viewport by the light maps.
+
+        :param game: The game instance to draw on.
+        :param area: Optional screen rect to restrict drawing to.
+        """
+        if self.ambient == DAYLIGHT:
+            return  # Lights add nothing to full daylight
+
+        view = game.camera.get_rect()
+        if area is not None:
+            game.screen.set_clip(area)
+            view = pygame.Rect(
+                game.camera.x + area.x, game.camera.y + area.y, area.w, area.h
+            )
+
+        for chunk_x, chunk_y in self.tile_map.get_visible_chunks(view):
+            game.screen.blit(
+                self.get_light_map(chunk_x, chunk_y),
+                game.camera.apply(
+                    chunk_x * self.tile_map.chunk_size,
+                    chunk_y * self.tile_map.chunk_size,
+                ),
+                special_flags=pygame.BLEND_MULT,
+            )
+
+        if area is not None:
+            game.screen.set_clip(None)
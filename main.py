@@ -1,123 +1,393 @@
-import pygame
-import sys
-import json
-
-from settings import Settings
-from player import Player
-from tile_system import Tile_Map
-from addresses import Tile_dir
-
-
-class StardewValley2:
-    """
-    The main game class for Stardew Valley 2.0.
-    Initializes the game, handles the game loop, and updates game elements.
-    """
-
-    def __init__(self) -> None:
-        """
-        Initialize the game settings, window, and player.
-        """
-        self.settings = Settings()  # Load game settings
-        self.tile_directory = Tile_dir(self)  # Tile directory setup
-
-        # Load the tile map from the directory
-        self.load_tile_map()
-
-        # Initialize Pygame
-        pygame.init()
-
-        # Screen setup
-        self.setup_screen()
-
-        # Background and player setup
-        self.setup_background()
-        self.setup_player()
-
-        # Game clock
-        self.clock = pygame.time.Clock()
-
-    def load_tile_map(self):
-        """
-        Loads the tile map data from the JSON file.
-        """
-        with open(self.tile_directory.tile_map) as tile_map_file:
-            data = json.load(tile_map_file)
-            self.tile_map = data["tilemap"]
-
-    def setup_screen(self):
-        """
-        Set up the Pygame screen and window.
-        """
-        self.screen = pygame.display.set_mode(
-            (self.settings.SCREEN_WIDTH, self.settings.SCREEN_HEIGHT)
-        )
-        pygame.display.set_caption(self.settings.game_name)
-
-    def setup_background(self):
-        """
-        Set up the background (tile map) for the game.
-        """
-        self.BG = Tile_Map(self)
-        self.tile_BG = self.BG.create_tile_screen(self.tile_map)
-
-    def setup_player(self):
-        """
-        Initialize the player and set initial values.
-        """
-        self.player = Player(self)
-
-    def update_tiles(self):
-        """
-        Update the game tiles.
-        (Currently a placeholder method to be implemented later)
-        """
-        pass
-
-    def update_player(self):
-        """
-        Update the player's state and draw them on the screen.
-        """
-        self.player.check_idle()
-        self.player.select_frame_row()
-        self.player.select_frame()
-        self.player.update_player_pos()
-        self.player.draw_frame(self)
-
-    def handle_events(self):
-        """
-        Handle all game-related events (key presses, window close, etc.).
-        """
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                self.player.handle_down_events(event)
-            if event.type == pygame.KEYUP:
-                self.player.handle_up_events(event)
-
-    def run_game(self):
-        """
-        Run the main game loop.
-        """
-        while True:
-            # Handle events (e.g., key presses, window events)
-            self.handle_events()
-
-            # Draw the background
-            self.BG.draw_tile_screen(self)
-
-            # Update player
-            self.update_player()
-
-            # Refresh the display
-            pygame.display.flip()
-
-            # Control the frame rate
-            self.clock.tick(self.settings.fps)
-
-
-# --- Entry Point ---
-if __name__ == "__main__":
-    game = StardewValley2()
-    game.run_game()
+import pygame
+import random
+import sys
+
+from settings import Settings
+from player import Player
+from tile_system import Tile_Map
+from addresses import Tile_dir
+from animals import Animals
+from assets import AssetManager
+from camera import Camera
+from draw_list import DrawList
+from entities import EntityStore
+from farming import Farm
+from lighting import Lighting
+from particles import Particles
+from pathfinding import Pathfinder
+from replay import InputRecorder
+from profiler import (
+    ASSETS,
+    BACKGROUND,
+    ENTITIES,
+    EVENTS,
+    PLAYER,
+    PRESENT,
+    SPRITES,
+    TICK,
+    WORLD,
+    Profiler,
+)
+from renderer import DirtyRectRenderer, Renderer
+from save_system import SaveSystem
+from map_format import DEFAULT_LAYER, load_map
+from sprite_cache import SpriteCache
+from surface_format import SurfaceFormats
+
+# --- Messages ---
+MESSAGE_TIME = 4000  # Milliseconds a message stays on screen
+MESSAGE_COLOR = (255, 255, 255)
+MESSAGE_BACKGROUND = (0, 0, 0, 160)
+
+
+class StardewValley2:
+    """
+    The main game class for Stardew Valley 2.0.
+    Initializes the game, handles the game loop, and updates game elements.
+    """
+
+    def __init__(self, settings=None) -> None:
+        """
+        Initialize the game settings, window, and player.
+
+        :param settings: Optional Settings to use instead of the defaults.
+        """
+        self.settings = settings or Settings()  # Load game settings
+        # Everything random in the simulation derives from the seed
+        self.seed = self.settings.seed
+        if self.seed is None:
+            self.seed = random.randrange(2**32)
+        self.profiler = Profiler(self)  # Times the phases of every frame
+        self.tile_directory = Tile_dir(self)  # Tile directory setup
+
+        # Load the tile map from the directory
+        self.load_tile_map()
+
+        # Initialize Pygame
+        pygame.init()
+
+        # Screen setup
+        self.setup_screen()
+
+        # Baked sprite frames from earlier launches
+        self.sprite_cache = (
+            SpriteCache(self.settings.sprite_cache_dir)
+            if self.settings.use_sprite_cache
+            else None
+        )
+
+        # Every sliced frame is converted to its cheapest format (see
+        # surface_format.py); this keeps the counts per sheet
+        self.surface_formats = SurfaceFormats()
+
+        # Sheets not needed to start are loaded in the background
+        self.assets = AssetManager(self)
+        self.assets.preload(self.settings.season)
+
+        # Background and player setup
+        self.setup_background()
+        self.setup_entities()
+        self.setup_player()
+        self.setup_farm()
+        self.setup_renderer()
+        self.lighting = Lighting(self)
+        self.particles = Particles(self)  # Footstep dust and rain
+        self.save_system = SaveSystem(self)
+
+        # Game clock and fixed timestep state
+        self.clock = pygame.time.Clock()
+        self.sim_time = 0.0  # Simulated time in milliseconds
+        self.sim_steps = 0  # Simulation steps run so far
+        self.accumulator = 0.0  # Real time not yet simulated in milliseconds
+
+        # Input is logged from the start, or fed from a replay (see replay.py)
+        self.recorder = InputRecorder(self) if self.settings.record_input else None
+        self.replay = None
+        self.coop = None  # Session with a co-op server (see coop.CoopClient)
+        self.message = None  # (panel, ticks it is hidden at) of show_message
+
+    def load_tile_map(self):
+        """
+        Loads the tile map layers, memory-mapping the binary map if there is one
+        and falling back to the JSON file otherwise.
+        """
+        self.tile_layers = load_map(
+            self.tile_directory.tile_map_bin, self.tile_directory.tile_map
+        )
+        self.tile_map = self.tile_layers[DEFAULT_LAYER]
+
+    def setup_screen(self):
+        """
+        Set up the Pygame screen and window.
+        """
+        self.window = pygame.display.set_mode(self.settings.get_screen_size())
+        if self.settings.render_scale == 1:
+            self.screen = self.window
+        else:
+            # The world is drawn on a smaller surface in the window's pixel
+            # format, which the renderer scales up to the window
+            self.screen = pygame.Surface(
+                self.settings.get_render_size(), 0, self.window
+            )
+        pygame.display.set_caption(self.settings.game_name)
+
+    def setup_background(self):
+        """
+        Set up the background (tile map) for the game.
+        """
+        self.BG = Tile_Map(self)
+        self.BG.load_map(self.tile_layers)
+
+        # The camera only needs to know how far it may scroll
+        self.camera = Camera(self)
+        self.camera.set_world_size(self.BG.pixel_width, self.BG.pixel_height)
+
+    def setup_entities(self):
+        """
+        Create the entity store and fill the map with animals.
+        """
+        self.entities = EntityStore(seed=self.seed)
+        self.draw_list = DrawList(self)
+        self.animals = Animals(self)
+        self.animals.spawn(self.settings.animal_count, self.BG)
+        self.pathfinder = Pathfinder(self)  # Walks entities around solid tiles
+
+    def setup_player(self):
+        """
+        Initialize the player and set initial values.
+        """
+        self.player = Player(self)
+
+    def setup_farm(self):
+        """
+        Set up the soil and crops drawn on top of the tile map.
+        """
+        self.farm = Farm(self)
+
+    def setup_renderer(self):
+        """
+        Choose between redrawing the full screen or only the dirty rects.
+        """
+        if self.settings.dirty_rect_rendering:
+            self.renderer = DirtyRectRenderer(self)
+        else:
+            self.renderer = Renderer(self)
+
+    def update_tiles(self):
+        """
+        Update the game tiles (animated tiles on screen, crops whose
+        timers ran out and the light of the time of day) and the particles.
+        """
+        self.BG.update_animated_tiles(self.sim_time, self.camera.get_rect())
+        self.farm.update(self.sim_time)
+        self.lighting.update(self.sim_time)
+        self.particles.update(self.sim_time)
+
+    def update_player(self):
+        """
+        Update the player's state.
+        """
+        self.player.check_idle()
+        self.player.update_player_pos()
+        if self.coop is None:
+            self.player.use_tools()
+        else:
+            # The server does the farming, the player only walks ahead of it
+            self.coop.send_input(*self.player.get_input())
+            self.player.actions = 0
+
+    def update_entities(self):
+        """
+        Steer the entities that walk to a goal, then move and animate every
+        entity (player included) in one batch.
+        """
+        self.pathfinder.update()
+        self.entities.update(self.settings.sim_step_ms, self.BG)
+
+    def draw_entities(self, alpha=1.0):
+        """
+        Draw the entities and props inside the camera viewport, sorted by
+        where they stand, then queue the particles.
+
+        :param alpha: How far the frame is between the last two simulation steps.
+        """
+        view = self.camera.get_rect()
+        self.draw_list.draw(self.renderer, view, alpha)
+        self.particles.draw(self.renderer, view, alpha)
+
+    def get_events(self):
+        """
+        Returns the input events of this simulation step: the recorded ones
+        during a replay, otherwise pygame's (logged if input is recorded).
+        """
+        if self.replay is not None:
+            pygame.event.pump()  # Keep the window responsive
+            return self.replay.get_events(self.sim_steps)
+
+        events = pygame.event.get()
+        if self.recorder is not None:
+            self.recorder.record_events(self.sim_steps, events)
+        return events
+
+    def handle_events(self):
+        """
+        Handle all game-related events (key presses, window close, etc.).
+        """
+        for event in self.get_events():
+            if event.type == pygame.QUIT:
+                # Write a last checkpoint before leaving, unless it would
+                # replace a save this session never loaded
+                if self.recorder is not None:
+                    self.recorder.close()
+                if not self.save_system.unloaded_save:
+                    self.save_system.save()
+                self.save_system.wait()
+                self.assets.shutdown()
+                sys.exit()
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F5:
+                    self.save_system.save()
+                elif event.key == pygame.K_F9:
+                    self.load_game()
+                elif event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                elif event.key == pygame.K_F4:
+                    self.profiler.export()  # Listed on the profiler overlay
+                self.player.handle_down_events(event)
+            if event.type == pygame.KEYUP:
+                self.player.handle_up_events(event)
+
+    def load_game(self):
+        """
+        Loads the latest checkpoint. A missing or damaged save leaves the game
+        as it was and says why on screen.
+        """
+        try:
+            if not self.save_system.load():
+                self.show_message("There is no save to load")
+        except ValueError as error:
+            self.show_message(f"Could not load the save: {error}")
+
+    def show_message(self, text):
+        """
+        Shows a line of text at the bottom of the screen for a few seconds.
+        """
+        line = pygame.font.Font(None, 24).render(text, True, MESSAGE_COLOR)
+        panel = pygame.Surface(
+            (line.get_width() + 8, line.get_height() + 8), pygame.SRCALPHA
+        )
+        panel.fill(MESSAGE_BACKGROUND)
+        panel.blit(line, (4, 4))
+        self.message = panel, pygame.time.get_ticks() + MESSAGE_TIME
+
+    def simulate(self):
+        """
+        Advance the simulation by one fixed timestep.
+        """
+        profiler = self.profiler
+
+        # Handle events (e.g., key presses, window events)
+        self.handle_events()
+        profiler.mark(EVENTS)
+
+        # Update the world
+        self.update_player()
+        profiler.mark(PLAYER)
+        self.update_entities()
+        profiler.mark(ENTITIES)
+        self.update_tiles()
+
+        self.sim_time += self.settings.sim_step_ms
+        self.sim_steps += 1
+        self.save_system.update(self.sim_time)
+        profiler.mark(WORLD)
+
+    def render(self, alpha):
+        """
+        Draw the world, interpolated between the last two simulation steps.
+
+        :param alpha: Fraction of a timestep since the last simulation step.
+        """
+        profiler = self.profiler
+
+        # Bake the tile edits of this frame into the cached chunks
+        self.BG.flush_edits()
+
+        # Keep the camera centered on where the player is drawn
+        self.camera.follow(*self.player.get_center(alpha))
+
+        # Draw the background, then the player, animals and props on top of
+        # it (the renderer finishes with the overhead tiles)
+        self.renderer.begin_frame()
+        profiler.mark(BACKGROUND)
+        self.draw_entities(alpha)
+        profiler.mark(SPRITES)
+
+        # Refresh the display
+        if self.message is not None:
+            panel, hide_at = self.message
+            if pygame.time.get_ticks() < hide_at:
+                _, height = self.settings.get_render_size()
+                self.renderer.draw_overlay(panel, (8, height - panel.get_height() - 8))
+            else:
+                self.message = None
+        profiler.draw_overlay(self.renderer)
+        self.renderer.end_frame()
+        profiler.mark(PRESENT)
+
+    def run_frame(self):
+        """
+        Run a single frame of the game loop: as many fixed simulation steps
+        as the elapsed time calls for, then one render.
+        """
+        self.profiler.begin_frame()
+        replayed = self.replay.next_frame() if self.replay is not None else None
+        if replayed is not None:
+            # Split the simulation into frames exactly as when recorded
+            steps, alpha = replayed
+            for _ in range(steps):
+                self.simulate()
+        else:
+            if self.replay is not None:
+                # The recording ran out: hand control back to live input
+                self.replay = None
+                self.accumulator = 0.0
+            step = self.settings.sim_step_ms
+            steps = 0
+            while self.accumulator >= step and steps < self.settings.max_sim_steps:
+                self.simulate()
+                self.accumulator -= step
+                steps += 1
+
+            # On slow machines drop the time we cannot catch up on (the game
+            # slows down instead of spiralling into ever longer frames)
+            if steps == self.settings.max_sim_steps:
+                self.accumulator %= step
+
+            alpha = self.accumulator / step
+            if self.recorder is not None:
+                self.recorder.record_frame(steps, alpha)
+
+        # Pick up the sheets the loader threads finished
+        self.assets.update()
+        self.profiler.mark(ASSETS)
+
+        self.render(alpha)
+
+        # Control the frame rate and measure how much time passed
+        self.accumulator += self.clock.tick(self.settings.fps)
+        self.profiler.mark(TICK)
+        self.profiler.end_frame()
+
+    def run_game(self):
+        """
+        Run the main game loop.
+        """
+        while True:
+            self.run_frame()
+
+
+# --- Entry Point ---
+if __name__ == "__main__":
+    game = StardewValley2()
+    game.run_game()
@@ -0,0 +1,191 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+# --- Binary Map Layout ---
+# Header: magic, version, layer count, width and height in tiles.
+# Followed by one 16 byte name per layer, then one little-endian uint16
+# array of width * height tiles per layer, stored row by row.
+MAGIC = b"SVMP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+LAYER_NAME = struct.Struct("16s")
+TILE_DTYPE = np.dtype("<u2")
+
+# The JSON format only ever had one unnamed layer
+JSON_LAYER_KEY = "tilemap"
+DEFAULT_LAYER = "ground"
+# Layers a map can have besides the ground (see tile_system.LAYER_TILES)
+DECOR_LAYER, PROPS_LAYER, OVERHEAD_LAYER = "decor", "props", "overhead"
+
+
+def get_data_offset(layer_count):
+    """
+    Returns the byte offset of the first layer array in a binary map.
+    """
+    return HEADER.size + LAYER_NAME.size * layer_count
+
+
+def write_map(path, layers):
+    """
+    Writes tile layers to a binary map file.
+
+    :param path: Destination file path.
+    :param layers: Dictionary mapping layer names to 2D arrays of tile ids.
+    """
+    arrays = {
+        name: np.asarray(tiles, dtype=TILE_DTYPE) for name, tiles in layers.items()
+    }
+    height, width = next(iter(arrays.values())).shape
+    for name, tiles in arrays.items():
+        if tiles.shape != (height, width):
+            raise ValueError(f"Layer '{name}' does not match the map size")
+    write_map_bands(path, list(arrays), width, height, [(0, arrays)])
+
+
+def write_map_bands(path, names, width, height, bands):
+    """
+    Writes a binary map file band by band, so maps far bigger than memory can
+    be written while they are generated.
+
+    :param path: Destination file path.
+    :param names: Names of the layers, in file order.
+    :param width: Map width in tiles.
+    :param height: Map height in tiles.
+    :param bands: Iterable of (first row, {layer name: 2D array}) pairs. Every
+                  band spans the full map width; together they cover every row.
+    :raises ValueError: If a band does not fit the map or a row is missing. The
+                        file at path is only replaced by a complete map.
+    """
+    for name in names:
+        if len(name.encode("ascii")) > LAYER_NAME.size:
+            raise ValueError(
+                f"Layer name '{name}' is longer than {LAYER_NAME.size} bytes"
+            )
+
+    offset = get_data_offset(len(names))
+    layer_bytes = width * height * TILE_DTYPE.itemsize
+    row_bytes = width * TILE_DTYPE.itemsize
+    covered = np.zeros(height, dtype=bool)  # Rows written by some band
+
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "wb") as map_file:
+            map_file.write(HEADER.pack(MAGIC, VERSION, len(names), width, height))
+            for name in names:
+                map_file.write(LAYER_NAME.pack(name.encode("ascii")))
+            map_file.truncate(offset + layer_bytes * len(names))
+
+            for first_row, layers in bands:
+                arrays = [np.asarray(layers[name], dtype=TILE_DTYPE) for name in names]
+                rows = len(arrays[0])
+                for index, (name, tiles) in enumerate(zip(names, arrays)):
+                    if (
+                        tiles.shape != (rows, width)
+                        or first_row < 0
+                        or first_row + rows > height
+                    ):
+                        raise ValueError(f"Layer '{name}' does not match the map size")
+                    map_file.seek(offset + index * layer_bytes + first_row * row_bytes)
+                    map_file.write(np.ascontiguousarray(tiles).tobytes())
+                covered[first_row : first_row + rows] = True
+
+        if not covered.all():
+            raise ValueError(f"Row {np.argmin(covered)} of the map has no tiles")
+        os.replace(temp_path, path)
+    except BaseException:
+        # Leave whatever map was there before
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_header(path):
+    """
+    Reads the header of a binary map file.
+
+    :return: Tuple (layer names, width, height).
+    """
+    with open(path, "rb") as map_file:
+        magic, version, layer_count, width, height = HEADER.unpack(
+            map_file.read(HEADER.size)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary tile map")
+        if version != VERSION:
+            raise ValueError(f"Unsupported tile map version {version} in {path}")
+
+        names = [
+            LAYER_NAME.unpack(map_file.read(LAYER_NAME.size))[0]
+            .rstrip(b"\0")
+            .decode("ascii")
+            for _ in range(layer_count)
+        ]
+    return names, width, height
+
+
+def read_map(path):
+    """
+    Opens a binary map file as memory-mapped arrays. Tiles are only read from
+    disk when they are accessed, so opening a huge map costs almost nothing.
+
+    :return: Dictionary mapping layer names to read-only (height, width) arrays.
+    """
+    names, width, height = read_header(path)
+    offset = get_data_offset(len(names))
+    layer_bytes = width * height * TILE_DTYPE.itemsize
+
+    return {
+        name: np.memmap(
+            path,
+            dtype=TILE_DTYPE,
+            mode="r",
+            offset=offset + index * layer_bytes,
+            shape=(height, width),
+        )
+        for index, name in enumerate(names)
+    }
+
+
+def read_json_map(path):
+    """
+    Reads a tile map from the original JSON format.
+
+    :return: Dictionary mapping layer names to (height, width) arrays.
+    """
+    with open(path) as map_file:
+        data = json.load(map_file)
+
+    # Maps written by the converter keep every layer under "layers"
+    if "layers" in data:
+        return {
+            name: np.asarray(tiles, dtype=TILE_DTYPE)
+            for name, tiles in data["layers"].items()
+        }
+    return {DEFAULT_LAYER: np.asarray(data[JSON_LAYER_KEY], dtype=TILE_DTYPE)}
+
+
+def write_json_map(path, layers):
+    """
+    Writes tile layers to the JSON format. A map with only the default layer
+    is written in the original {"tilemap": [...]} shape.
+    """
+    lists = {name: np.asarray(tiles).tolist() for name, tiles in layers.items()}
+    if list(lists) == [DEFAULT_LAYER]:
+        data = {JSON_LAYER_KEY: lists[DEFAULT_LAYER]}
+    else:
+        data = {"layers": lists}
+
+    with open(path, "w") as map_file:
+        json.dump(data, map_file)
+
+
+def load_map(binary_path, json_path):
+    """
+    Loads the tile layers, preferring the binary map and falling back to JSON.
+    """
+    if binary_path is not None and os.path.exists(binary_path):
+        return read_map(binary_path)
+    return read_json_map(json_path)
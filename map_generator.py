@@ -0,0 +1,209 @@
+import numpy as np
+
+from map_format import DECOR_LAYER, DEFAULT_LAYER, PROPS_LAYER, TILE_DTYPE
+
+# --- Ground Tiles ---
+# Tile ids in sprites/2/Texture/grass.png (7 columns): the first four columns
+# of the top four rows are plain grass, the last three have flowers in them
+GRASS_TILES = np.array([row * 7 + column for row in range(4) for column in range(4)])
+FLOWER_TILES = np.array(
+    [row * 7 + column for row in range(4) for column in range(4, 7)]
+)
+STONE_TILES = np.array([36, 39])  # Fully paved tiles of the stone rows
+
+# --- Decor and Props ---
+# Tile ids of the other layers, as numbered in tile_system.LAYER_TILES
+TUFT_DECOR = np.array([37, 38, 49, 50])  # Green tufts of Tufts and Lumps.png
+TREE_PROPS = np.array([1, 2, 5, 6])  # Green trees and bushes
+ROCK_PROPS = np.arange(7, 19)  # Top row of Stone and Rock.png
+LAYERS = (DEFAULT_LAYER, DECOR_LAYER, PROPS_LAYER)  # Layers that are generated
+
+# Large odd constants for hashing lattice coordinates
+HASH_X = np.uint32(0x8DA6B343)
+HASH_Y = np.uint32(0xD8163841)
+HASH_SEED = np.uint32(0x9E3779B9)
+HASH_MIX = np.uint32(0x5BD1E995)
+
+
+def hash_coords(x, y, seed):
+    """
+    Hashes integer coordinates to floats in [0, 1). The same coordinates and
+    seed always give the same value, whatever else is generated around them.
+    """
+    with np.errstate(over="ignore"):
+        h = (x.astype(np.uint32) * HASH_X) ^ (y.astype(np.uint32) * HASH_Y)
+        h ^= np.uint32(seed & 0xFFFFFFFF) * HASH_SEED
+        h ^= h >> np.uint32(13)
+        h *= HASH_MIX
+        h ^= h >> np.uint32(15)
+    return h.astype(np.float32) / np.float32(2**32)
+
+
+def value_noise(columns, rows, scale, seed):
+    """
+    Smoothly interpolated random values on a lattice with the given spacing.
+
+    :param columns: 1D array of tile columns.
+    :param rows: 1D array of tile rows.
+    :param scale: Lattice spacing in tiles (feature size).
+    :return: (len(rows), len(columns)) array of values in [0, 1).
+    """
+    x = columns / scale
+    y = rows / scale
+    cell_x, cell_y = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
+
+    # Hash only the lattice points the area touches, then look them up
+    first_x, first_y = cell_x[0], cell_y[0]
+    lattice_x = np.arange(first_x, cell_x[-1] + 2)
+    lattice_y = np.arange(first_y, cell_y[-1] + 2)
+    lattice = hash_coords(lattice_x[None, :], lattice_y[:, None], seed)
+
+    # Smoothstep the position inside the lattice cell
+    fraction_x = (x - cell_x).astype(np.float32)
+    fraction_y = (y - cell_y).astype(np.float32)
+    fraction_x = fraction_x * fraction_x * (3 - 2 * fraction_x)
+    fraction_y = (fraction_y * fraction_y * (3 - 2 * fraction_y))[:, None]
+
+    index_x = cell_x - first_x
+    index_y = (cell_y - first_y)[:, None]
+    top = lattice[index_y, index_x]
+    top += (lattice[index_y, index_x + 1] - top) * fraction_x
+    bottom = lattice[index_y + 1, index_x]
+    bottom += (lattice[index_y + 1, index_x + 1] - bottom) * fraction_x
+    return top + (bottom - top) * fraction_y
+
+
+def fractal_noise(columns, rows, scale, seed, octaves=4):
+    """
+    Sums octaves of value noise, each twice as fine and half as strong.
+
+    :return: Array of values in [0, 1).
+    """
+    total = np.zeros((len(rows), len(columns)), dtype=np.float32)
+    weight = 1.0
+    weights = 0.0
+    for octave in range(octaves):
+        total += weight * value_noise(columns, rows, scale, seed + octave)
+        weights += weight
+        weight /= 2
+        scale /= 2
+    return total / weights
+
+
+class MapGenerator:
+    def __init__(
+        self,
+        seed,
+        water_tile=64,
+        water_level=0.38,
+        stone_level=0.72,
+        flower_density=0.12,
+        terrain_scale=48,
+        foliage_scale=12,
+        forest_level=0.6,
+        tree_density=0.35,
+        rock_density=0.05,
+        tuft_density=0.08,
+        forest_scale=24,
+    ) -> None:
+        """
+        Initializes the MapGenerator class that builds tile maps from noise.
+        Every tile only depends on the seed and its own coordinates, so any
+        chunk can be generated on its own (and regenerated instead of stored).
+
+        :param seed: Seed of the world.
+        :param water_tile: Tile id of water.
+        :param water_level: Elevation below which tiles are water.
+        :param stone_level: Elevation above which tiles are stone.
+        :param flower_density: Share of grass tiles that get flowers.
+        :param terrain_scale: Size of hills and lakes in tiles.
+        :param foliage_scale: Size of flower patches in tiles.
+        :param forest_level: Forest noise above which grass is woodland.
+        :param tree_density: Share of woodland tiles with a tree or bush.
+        :param rock_density: Share of stone tiles with a rock.
+        :param tuft_density: Share of open grass tiles with a tuft.
+        :param forest_scale: Size of woods in tiles.
+        """
+        self.seed = seed
+        self.water_tile = water_tile
+        self.water_level = water_level
+        self.stone_level = stone_level
+        self.flower_density = flower_density
+        self.terrain_scale = terrain_scale
+        self.foliage_scale = foliage_scale
+        self.forest_level = forest_level
+        self.tree_density = tree_density
+        self.rock_density = rock_density
+        self.tuft_density = tuft_density
+        self.forest_scale = forest_scale
+
+    def generate_chunk(self, left, top, width, height):
+        """
+        Generates a rectangle of the world.
+
+        :return: Dictionary mapping layer names to (height, width) tile arrays.
+        """
+        columns = np.arange(left, left + width)
+        rows = np.arange(top, top + height)
+        # Each field gets its own seed so they do not line up
+        elevation = fractal_noise(columns, rows, self.terrain_scale, self.seed * 8)
+        foliage = fractal_noise(
+            columns, rows, self.foliage_scale, self.seed * 8 + 4, octaves=2
+        )
+        variation = hash_coords(columns[None, :], rows[:, None], self.seed * 8 + 6)
+        pick = hash_coords(columns[None, :], rows[:, None], self.seed * 8 + 7) * 4096
+        pick = pick.astype(np.int64)  # Random number picking the tile variant
+
+        # Plain grass everywhere, with a random variant per tile
+        tiles = GRASS_TILES[pick % len(GRASS_TILES)].astype(TILE_DTYPE)
+
+        # Flowers grow in patches where the foliage noise is highest
+        flowers = foliage > 1 - self.flower_density * 2
+        flowers &= variation < self.flower_density * 4
+        tiles[flowers] = FLOWER_TILES[pick[flowers] % len(FLOWER_TILES)]
+
+        # Hilltops are stone, low ground is water
+        stone = elevation > self.stone_level
+        tiles[stone] = STONE_TILES[pick[stone] % len(STONE_TILES)]
+        water = elevation < self.water_level
+        tiles[water] = self.water_tile
+
+        # Woods grow on the open grass, rocks lie on the stone and tufts of
+        # grass fill some of the rest
+        forest = fractal_noise(
+            columns, rows, self.forest_scale, self.seed * 8 + 2, octaves=3
+        )
+        scatter = hash_coords(columns[None, :], rows[:, None], self.seed * 8 + 3)
+        variant = pick >> 6  # Other bits of the random number than the ground's
+        grass = ~(flowers | stone | water)
+        props = np.zeros_like(tiles)
+        trees = grass & (forest > self.forest_level) & (scatter < self.tree_density)
+        props[trees] = TREE_PROPS[variant[trees] % len(TREE_PROPS)]
+        rocks = stone & (scatter < self.rock_density)
+        props[rocks] = ROCK_PROPS[variant[rocks] % len(ROCK_PROPS)]
+
+        decor = np.zeros_like(tiles)
+        tufts = grass & ~trees & (scatter > 1 - self.tuft_density)
+        decor[tufts] = TUFT_DECOR[variant[tufts] % len(TUFT_DECOR)]
+        return {DEFAULT_LAYER: tiles, DECOR_LAYER: decor, PROPS_LAYER: props}
+
+    def generate_bands(self, width, height, chunk_size=256):
+        """
+        Generates a whole map one band of chunk_size rows at a time, chunk by
+        chunk, so only one band is ever held in memory.
+
+        :return: Iterator of (first row, {layer name: band array}) pairs, as
+                 taken by map_format.write_map_bands.
+        """
+        for top in range(0, height, chunk_size):
+            band_height = min(chunk_size, height - top)
+            band = {
+                name: np.empty((band_height, width), dtype=TILE_DTYPE)
+                for name in LAYERS
+            }
+            for left in range(0, width, chunk_size):
+                chunk_width = min(chunk_size, width - left)
+                chunk = self.generate_chunk(left, top, chunk_width, band_height)
+                for name in LAYERS:
+                    band[name][:, left : left + chunk_width] = chunk[name]
+            yield top, band
@@ -0,0 +1,405 @@
+import time
+
+import numpy as np
+import pygame
+
+from entities import FEET_OFFSET
+
+# Per-particle arrays: name -> (shape of one entry, dtype)
+PARTICLE_FIELDS = {
+    "position": ((2,), np.float32),  # Center in world pixels
+    "previous_position": ((2,), np.float32),  # Position before the last step
+    "velocity": ((2,), np.float32),  # Pixels per simulation step
+    "age": ((), np.float32),  # Ms since the particle was emitted
+    "lifetime": ((), np.float32),  # Ms the particle lives
+}
+
+# --- Effects ---
+# Lengths and speeds are in pixels of the art, scaled by settings.asset_scale
+DUST_CAPACITY = 512
+DUST_SHEET = "dust"
+DUST_INTERVAL = 120  # Ms between two puffs of a walking player
+RAIN_COLOR = (175, 195, 235)
+RAIN_LENGTH = 3  # Pixels a raindrop streaks over
+RAIN_VELOCITY = (0.75, 5.5)
+
+
+class ParticlePool:
+    def __init__(self, capacity, gravity=0.0, drag=0.0) -> None:
+        """
+        Initializes the ParticlePool class that keeps up to capacity particles
+        of one kind in flat NumPy arrays allocated up front. Live particles
+        fill the first count slots; dead ones are compacted away after every
+        update, all in vectorized passes.
+
+        :param gravity: Pixels per step added to the vertical velocity every step.
+        :param drag: Fraction of the velocity lost every step.
+        """
+        self.capacity = capacity
+        self.gravity = gravity
+        self.drag = drag
+        self.count = 0
+        for name, (shape, dtype) in PARTICLE_FIELDS.items():
+            setattr(self, name, np.zeros((capacity,) + shape, dtype=dtype))
+
+    def emit(self, positions, velocities, lifetimes):
+        """
+        Adds particles. Those that do not fit in the pool are dropped.
+
+        :param positions: (n, 2) array of world positions.
+        :param velocities: (n, 2) array of velocities in pixels per step.
+        :param lifetimes: Lifetime of every particle in ms.
+        :return: Number of particles added.
+        """
+        start = self.count
+        added = min(len(positions), self.capacity - start)
+        end = start + added
+        self.position[start:end] = positions[:added]
+        self.previous_position[start:end] = positions[:added]
+        self.velocity[start:end] = velocities[:added]
+        self.age[start:end] = 0
+        self.lifetime[start:end] = lifetimes[:added]
+        self.count = end
+        return added
+
+    def update(self, step_ms):
+        """
+        Advances every particle by one simulation step and removes the ones
+        whose lifetime ran out.
+        """
+        count = self.count
+        if not count:
+            return
+
+        velocity = self.velocity[:count]
+        if self.drag:
+            velocity *= 1 - self.drag
+        if self.gravity:
+            velocity[:, 1] += self.gravity
+        self.previous_position[:count] = self.position[:count]
+        self.position[:count] += velocity
+        self.age[:count] += step_ms
+
+        # Fill the slots of the dead particles with the live ones at the end,
+        # which moves a few particles instead of compacting every array
+        alive = self.age[:count] < self.lifetime[:count]
+        dead = np.flatnonzero(~alive)
+        if len(dead):
+            kept = count - len(dead)
+            holes = dead[: np.searchsorted(dead, kept)]
+            movers = kept + np.flatnonzero(alive[kept:])
+            for name in PARTICLE_FIELDS:
+                array = getattr(self, name)
+                array[holes] = array[movers]
+            self.count = kept
+
+    def get_visible(self, view, alpha, margin):
+        """
+        Returns the particles inside a rect, interpolated between the last
+        two simulation steps.
+
+        :param view: Rect in world coordinates.
+        :param margin: Pixels a particle reaches from its center.
+        :return: Tuple (indices, (n, 2) array of positions).
+        """
+        count = self.count
+        previous = self.previous_position[:count]
+        position = previous + (self.position[:count] - previous) * alpha
+        x, y = position[:, 0], position[:, 1]
+        inside = np.flatnonzero(
+            (x > view.left - margin)
+            & (x < view.right + margin)
+            & (y > view.top - margin)
+            & (y < view.bottom + margin)
+        )
+        return inside, position[inside]
+
+
+def get_bounds(positions, reach):
+    """
+    Returns the rect around screen positions, grown by reach pixels.
+    """
+    # Per column: a reduction along axis 0 of an (n, 2) array is much slower
+    xs, ys = positions[:, 0], positions[:, 1]
+    left, right, top, bottom = xs.min(), xs.max(), ys.min(), ys.max()
+    return pygame.Rect(
+        int(left) - reach,
+        int(top) - reach,
+        int(right - left) + reach * 2 + 1,
+        int(bottom - top) + reach * 2 + 1,
+    )
+
+
+class Particles:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Particles class that runs the particle effects
+        (footstep dust, rain).
+
+        Every effect has a ParticlePool, updated once per simulation step.
+        Drawing is queued on the renderer as one effect per pool: sprite
+        particles go to the screen in a single Surface.blits call, raindrops
+        are written straight into the screen pixels, so no Python object is
+        made per raindrop.
+
+        At most budget particles are drawn per frame; when more are visible
+        an evenly spread share of every pool is drawn. The budget shrinks
+        while drawing the particles takes longer than
+        settings.particle_time_ms and grows back when it is cheap again.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.random = np.random.default_rng(game.seed)
+        self.scale = self.settings.asset_scale  # World pixels per pixel of the art
+        self.rain_length = RAIN_LENGTH * self.scale
+        self.rain_velocity = np.array(RAIN_VELOCITY, dtype=np.float32) * self.scale
+        self.rain_surface = None  # 32 bit copy of screens that are not 32 bit
+
+        # --- Pools ---
+        self.dust = ParticlePool(DUST_CAPACITY, gravity=-0.01 * self.scale, drag=0.08)
+        self.rain = ParticlePool(self.settings.rain_capacity)
+        self.rain_drops = min(self.settings.rain_drops, self.rain.capacity)
+        self.next_dust = 0.0  # Simulation time of the next footstep puff
+
+        # --- Budget ---
+        self.budget = self.settings.particle_budget  # Particles drawn per frame
+        self.draw_time = 0.0  # Seconds spent drawing particles this frame
+        self.drawn = 0  # Particles drawn last frame
+
+    # --- Effects ---
+    def emit_dust(self, x, y, count=3):
+        """
+        Puffs a little dust around a point on the ground.
+        """
+        random = self.random
+        scale = self.scale
+        positions = np.column_stack(
+            (random.normal(x, 2 * scale, count), random.normal(y, scale, count))
+        )
+        velocities = np.column_stack(
+            (
+                random.normal(0, 0.2 * scale, count),
+                random.uniform(-0.3 * scale, -0.05 * scale, count),
+            )
+        )
+        self.dust.emit(positions, velocities, random.uniform(300, 500, count))
+
+    def set_rain(self, drops):
+        """
+        Sets how many raindrops keep falling around the camera (0 stops the
+        rain; the drops already falling finish their fall).
+        """
+        self.rain_drops = min(drops, self.rain.capacity)
+
+    def emit_rain(self):
+        """
+        Replaces the raindrops that landed, anywhere in and just around the
+        camera viewport.
+        """
+        missing = self.rain_drops - self.rain.count
+        if missing <= 0:
+            return
+        random = self.random
+        view = self.game.camera.get_rect().inflate(32 * self.scale, 32 * self.scale)
+        positions = np.column_stack(
+            (
+                random.uniform(view.left, view.right, missing),
+                random.uniform(view.top, view.bottom, missing),
+            )
+        )
+        velocities = np.broadcast_to(self.rain_velocity, (missing, 2))
+        self.rain.emit(positions, velocities, random.uniform(250, 650, missing))
+
+    # --- Updates ---
+    def update(self, sim_time):
+        """
+        Emits and advances every particle by one simulation step.
+
+        :param sim_time: Simulation time in milliseconds.
+        """
+        step_ms = self.settings.sim_step_ms
+        entities = self.game.entities
+        player = self.game.player.entity
+        if (
+            self.settings.footstep_dust
+            and entities.velocity[player].any()
+            and sim_time >= self.next_dust
+        ):
+            self.next_dust = sim_time + DUST_INTERVAL
+            x, y = (
+                entities.position[player]
+                + entities.sizes[entities.kind[player]] * FEET_OFFSET
+            )
+            self.emit_dust(float(x), float(y))
+
+        self.emit_rain()
+        self.dust.update(step_ms)
+        self.rain.update(step_ms)
+
+    # --- Drawing ---
+    def draw(self, renderer, view, alpha=1.0):
+        """
+        Queues the visible particles on the renderer, within the budget.
+
+        :param renderer: Renderer to draw with.
+        :param view: Camera viewport as a rect in world coordinates.
+        :param alpha: How far the frame is between the last two simulation steps.
+        """
+        self.adjust_budget()
+        start = time.perf_counter()
+
+        dust_frames = (
+            self.game.assets.get_frames(DUST_SHEET) if self.dust.count else None
+        )
+        dust_reach = dust_frames[0].get_width() // 2 if dust_frames else 0
+        dust, dust_positions = self.dust.get_visible(view, alpha, dust_reach)
+        rain, rain_positions = self.rain.get_visible(view, alpha, self.rain_length)
+        if dust_frames is None:
+            dust, dust_positions = dust[:0], dust_positions[:0]
+
+        # Share the budget between the pools by how many particles they show
+        visible = len(dust) + len(rain)
+        if visible > self.budget:
+            share = self.budget / visible
+            dust, dust_positions = self.thin(dust, dust_positions, share)
+            rain, rain_positions = self.thin(rain, rain_positions, share)
+        self.drawn = len(dust) + len(rain)
+
+        camera = np.array((view.left, view.top), dtype=np.float32)
+        if len(dust):
+            self.queue_dust(renderer, dust, dust_positions - camera, dust_frames)
+        if len(rain):
+            self.queue_rain(renderer, rain_positions - camera)
+        self.draw_time += time.perf_counter() - start
+
+    def thin(self, indices, positions, share):
+        """
+        Keeps an evenly spread share of some particles.
+        """
+        keep = int(len(indices) * share)
+        picked = np.linspace(0, len(indices) - 1, keep).astype(np.int64)
+        return indices[picked], positions[picked]
+
+    def adjust_budget(self):
+        """
+        Shrinks the budget to what should have fit in the time after a frame
+        whose particles took too long to draw, and grows it back slowly
+        otherwise.
+        """
+        limit = self.settings.particle_budget
+        draw_ms = self.draw_time * 1000
+        if draw_ms > self.settings.particle_time_ms:
+            fitting = self.drawn * self.settings.particle_time_ms / draw_ms
+            self.budget = max(int(fitting * 0.9), limit // 20)
+        elif self.budget < limit:
+            self.budget = min(self.budget + limit // 50, limit)
+        self.draw_time = 0.0
+
+    def queue_dust(self, renderer, indices, positions, frames):
+        """
+        Queues the dust particles as one batch of sprites, each showing the
+        frame of the sheet that matches its age.
+        """
+        pool = self.dust
+        progress = pool.age[indices] / pool.lifetime[indices]
+        frame_indices = np.minimum(
+            (progress * len(frames)).astype(np.int64), len(frames) - 1
+        )
+        half = frames[0].get_width() // 2, frames[0].get_height() // 2
+        topleft = (positions - half).astype(np.int64)
+        batch = list(
+            zip(map(frames.__getitem__, frame_indices.tolist()), topleft.tolist())
+        )
+
+        def draw(screen):
+            start = time.perf_counter()
+            screen.blits(batch, doreturn=False)
+            self.draw_time += time.perf_counter() - start
+
+        renderer.draw_effect(draw, get_bounds(positions, max(half)))
+
+    def queue_rain(self, renderer, positions):
+        """
+        Queues the raindrops as short streaks written into the screen pixels.
+        """
+        positions = positions.astype(np.int64)
+
+        def draw(screen):
+            start = time.perf_counter()
+            self.draw_streaks(screen, positions)
+            self.draw_time += time.perf_counter() - start
+
+        renderer.draw_effect(draw, get_bounds(positions, self.rain_length))
+
+    def draw_streaks(self, screen, positions):
+        """
+        Blends raindrop streaks half into the screen, inside its clip rect.
+        Pixels are blended whole: both colors lose their lowest bit per
+        channel, are halved and added.
+        """
+        if screen.get_bytesize() != 4:
+            # Pixels of other sizes cannot be written as uint32
+            self.blit_streaks(screen, positions)
+            return
+
+        steps = self.get_streak_steps()
+        clip = screen.get_clip()
+        masks = screen.get_masks()[:3]
+        keep = (masks[0] | masks[1] | masks[2]) & ~sum(mask & -mask for mask in masks)
+        color = np.uint32((screen.map_rgb(RAIN_COLOR) & keep) >> 1)
+        keep = np.uint32(keep)
+
+        # Streaks wholly inside the clip rect need no check per pixel
+        xs, ys = positions[:, 0], positions[:, 1]
+        last_x, last_y = steps[-1]
+        inside = (
+            (xs >= clip.left)
+            & (xs + last_x < clip.right)
+            & (ys >= clip.top)
+            & (ys + last_y < clip.bottom)
+        )
+        edge = positions[~inside]
+
+        buffer = screen.get_buffer()  # Locks the screen
+        pixels = np.frombuffer(buffer, dtype=np.uint32)
+        row = screen.get_pitch() // 4
+        starts = ys[inside] * row + xs[inside]
+        for step_x, step_y in steps:
+            indices = starts + (step_y * row + step_x)
+            pixels[indices] = ((pixels[indices] & keep) >> 1) + color
+        for step_x, step_y in steps:
+            xs = edge[:, 0] + step_x
+            ys = edge[:, 1] + step_y
+            visible = (
+                (xs >= clip.left)
+                & (xs < clip.right)
+                & (ys >= clip.top)
+                & (ys < clip.bottom)
+            )
+            indices = ys[visible] * row + xs[visible]
+            pixels[indices] = ((pixels[indices] & keep) >> 1) + color
+        del pixels, buffer  # Unlocks the screen
+
+    def get_streak_steps(self):
+        """
+        Returns the (x, y) offsets of the pixels of a raindrop streak.
+        """
+        slant = RAIN_VELOCITY[0] / RAIN_VELOCITY[1]
+        return [(int(offset * slant), offset) for offset in range(self.rain_length)]
+
+    def blit_streaks(self, screen, positions):
+        """
+        Blends the raindrop streaks into screens whose pixels are not 32 bit
+        (16 and 24 bit displays): the clip rect of the screen is copied to a
+        32 bit surface, the streaks are written into its pixels and it is
+        blitted back, two blits per frame whatever the number of drops.
+        """
+        clip = screen.get_clip()
+        if not clip.width or not clip.height:
+            return
+        if self.rain_surface is None or self.rain_surface.get_size() != clip.size:
+            self.rain_surface = pygame.Surface(clip.size, 0, 32)
+        surface = self.rain_surface
+        surface.blit(screen, (0, 0), clip)
+        self.draw_streaks(surface, positions - clip.topleft)
+        screen.blit(surface, clip)
@@ -0,0 +1,512 @@
+import heapq
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from entities import DOWN, FEET_OFFSET, LEFT, NAVIGATE, RIGHT, UP, WANDER
+from tile_system import DECOR, OVERHEAD, SOLID
+
+# --- Grid Moves ---
+# Steps to the neighbouring cells, in the order of the entity directions
+MOVES = ((0, 1), (0, -1), (-1, 0), (1, 0))  # DOWN, UP, LEFT, RIGHT
+NO_DIRECTION = -1  # Flow field direction of the goal and unreachable cells
+
+# Searches run as generators that stop after this many expanded cells to
+# check the budget of the simulation step
+SEARCH_SLICE = 64
+
+# Keys of running searches
+PATH, FLOW = "path", "flow"
+
+
+def search_path(attributes, start, goal, max_cells):
+    """
+    A* search for the shortest route between two cells, moving between
+    neighbouring cells that are not solid. It is a generator that yields
+    (cells expanded, area looked at so far) every SEARCH_SLICE cells, so the
+    search can be spread over several simulation steps and only restarted
+    when a tile it already looked at is edited.
+
+    :param attributes: Attribute flags of every map cell (Tile_Map.attributes).
+    :param start: (tile_x, tile_y) to start from; it may be solid itself.
+    :param goal: (tile_x, tile_y) to reach.
+    :param max_cells: Cells expanded before the goal counts as unreachable.
+    :return: Tuple (route, area). The route lists every cell from start to
+             goal, it is empty if the goal cannot be reached. Area is the
+             inclusive block (first_x, first_y, last_x, last_y) holding every
+             cell the search looked at: only tile edits inside it can change
+             the route.
+    """
+    height, width = attributes.shape
+    cells = memoryview(np.ascontiguousarray(attributes).reshape(-1))
+    goal_x, goal_y = goal
+    first_x = last_x = start[0]
+    first_y = last_y = start[1]
+
+    # Cells are flat indices into the map
+    start_index = start[1] * width + start[0]
+    goal_index = goal_y * width + goal_x
+    came_from = {start_index: -1}
+    cost = {start_index: 0}
+    distance = abs(start[0] - goal_x) + abs(start[1] - goal_y)
+    # Ties on the estimate go to the cell closer to the goal
+    frontier = [(distance, distance, 0, start_index)]
+    push, pop = heapq.heappush, heapq.heappop
+    last_row = (height - 1) * width
+    expanded = 0
+    while frontier and expanded < max_cells:
+        _, _, step_cost, index = pop(frontier)
+        if index == goal_index:
+            route = []
+            while index >= 0:
+                route.append((index % width, index // width))
+                index = came_from[index]
+            route.reverse()
+            break
+        if step_cost > cost[index]:
+            continue  # Reached again on a shorter route since it was queued
+
+        y, x = divmod(index, width)
+        if x < first_x:
+            first_x = x
+        elif x > last_x:
+            last_x = x
+        if y < first_y:
+            first_y = y
+        elif y > last_y:
+            last_y = y
+        step_cost += 1
+        for neighbour, inside in (
+            (index + width, index < last_row),
+            (index - width, index >= width),
+            (index - 1, x > 0),
+            (index + 1, x < width - 1),
+        ):
+            if (
+                inside
+                and not cells[neighbour] & SOLID
+                and step_cost < cost.get(neighbour, step_cost + 1)
+            ):
+                cost[neighbour] = step_cost
+                came_from[neighbour] = index
+                estimate = abs(neighbour % width - goal_x) + abs(
+                    neighbour // width - goal_y
+                )
+                push(frontier, (step_cost + estimate, estimate, step_cost, neighbour))
+
+        expanded += 1
+        if not expanded % SEARCH_SLICE:
+            yield SEARCH_SLICE, (
+                max(first_x - 1, 0),
+                max(first_y - 1, 0),
+                min(last_x + 1, width - 1),
+                min(last_y + 1, height - 1),
+            )
+    else:
+        route = []
+
+    # The neighbours of the expanded cells were looked at too
+    area = (
+        max(min(first_x, goal_x) - 1, 0),
+        max(min(first_y, goal_y) - 1, 0),
+        min(max(last_x, goal_x) + 1, width - 1),
+        min(max(last_y, goal_y) + 1, height - 1),
+    )
+    return route, area
+
+
+def search_flow_field(attributes, goal, radius):
+    """
+    Breadth-first search outwards from a goal over the cells within radius
+    of it. Like search_path it is a generator yielding (cells expanded, area
+    looked at); it reads the whole block when it starts.
+
+    :return: FlowField of the searched block.
+    """
+    height, width = attributes.shape
+    goal_x, goal_y = goal
+    area = (
+        max(goal_x - radius, 0),
+        max(goal_y - radius, 0),
+        min(goal_x + radius, width - 1),
+        min(goal_y + radius, height - 1),
+    )
+    first_x, first_y, last_x, last_y = area
+    window = attributes[first_y : last_y + 1, first_x : last_x + 1]
+    rows, columns = window.shape
+    walkable = ((window & SOLID) == 0).ravel().tolist()
+
+    # Cells are flat indices into the block
+    distance = [-1] * (rows * columns)
+    goal_index = (goal_y - first_y) * columns + goal_x - first_x
+    queue = deque()
+    if walkable[goal_index]:
+        distance[goal_index] = 0
+        queue.append(goal_index)
+
+    last_row = (rows - 1) * columns
+    expanded = 0
+    while queue:
+        index = queue.popleft()
+        step = distance[index] + 1
+        column = index % columns
+        for neighbour, inside in (
+            (index + columns, index < last_row),
+            (index - columns, index >= columns),
+            (index - 1, column > 0),
+            (index + 1, column < columns - 1),
+        ):
+            if inside and walkable[neighbour] and distance[neighbour] < 0:
+                distance[neighbour] = step
+                queue.append(neighbour)
+
+        expanded += 1
+        if not expanded % SEARCH_SLICE:
+            yield SEARCH_SLICE, area
+
+    return FlowField(goal, area, np.array(distance).reshape(rows, columns))
+
+
+class FlowField:
+    def __init__(self, goal, area, distance) -> None:
+        """
+        Initializes the FlowField class: for every cell around a goal, the
+        direction of the next step on a shortest route to it. It is searched
+        once and shared by every entity heading there.
+
+        :param goal: (tile_x, tile_y) of the goal.
+        :param area: Inclusive block (first_x, first_y, last_x, last_y) covered.
+        :param distance: Steps from every cell of the block to the goal, -1
+                         where the goal cannot be reached.
+        """
+        self.goal = goal
+        self.area = area
+        self.distance = distance
+
+        # Step towards the neighbour one step closer to the goal; the first
+        # direction in MOVES order wins ties
+        rows, columns = distance.shape
+        padded = np.pad(distance, 1, constant_values=-1)
+        self.direction = np.full(distance.shape, NO_DIRECTION, dtype=np.int8)
+        for direction in reversed(range(len(MOVES))):
+            dx, dy = MOVES[direction]
+            neighbour = padded[1 + dy : 1 + dy + rows, 1 + dx : 1 + dx + columns]
+            closer = (distance > 0) & (neighbour == distance - 1)
+            self.direction[closer] = direction
+
+    def get_directions(self, tile_x, tile_y):
+        """
+        Returns the direction to step in from many cells at once, NO_DIRECTION
+        at the goal, outside the field or where the goal cannot be reached.
+        """
+        first_x, first_y, last_x, last_y = self.area
+        inside = (
+            (tile_x >= first_x)
+            & (tile_x <= last_x)
+            & (tile_y >= first_y)
+            & (tile_y <= last_y)
+        )
+        directions = np.full(len(tile_x), NO_DIRECTION, dtype=np.int8)
+        directions[inside] = self.direction[
+            tile_y[inside] - first_y, tile_x[inside] - first_x
+        ]
+        return directions
+
+
+class Pathfinder:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Pathfinder class that walks entities around solid
+        tiles (water, fences, buildings) to a goal.
+
+        A single entity follows an A* route. Routes are cached by start and
+        goal, and a cached route is only dropped when a tile inside the area
+        its search looked at is edited. Many entities heading to one goal
+        (the barn at night, the shipping bin) share a flow field, searched
+        once for all of them.
+
+        Searches run in update(), at most settings.path_budget expanded cells
+        per simulation step; a longer search carries on in the next steps and
+        its entities wait until it is done. The budget counts cells rather
+        than milliseconds so that replays (see replay.py) stay deterministic.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.tile_map = game.BG
+        self.entities = game.entities
+
+        # --- Caches ---
+        # Least recently used first
+        self.paths = OrderedDict()  # (start, goal) -> (route, area)
+        self.flow_fields = OrderedDict()  # goal -> FlowField
+        # (PATH or FLOW, key) -> [running search, area it looked at or None]
+        self.searches = OrderedDict()
+
+        # --- Agents ---
+        self.routes = {}  # Entity -> [goal, path key, route, index of next cell]
+        self.flocks = {}  # Goal -> [entity ids, flow field they follow]
+
+        self.tile_map.edit_listeners.append(self.on_tiles_edited)
+
+    # --- Searches ---
+    def start_search(self, key):
+        kind, target = key
+        attributes = self.tile_map.attributes
+        if kind == PATH:
+            start, goal = target
+            search = search_path(attributes, start, goal, self.settings.path_max_cells)
+        else:
+            search = search_flow_field(
+                attributes, target, self.settings.flow_field_radius
+            )
+        return [search, None]  # It looks at no cell until it first runs
+
+    def find_path(self, start, goal):
+        """
+        Returns the cached route between two cells, or starts searching for it.
+
+        :return: List of cells from start to goal, an empty list if the goal
+                 cannot be reached, or None while the search is running.
+        """
+        key = (start, goal)
+        cached = self.paths.get(key)
+        if cached is not None:
+            self.paths.move_to_end(key)
+            return cached[0]
+        if (PATH, key) not in self.searches:
+            self.searches[PATH, key] = self.start_search((PATH, key))
+        return None
+
+    def get_flow_field(self, goal):
+        """
+        Returns the flow field towards a cell, or None while it is searched.
+        """
+        field = self.flow_fields.get(goal)
+        if field is not None:
+            self.flow_fields.move_to_end(goal)
+            return field
+        if (FLOW, goal) not in self.searches:
+            self.searches[FLOW, goal] = self.start_search((FLOW, goal))
+        return None
+
+    def run_searches(self):
+        """
+        Advances the running searches, oldest first, until the budget of the
+        simulation step is spent.
+        """
+        budget = self.settings.path_budget
+        while self.searches and budget > 0:
+            key, search = next(iter(self.searches.items()))
+            try:
+                while budget > 0:
+                    expanded, search[1] = next(search[0])
+                    budget -= expanded
+            except StopIteration as done:
+                del self.searches[key]
+                self.store(key, done.value)
+
+    def store(self, key, result):
+        kind, target = key
+        if kind == PATH:
+            cache, size = self.paths, self.settings.path_cache_size
+        else:
+            cache, size = self.flow_fields, self.settings.flow_field_cache
+        cache[target] = result
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    def on_tiles_edited(self, layer, first_x, first_y, last_x, last_y):
+        """
+        Tile_Map edit listener: drops the routes and flow fields whose search
+        looked at an edited cell, and starts the running searches that looked
+        at one over on the new tiles. Decor and overhead tiles do not block
+        anyone.
+        """
+        if layer in (DECOR, OVERHEAD):
+            return
+
+        def touches(area):
+            return (
+                area[0] <= last_x
+                and area[2] >= first_x
+                and area[1] <= last_y
+                and area[3] >= first_y
+            )
+
+        for key in [key for key, (_, area) in self.paths.items() if touches(area)]:
+            del self.paths[key]
+        for goal in [
+            goal for goal, field in self.flow_fields.items() if touches(field.area)
+        ]:
+            del self.flow_fields[goal]
+        for key, (_, area) in self.searches.items():
+            if area is not None and touches(area):
+                self.searches[key] = self.start_search(key)
+
+    # --- Agents ---
+    def move_to(self, entity, goal):
+        """
+        Walks an entity along an A* route to a cell. It stands still on
+        arrival (or if the goal cannot be reached) until it is sent on or
+        released.
+        """
+        self.release(entity)
+        self.entities.behaviour[entity] = NAVIGATE
+        self.routes[entity] = [goal, None, None, 0]
+
+    def gather(self, ids, goal):
+        """
+        Walks many entities to one cell along a shared flow field. Entities
+        further than settings.flow_field_radius from the goal stand still.
+        """
+        ids = np.atleast_1d(ids)
+        self.release(ids)
+        self.entities.behaviour[ids] = NAVIGATE
+        flock = self.flocks.setdefault(goal, [np.zeros(0, dtype=np.int64), None])
+        flock[0] = np.union1d(flock[0], ids)
+
+    def release(self, ids):
+        """
+        Stops steering entities; they go back to wandering.
+        """
+        ids = np.atleast_1d(ids)
+        for entity in ids.tolist():
+            self.routes.pop(entity, None)
+        for goal, flock in list(self.flocks.items()):
+            flock[0] = flock[0][~np.isin(flock[0], ids)]
+            if not len(flock[0]):
+                del self.flocks[goal]
+
+        entities = self.entities
+        steered = ids[entities.behaviour[ids] == NAVIGATE]
+        entities.behaviour[steered] = WANDER
+        entities.velocity[steered] = 0
+        entities.wander_timer[steered] = 0
+
+    def clear(self):
+        """
+        Forgets every agent and lets entities still marked as navigating
+        wander again (e.g. after loading a save, which does not keep routes).
+        """
+        self.routes.clear()
+        self.flocks.clear()
+        entities = self.entities
+        navigating = np.flatnonzero(entities.behaviour[: entities.count] == NAVIGATE)
+        self.release(navigating)
+
+    # --- Steering ---
+    def update(self):
+        """
+        Runs the searches for this simulation step and points every agent
+        at the next cell on its way.
+        """
+        self.run_searches()
+        if self.routes:
+            self.steer_routes()
+        for goal, flock in self.flocks.items():
+            self.steer_flock(goal, flock)
+
+    def get_feet_tiles(self, ids):
+        """
+        Returns the world position of the feet of entities and the cell under
+        them.
+        """
+        entities = self.entities
+        feet = entities.position[ids] + entities.sizes[entities.kind[ids]] * FEET_OFFSET
+        return feet, (feet // self.tile_map.size).astype(np.int64)
+
+    def steer(self, ids, feet, targets):
+        """
+        Sets the velocity of entities towards the center of a cell each, at
+        their walking speed, stopping exactly on it. A cell next to the one
+        under the feet is reached without crossing any other cell.
+
+        :param feet: World positions of the feet of the entities.
+        :param targets: (n, 2) array of the cells to walk to.
+        """
+        entities = self.entities
+        delta = (targets + 0.5) * self.tile_map.size - feet
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        speed = entities.speeds[entities.kind[ids]]
+        scale = np.where(
+            distance > speed, speed / np.maximum(distance, 1e-6), distance > 0.01
+        )
+        entities.velocity[ids] = delta * scale[:, None]
+
+        # Face along the bigger part of the movement
+        moving = scale > 0
+        dx, dy = delta[:, 0], delta[:, 1]
+        direction = np.where(
+            np.abs(dx) > np.abs(dy),
+            np.where(dx < 0, LEFT, RIGHT),
+            np.where(dy < 0, UP, DOWN),
+        )
+        entities.direction[ids[moving]] = direction[moving]
+
+    def steer_routes(self):
+        """
+        Moves every entity with a route to the next cell on it. Entities whose
+        route was dropped by a tile edit search again from where they stand.
+        """
+        ids = np.fromiter(self.routes, dtype=np.int64, count=len(self.routes))
+        feet, tiles = self.get_feet_tiles(ids)
+        targets = tiles.copy()  # Waiting entities step to the middle of their cell
+        stopped = np.zeros(len(ids), dtype=np.bool_)
+        size = self.tile_map.size
+        for row, (entity, (x, y), tile) in enumerate(
+            zip(ids.tolist(), feet.tolist(), tiles.tolist())
+        ):
+            route_state = self.routes[entity]
+            goal, key, route, index = route_state
+            if route is None or key not in self.paths:
+                key = (tuple(tile), goal)
+                route = self.find_path(*key)
+                index = min(1, len(route) - 1) if route else 0
+                route_state[1:] = [key, route, index]
+                if route is None:
+                    continue  # Wait for the search
+                if not route:
+                    del self.routes[entity]  # The goal cannot be reached
+                    stopped[row] = True
+                    continue
+
+            # Head for the next cell once the feet reach the middle of this one
+            cell_x, cell_y = route[index]
+            if abs((cell_x + 0.5) * size - x) <= 0.01 and (
+                abs((cell_y + 0.5) * size - y) <= 0.01
+            ):
+                if index == len(route) - 1:
+                    del self.routes[entity]  # Arrived
+                    stopped[row] = True
+                    continue
+                index += 1
+                route_state[3] = index
+            targets[row] = route[index]
+
+        self.steer(ids, feet, targets)
+        self.entities.velocity[ids[stopped]] = 0
+
+    def steer_flock(self, goal, flock):
+        """
+        Moves the entities heading to a shared goal one cell down its flow
+        field. While the field is searched again after a tile edit, they
+        follow the old one.
+        """
+        ids, field = flock
+        latest = self.get_flow_field(goal)
+        if latest is not None:
+            flock[1] = field = latest
+        if field is None:
+            self.entities.velocity[ids] = 0
+            return
+
+        feet, tiles = self.get_feet_tiles(ids)
+        directions = field.get_directions(tiles[:, 0], tiles[:, 1])
+        moving = directions != NO_DIRECTION
+        targets = tiles.copy()  # The goal, or a cell the field does not lead from
+        targets[moving] += np.array(MOVES)[directions[moving]]
+        self.steer(ids, feet, targets)
+
+        # Only walk to the middle of the goal itself
+        lost = ~moving & ((tiles != goal).any(axis=1))
+        self.entities.velocity[ids[lost]] = 0
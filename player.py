@@ -1,141 +1,257 @@
-import pygame
-from animation import Animation
-from math import sqrt
-
-
-class Player:
-    def __init__(self, game) -> None:
-        """
-        Initialize the Player class with settings, animations, and movement properties.
-        """
-        # --- Animation Settings ---
-        self.player_sheet_path = (
-            game.settings.BASE_DIR / "sprites" / "sprites" / "characters" / "player.png"
-        )
-        self.animation = Animation(
-            self.player_sheet_path,
-            (6, 9),  # Grid size of spritesheet (columns, rows)
-            (48, 48),  # Dimensions of each frame
-        )
-
-        # --- Position and Movement Settings ---
-        self.x = self.y = 0  # Initial player position
-        self.speed = game.settings.player_speed_pixels  # Movement speed in pixels
-        self.frame_delay = game.settings.animation_delay  # Animation frame delay
-        self.current_frame = 0  # Current frame in animation
-        self.last_updated = (
-            pygame.time.get_ticks()
-        )  # Last time animation frame was updated
-
-        # --- Direction and State Settings ---
-        self.direction_map = {  # Map directions to rows, frames, and flip states
-            "up": (2, 5, False),  # Row for idle, row for walking, flip horizontally
-            "down": (0, 3, False),
-            "left": (1, 4, True),
-            "right": (1, 4, False),
-        }
-        self.direction_key = "down"  # Default direction
-        self.horizontal_flip = False  # Whether to flip sprite horizontally
-        self.idle = True  # Is the player idle?
-
-        # --- Animation and Key States ---
-        self.current_row = self.direction_map[self.direction_key][
-            0
-        ]  # Current animation row
-        self.up = self.down = self.right = self.left = False  # Movement keys state
-        self.game = game  # Reference to the game object
-
-    # --- Event Handling ---
-    def handle_down_events(self, event):
-        """
-        Handle key press events for movement.
-        """
-        if event.key == pygame.K_w:
-            self.up, self.direction_key = True, "up"
-            self.down = False
-        elif event.key == pygame.K_s:
-            self.down, self.direction_key = True, "down"
-            self.up = False
-        if event.key == pygame.K_a:
-            self.left, self.direction_key = True, "left"
-            self.right = False
-        elif event.key == pygame.K_d:
-            self.right, self.direction_key = True, "right"
-            self.left = False
-
-    def handle_up_events(self, event):
-        """
-        Handle key release events for movement.
-        """
-        if event.key == pygame.K_w:
-            self.up = False
-        elif event.key == pygame.K_s:
-            self.down = False
-        elif event.key == pygame.K_a:
-            self.left = False
-        elif event.key == pygame.K_d:
-            self.right = False
-
-    # --- State Updates ---
-    def check_idle(self):
-        """
-        Check if the player is idle based on key states.
-        """
-        self.idle = not (self.up or self.down or self.left or self.right)
-
-    def select_frame_row(self):
-        """
-        Select the appropriate animation row based on direction and idle state.
-        """
-        animation_data = self.direction_map[self.direction_key]
-        self.current_row = animation_data[0] if self.idle else animation_data[1]
-        self.horizontal_flip = animation_data[2]
-
-    def update_player_pos(self):
-        """
-        Update the player's position based on movement direction.
-        """
-        dx = dy = 0
-
-        # Movement logic
-        dy -= self.speed if self.up else 0
-        dy += self.speed if self.down else 0
-        dx += self.speed if self.right else 0
-        dx -= self.speed if self.left else 0
-
-        # Diagonal movement adjustment (normalize movement)
-        if dx and dy:
-            speed_adjust = 1 / sqrt(2)
-            dx *= speed_adjust
-            dy *= speed_adjust
-
-        self.x += dx
-        self.y += dy
-
-    # --- Animation Updates ---
-    def select_frame(self):
-        """
-        Select the current animation frame based on elapsed time.
-        """
-        now = pygame.time.get_ticks()
-        if now - self.last_updated > self.frame_delay:
-            self.last_updated = now
-            self.current_frame = (self.current_frame + 1) % len(
-                self.animation.frames[self.current_row]
-            )
-
-    def get_new_tile(self):
-        """
-        Placeholder for future tile updates based on player position (to be implemented).
-        """
-        pass
-
-    def draw_frame(self, game):
-        """
-        Draw the current animation frame on the game screen.
-        """
-        frame = self.animation.frames[self.current_row][self.current_frame]
-        if self.horizontal_flip:
-            frame = pygame.transform.flip(frame, True, False)
-
-        game.screen.blit(frame, (self.x, self.y))
+import pygame
+from animation import Animation
+from entities import CONTROLLED, DOWN, LEFT, RIGHT, UP
+from math import sqrt
+
+# --- Input ---
+# Held movement keys of a step as bits, see get_input
+UP_KEY, DOWN_KEY, LEFT_KEY, RIGHT_KEY = 1, 2, 4, 8
+# Farming actions asked for during a step, as bits
+USE, WATER = 1, 2
+# Entity direction -> direction key of the player
+DIRECTION_KEYS = {DOWN: "down", UP: "up", LEFT: "left", RIGHT: "right"}
+# Keys that steer the player (movement and farming); the game's other keys
+# (saving, loading, profiling) are not part of the simulation's input
+PLAYER_KEYS = frozenset(
+    (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d, pygame.K_e, pygame.K_r)
+)
+
+
+class Player:
+    def __init__(self, game, template=None, entity=None) -> None:
+        """
+        Initialize the Player class with settings, animations, and movement properties.
+
+        :param template: Optional player to share the sprites and entity kind
+                         with (a co-op server runs one player per client).
+        :param entity: Optional entity of the player's kind to steer instead
+                       of spawning a new one.
+        """
+        # --- Animation Settings ---
+        self.player_sheet_path = (
+            game.settings.BASE_DIR / "sprites" / "sprites" / "characters" / "player.png"
+        )
+        if template is not None:
+            self.animation = template.animation
+        else:
+            self.animation = Animation(
+                self.player_sheet_path,
+                (6, 9),  # Grid size of spritesheet (columns, rows)
+                (48, 48),  # Dimensions of each frame
+                scale=game.settings.asset_scale,
+                cache=game.sprite_cache,
+                formats=game.surface_formats,
+            )
+        self.width, self.height = self.animation.frames[0][0].get_size()
+
+        # Collision box around the feet, relative to the top-left of the sprite
+        # (x offset, y offset, width, height), given in pixels of the sheet
+        scale = game.settings.asset_scale
+        self.hitbox = tuple(value * scale for value in (18, 37, 13, 6))
+
+        # --- Movement Settings ---
+        self.speed = game.settings.player_speed_pixels  # Movement speed in pixels
+
+        # --- Direction and State Settings ---
+        self.direction_map = {  # Map direction keys to entity directions
+            "up": UP,
+            "down": DOWN,
+            "left": LEFT,
+            "right": RIGHT,
+        }
+        self.direction_key = "down"  # Default direction
+        self.idle = True  # Is the player idle?
+
+        # --- Key States ---
+        self.up = self.down = self.right = self.left = False  # Movement keys state
+        self.actions = 0  # USE and WATER bits asked for this step
+        self.game = game  # Reference to the game object
+
+        # --- Entity ---
+        # The player lives in the entity store like every animal; the store
+        # moves and animates it, the player only steers it.
+        self.entities = game.entities
+        if template is not None:
+            self.kind = template.kind
+        else:
+            self.kind = self.entities.add_kind(
+                self.animation,
+                idle_rows=(0, 2, 1, 1),  # Idle row for down, up, left, right
+                walk_rows=(3, 5, 4, 4),  # Walking row for down, up, left, right
+                flips=(0, 0, 1, 0),  # Left reuses the right rows, flipped
+                frame_delay=game.settings.animation_delay,
+            )
+        if entity is None:
+            entity = self.entities.spawn(self.kind, 0, 0, CONTROLLED)
+        self.entity = entity
+
+    # --- Position ---
+    # Setting x or y teleports the player (no interpolation from the old spot)
+    @property
+    def x(self):
+        return float(self.entities.position[self.entity, 0])
+
+    @x.setter
+    def x(self, value):
+        self.entities.position[self.entity, 0] = value
+        self.entities.previous_position[self.entity, 0] = value
+        self.entities.spatial_dirty = True
+
+    @property
+    def y(self):
+        return float(self.entities.position[self.entity, 1])
+
+    @y.setter
+    def y(self, value):
+        self.entities.position[self.entity, 1] = value
+        self.entities.previous_position[self.entity, 1] = value
+        self.entities.spatial_dirty = True
+
+    # --- Event Handling ---
+    def handle_down_events(self, event):
+        """
+        Handle key press events for movement.
+        """
+        if event.key == pygame.K_w:
+            self.up, self.direction_key = True, "up"
+            self.down = False
+        elif event.key == pygame.K_s:
+            self.down, self.direction_key = True, "down"
+            self.up = False
+        if event.key == pygame.K_a:
+            self.left, self.direction_key = True, "left"
+            self.right = False
+        elif event.key == pygame.K_d:
+            self.right, self.direction_key = True, "right"
+            self.left = False
+
+        # Farming actions on the tile in front of the player (see use_tools)
+        if event.key == pygame.K_e:
+            self.actions |= USE
+        elif event.key == pygame.K_r:
+            self.actions |= WATER
+
+    def handle_up_events(self, event):
+        """
+        Handle key release events for movement.
+        """
+        if event.key == pygame.K_w:
+            self.up = False
+        elif event.key == pygame.K_s:
+            self.down = False
+        elif event.key == pygame.K_a:
+            self.left = False
+        elif event.key == pygame.K_d:
+            self.right = False
+
+    def get_input(self):
+        """
+        Returns the input of the player this step: which movement keys are
+        held, the direction the player faces and the farming actions.
+
+        :return: Tuple (key bits, entity direction, action bits).
+        """
+        keys = (
+            UP_KEY * self.up
+            | DOWN_KEY * self.down
+            | LEFT_KEY * self.left
+            | RIGHT_KEY * self.right
+        )
+        return keys, self.direction_map[self.direction_key], self.actions
+
+    def set_input(self, keys, direction, actions=0):
+        """
+        Sets the input of the player, as returned by get_input.
+        """
+        self.up, self.down = bool(keys & UP_KEY), bool(keys & DOWN_KEY)
+        self.left, self.right = bool(keys & LEFT_KEY), bool(keys & RIGHT_KEY)
+        self.direction_key = DIRECTION_KEYS[direction]
+        self.actions = actions
+
+    # --- State Updates ---
+    def check_idle(self):
+        """
+        Check if the player is idle based on key states.
+        """
+        self.idle = not (self.up or self.down or self.left or self.right)
+
+    def update_player_pos(self):
+        """
+        Set the player's velocity based on movement direction. The entity
+        store applies it on its next update.
+        """
+        dx = dy = 0
+
+        # Movement logic
+        dy -= self.speed if self.up else 0
+        dy += self.speed if self.down else 0
+        dx += self.speed if self.right else 0
+        dx -= self.speed if self.left else 0
+
+        # Diagonal movement adjustment (normalize movement)
+        if dx and dy:
+            speed_adjust = 1 / sqrt(2)
+            dx *= speed_adjust
+            dy *= speed_adjust
+
+        # Stop at solid tiles and the edge of the map
+        dx, dy = self.game.BG.move_and_collide(self.get_hitbox(), dx, dy)
+
+        self.entities.velocity[self.entity] = (dx, dy)
+        self.entities.direction[self.entity] = self.direction_map[self.direction_key]
+
+    def use_tools(self):
+        """
+        Does the farming actions asked for this step on the tile in front of
+        the player.
+        """
+        if self.actions & USE:
+            self.game.farm.use(*self.get_facing_tile())
+        if self.actions & WATER:
+            self.game.farm.water(*self.get_facing_tile())
+        self.actions = 0
+
+    def get_draw_pos(self, alpha=1.0):
+        """
+        Returns the position to draw the player at, interpolated between the
+        last two simulation steps.
+
+        :param alpha: 0 is the previous step, 1 is the latest one.
+        """
+        previous = self.entities.previous_position[self.entity]
+        current = self.entities.position[self.entity]
+        return tuple((previous + (current - previous) * alpha).tolist())
+
+    def get_center(self, alpha=1.0):
+        """
+        Returns the world position of the center of the player sprite.
+        """
+        x, y = self.get_draw_pos(alpha)
+        return x + self.width / 2, y + self.height / 2
+
+    def get_hitbox(self):
+        """
+        Returns the player's collision box as (left, top, width, height).
+        """
+        offset_x, offset_y, width, height = self.hitbox
+        return self.x + offset_x, self.y + offset_y, width, height
+
+    def get_new_tile(self):
+        """
+        Returns the (column, row) of the tile the player is standing on.
+        """
+        left, top, width, height = self.get_hitbox()
+        return self.game.BG.world_to_tile(left + width / 2, top + height / 2)
+
+    def get_facing_tile(self):
+        """
+        Returns the (column, row) of the tile in front of the player.
+        """
+        tile_x, tile_y = self.get_new_tile()
+        step_x, step_y = {
+            "up": (0, -1),
+            "down": (0, 1),
+            "left": (-1, 0),
+            "right": (1, 0),
+        }[self.direction_key]
+        return tile_x + step_x, tile_y + step_y
@@ -0,0 +1,268 @@
+import csv
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+# --- Phases ---
+# Parts of a frame, in the order run_frame goes through them. Phases of the
+# simulation run once per simulation step, so a frame can hold several spans
+# of them (or none).
+EVENTS, PLAYER, ENTITIES, WORLD, ASSETS, BACKGROUND, SPRITES, PRESENT, TICK = range(9)
+PHASE_NAMES = (
+    "events",  # handle_events
+    "player",  # update_player
+    "entities",  # update_entities
+    "world",  # update_tiles (particles included) and autosaves
+    "assets",  # Finishing sheets the loader threads decoded
+    "background",  # Tile edits, camera and BG.draw_tile_screen
+    "sprites",  # Props, entities and queueing particles
+    "present",  # Overhead tiles, particles, lighting, overlays and display.flip
+    "tick",  # clock.tick (waiting for the next frame)
+)
+
+# --- Overlay ---
+OVERLAY_POSITION = (8, 8)  # Top-left corner on screen
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 160)
+OVERLAY_INTERVAL = 0.5  # Seconds between overlay refreshes
+OVERLAY_FRAMES = 60  # Frames averaged in the overlay
+
+
+class Profiler:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Profiler class that times every phase of every frame.
+
+        The game loop calls mark() after each phase. While the profiler is on,
+        that reads the clock and appends the span to the frame; finished frames
+        go into a ring buffer holding the last profiler_frames frames. While it
+        is off, mark() returns right away.
+        """
+        self.settings = game.settings
+        self.enabled = self.settings.profiler_enabled
+        self.show_overlay = self.settings.profiler_overlay
+
+        # --- Current Frame ---
+        self.frame = 0  # Number of the frame being timed
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.durations = [0.0] * len(PHASE_NAMES)  # Seconds per phase
+        self.spans = []  # (phase, start, end) in seconds, in order
+
+        # --- History ---
+        # Finished frames as (frame, start, total, durations, spans)
+        self.frames = deque(maxlen=self.settings.profiler_frames)
+        self.spikes = deque(maxlen=self.settings.profiler_frames)  # Spiking frames
+        self.average = None  # Moving average of the frame time in seconds
+        self.exported = None  # Paths of the last export
+
+        # --- Overlay ---
+        self.font = None
+        self.overlay = None
+        self.overlay_time = 0.0  # When the overlay was last drawn
+
+    def toggle(self):
+        """
+        Turns the profiler and its overlay on or off together.
+        """
+        self.enabled = self.show_overlay = not self.enabled
+        self.begin_frame()
+
+    # --- Timing ---
+    def begin_frame(self):
+        """
+        Starts timing a frame.
+        """
+        if not self.enabled:
+            return
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.durations = [0.0] * len(PHASE_NAMES)
+        self.spans = []
+
+    def mark(self, phase):
+        """
+        Ends a phase: the time since the previous mark is counted for it.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.durations[phase] += now - self.last_mark
+        self.spans.append((phase, self.last_mark, now))
+        self.last_mark = now
+
+    def end_frame(self):
+        """
+        Stores the timed frame in the ring buffer and checks it for a spike.
+        """
+        if not self.enabled:
+            return
+        total = self.last_mark - self.frame_start
+        record = (self.frame, self.frame_start, total, self.durations, self.spans)
+        self.frames.append(record)
+        self.frame += 1
+
+        # A spike is a frame much slower than the recent ones; the first
+        # frames only build up the average
+        settings = self.settings
+        if self.average is None:
+            self.average = total
+        elif total > max(
+            self.average * settings.spike_factor, settings.spike_min_ms / 1000
+        ):
+            self.spikes.append(record)
+        self.average += (total - self.average) * 0.05
+
+    # --- Statistics ---
+    def get_phase_times(self, frames=None):
+        """
+        Returns the time of every phase, per frame.
+
+        :param frames: Only the last this many frames (all of them by default).
+        :return: (frames, phases) array of milliseconds.
+        """
+        records = list(self.frames)[-frames:] if frames else self.frames
+        if not records:
+            return np.zeros((0, len(PHASE_NAMES)))
+        return np.array([record[3] for record in records]) * 1000
+
+    # --- Overlay ---
+    def draw_overlay(self, renderer):
+        """
+        Queues the overlay with the FPS and phase breakdown on the renderer.
+        Its text is only rendered again every OVERLAY_INTERVAL seconds.
+        """
+        if not (self.enabled and self.show_overlay):
+            return
+
+        now = time.perf_counter()
+        if self.overlay is None or now - self.overlay_time >= OVERLAY_INTERVAL:
+            self.overlay = self.render_overlay()
+            self.overlay_time = now
+        renderer.draw_overlay(self.overlay, OVERLAY_POSITION)
+
+    def render_overlay(self):
+        """
+        Renders the overlay text onto a translucent panel.
+        """
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+
+        times = self.get_phase_times(OVERLAY_FRAMES)
+        totals = times.sum(axis=1)
+        if len(totals):
+            fps = 1000 / totals.mean() if totals.mean() else 0.0
+            lines = [
+                f"{fps:.0f} FPS  frame {totals.mean():.2f} ms  "
+                f"max {totals.max():.2f} ms  spikes {len(self.spikes)}"
+            ]
+            lines += [
+                f"{name:<11}{time_ms:6.2f} ms"
+                for name, time_ms in zip(PHASE_NAMES, times.mean(axis=0))
+            ]
+            if self.spikes:
+                frame, _, total, durations, _ = self.spikes[-1]
+                slowest = max(range(len(PHASE_NAMES)), key=durations.__getitem__)
+                lines.append(
+                    f"last spike: frame {frame} {total * 1000:.1f} ms "
+                    f"({PHASE_NAMES[slowest]} {durations[slowest] * 1000:.1f} ms)"
+                )
+            if self.exported:
+                lines.append(f"exported {self.exported[1].name}")
+        else:
+            lines = ["Profiling..."]
+
+        rendered = [self.font.render(line, True, OVERLAY_COLOR) for line in lines]
+        width = max(line.get_width() for line in rendered) + 8
+        height = sum(line.get_height() for line in rendered) + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(OVERLAY_BACKGROUND)
+        y = 4
+        for line in rendered:
+            panel.blit(line, (4, y))
+            y += line.get_height()
+        return panel
+
+    # --- Export ---
+    def export_csv(self, path):
+        """
+        Writes one row per frame in the ring buffer: frame number, start and
+        total time, then the time of every phase (all in milliseconds).
+        """
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(
+                ["frame", "start_ms", "total_ms"]
+                + [f"{name}_ms" for name in PHASE_NAMES]
+            )
+            for frame, start, total, durations, _ in self.frames:
+                writer.writerow(
+                    [frame, f"{start * 1000:.3f}", f"{total * 1000:.3f}"]
+                    + [f"{duration * 1000:.3f}" for duration in durations]
+                )
+
+    def export_trace(self, path):
+        """
+        Writes the frames in the ring buffer in the Chrome trace event format
+        (open it in chrome://tracing or Perfetto). Every frame is a span with
+        its phases nested inside; spikes are marked with instant events.
+        """
+        spikes = {record[0] for record in self.spikes}
+        events = []
+        for frame, start, total, _, spans in self.frames:
+            events.append(
+                {
+                    "name": "frame",
+                    "ph": "X",
+                    "ts": start * 1e6,
+                    "dur": total * 1e6,
+                    "pid": 1,
+                    "tid": 1,
+                    "args": {"frame": frame},
+                }
+            )
+            events += [
+                {
+                    "name": PHASE_NAMES[phase],
+                    "ph": "X",
+                    "ts": span_start * 1e6,
+                    "dur": (span_end - span_start) * 1e6,
+                    "pid": 1,
+                    "tid": 1,
+                }
+                for phase, span_start, span_end in spans
+            ]
+            if frame in spikes:
+                events.append(
+                    {
+                        "name": "spike",
+                        "ph": "i",
+                        "ts": start * 1e6,
+                        "pid": 1,
+                        "tid": 1,
+                        "s": "t",
+                    }
+                )
+
+        with open(path, "w") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+    def export(self):
+        """
+        Writes the CSV and trace files into settings.profile_dir.
+
+        :return: Paths of the written files.
+        """
+        folder = Path(self.settings.profile_dir)
+        folder.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        csv_path = folder / f"frames-{stamp}.csv"
+        trace_path = folder / f"trace-{stamp}.json"
+        self.export_csv(csv_path)
+        self.export_trace(trace_path)
+        self.exported = csv_path, trace_path
+        self.overlay = None  # Show the export on the next frame
+        return self.exported
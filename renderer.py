@@ -0,0 +1,243 @@
+import pygame
+
+
+class Renderer:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Renderer class that redraws the whole screen every frame.
+        """
+        self.game = game
+        self.overlays = []  # (surface, screen position) drawn over everything
+        self.effects = []  # (draw function, screen rect) of particle effects
+
+    def begin_frame(self):
+        """
+        Starts a frame by drawing the background.
+        """
+        self.game.BG.draw_tile_screen(self.game)
+
+    def draw(self, surface, position):
+        """
+        Draws a sprite at a world position.
+
+        :return: The rect of the screen that was drawn on.
+        """
+        return self.game.screen.blit(surface, self.game.camera.apply(*position))
+
+    def draw_overlay(self, surface, position):
+        """
+        Queues a surface to draw at a screen position over everything else
+        (debug overlays), once the world is finished.
+        """
+        self.overlays.append((surface, position))
+
+    def draw_effect(self, draw, rect):
+        """
+        Queues an effect (e.g. a batch of particles) to draw over the overhead
+        tiles, before the frame is lit.
+
+        :param draw: Function drawing the effect onto the screen it is given,
+            inside the screen's clip rect.
+        :param rect: Screen rect the effect covers.
+        """
+        self.effects.append((draw, rect))
+
+    def draw_effects(self, area=None):
+        """
+        Draws the queued effects (only those overlapping area, if given).
+        """
+        screen = self.game.screen
+        for draw, rect in self.effects:
+            if area is None or rect.colliderect(area):
+                draw(screen)
+
+    def present(self, rects=None):
+        """
+        Shows the finished frame, or only some rects of it. A frame drawn
+        below the window resolution is scaled up to the window first, in one
+        pass per rect.
+
+        :param rects: Screen rects to show (the whole frame by default).
+        """
+        game = self.game
+        scale = game.settings.render_scale
+        if scale != 1:
+            areas = [game.screen.get_rect()] if rects is None else rects
+            targets = [
+                pygame.Rect(
+                    rect.x * scale, rect.y * scale, rect.w * scale, rect.h * scale
+                )
+                for rect in areas
+            ]
+            for area, target in zip(areas, targets):
+                pygame.transform.scale(
+                    game.screen.subsurface(area),
+                    target.size,
+                    game.window.subsurface(target),
+                )
+            if rects is not None:
+                rects = targets
+
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def mark_dirty(self, world_rect):
+        """
+        Tells the renderer that part of the background changed.
+        (The full renderer redraws everything anyway)
+        """
+        pass
+
+    def invalidate(self):
+        """
+        Tells the renderer that the whole background changed (e.g. after
+        loading a save). The full renderer redraws everything anyway.
+        """
+        pass
+
+    def end_frame(self):
+        """
+        Draws the overhead tiles over the sprites, then the effects, lights
+        the frame, adds the overlays and shows it.
+        """
+        self.game.BG.draw_overhead(self.game)
+        self.draw_effects()
+        self.game.lighting.draw(self.game)
+        self.game.screen.blits(self.overlays, doreturn=False)
+        self.overlays = []
+        self.effects = []
+        self.present()
+
+
+class DirtyRectRenderer(Renderer):
+    def __init__(self, game) -> None:
+        """
+        Initializes the DirtyRectRenderer class that only redraws and updates the
+        parts of the screen that changed. Sprites drawn exactly where and as
+        they were last frame cost nothing; every other rect is redrawn from the
+        background up (tiles, the sprites overlapping it in order, overhead
+        tiles, effects, lighting). Effects change every frame, so the rects
+        they cover now and covered last frame are always redrawn. Scrolling
+        the camera falls back to a full redraw for that frame.
+        """
+        super().__init__(game)
+        self.sprites = []  # (surface, world position, screen rect) drawn this frame
+        self.previous_sprites = {}  # (surface, world position) -> rect, last frame
+        self.previous_effects = []  # Screen rects of last frame's effects
+        self.background_rects = []  # Screen rects where the background changed
+        self.last_camera = None  # Camera position of the last frame
+        self.full_redraw = True
+
+    def begin_frame(self):
+        """
+        Redraws the whole background if the camera moved. Otherwise nothing is
+        drawn until end_frame knows which sprites changed.
+        """
+        camera = (self.game.camera.x, self.game.camera.y)
+        self.full_redraw = camera != self.last_camera
+        self.last_camera = camera
+
+        if self.full_redraw:
+            self.game.BG.draw_tile_screen(self.game)
+            self.background_rects.clear()
+
+    def draw(self, surface, position):
+        """
+        Queues a sprite at a world position (it is drawn right away during a
+        full redraw).
+        """
+        # Truncate like blit does (a rect would round the position)
+        x, y = self.game.camera.apply(*position)
+        rect = surface.get_rect(topleft=(int(x), int(y)))
+        if self.full_redraw:
+            self.game.screen.blit(surface, rect)
+        self.sprites.append((surface, tuple(position), rect))
+        return rect
+
+    def mark_dirty(self, world_rect):
+        """
+        Queues part of the background to be redrawn on the next frame.
+        """
+        rect = pygame.Rect(world_rect)
+        rect.topleft = self.game.camera.apply(*rect.topleft)
+        if rect.colliderect(self.game.screen.get_rect()):
+            self.background_rects.append(rect)
+
+    def invalidate(self):
+        """
+        Forces a full redraw on the next frame.
+        """
+        self.last_camera = None
+
+    def end_frame(self):
+        """
+        Redraws the rects that changed and updates only those, or shows the
+        whole display after a full redraw.
+        """
+        game = self.game
+        # Keyed by the exact position: a sprite that moved less than a pixel
+        # can still have moved in front of or behind its neighbours
+        current = {
+            (surface, position): rect for surface, position, rect in self.sprites
+        }
+        overlays = [
+            (surface, surface.get_rect(topleft=position))
+            for surface, position in self.overlays
+        ]
+        current.update(((surface, rect.topleft), rect) for surface, rect in overlays)
+
+        if self.full_redraw:
+            game.BG.draw_overhead(game)
+            self.draw_effects()
+            game.lighting.draw(game)
+            game.screen.blits(overlays, doreturn=False)
+            self.present()
+        else:
+            # Where sprites appeared, disappeared or changed frame
+            dirty = [
+                rect
+                for key, rect in current.items()
+                if key not in self.previous_sprites
+            ]
+            dirty += [
+                rect
+                for key, rect in self.previous_sprites.items()
+                if key not in current
+            ]
+            dirty += [rect for _, rect in self.effects] + self.previous_effects
+            screen_rect = game.screen.get_rect()
+            dirty = [
+                rect.clip(screen_rect)
+                for rect in dirty + self.background_rects
+                if rect.colliderect(screen_rect)
+            ]
+            # A rect covering the screen (e.g. rain) makes the others redundant
+            if any(rect == screen_rect for rect in dirty):
+                dirty = [screen_rect]
+
+            # Every rect is drawn from scratch, so rects that overlap each
+            # other never blend anything twice
+            rects = [rect for _, _, rect in self.sprites]
+            for area in dirty:
+                game.BG.draw_tile_screen(game, area)
+                game.screen.set_clip(area)
+                for index in area.collidelistall(rects):
+                    game.screen.blit(self.sprites[index][0], rects[index])
+                game.BG.draw_overhead(game, area)
+                game.screen.set_clip(area)
+                self.draw_effects(area)
+                game.lighting.draw(game, area)
+                game.screen.set_clip(area)
+                game.screen.blits(overlays, doreturn=False)
+            game.screen.set_clip(None)
+
+            self.present(dirty)
+            self.background_rects.clear()
+
+        self.previous_sprites = current
+        self.previous_effects = [rect for _, rect in self.effects]
+        self.sprites = []
+        self.overlays = []
+        self.effects = []
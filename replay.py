@@ -0,0 +1,195 @@
+import shutil
+import struct
+import time
+import zlib
+from pathlib import Path
+
+import pygame
+
+from player import PLAYER_KEYS
+from save_system import MANIFEST
+
+# --- Recording Layout ---
+# Header: magic, version, world seed and simulation rate. Then fixed-size
+# records of a type byte and two 32-bit fields:
+#   KEY_DOWN / KEY_UP - simulation step the event was handled on, key code
+#   FRAME             - simulation steps run before the frame, alpha it drew
+#   END               - last simulation step, checksum of the entities then
+# Every record stands on its own, so a recording cut short by a crash still
+# replays up to where it stops. Next to the recording, a copy of the save
+# folder as it was when recording started (<name>.save), so that a replay
+# loads the same checkpoints with F9.
+MAGIC = b"SVRC"
+VERSION = 1
+HEADER = struct.Struct("<4sHQH")
+RECORD_TYPE = struct.Struct("<B")
+EVENT_RECORD = struct.Struct("<Ii")
+FRAME_RECORD = struct.Struct("<If")
+END_RECORD = struct.Struct("<II")
+RECORD_SIZE = 8  # Bytes after the type byte, the same for every record
+KEY_DOWN, KEY_UP, FRAME, END = range(4)
+
+# Record types of the pygame events that are recorded
+EVENT_TYPES = {pygame.KEYDOWN: KEY_DOWN, pygame.KEYUP: KEY_UP}
+PYGAME_TYPES = {KEY_DOWN: pygame.KEYDOWN, KEY_UP: pygame.KEYUP}
+# Keys that change the simulation: the player's, and saving and loading
+RECORDED_KEYS = PLAYER_KEYS | {pygame.K_F5, pygame.K_F9}
+
+
+def get_checksum(game):
+    """
+    Returns a checksum of every entity position, to tell whether a replay
+    ended in the same state as the recording.
+    """
+    entities = game.entities
+    return zlib.crc32(entities.position[: entities.count].tobytes())
+
+
+def read_header(path):
+    """
+    Reads the header of a recording.
+
+    :return: Tuple (world seed, simulation rate).
+    """
+    with open(path, "rb") as recording:
+        magic, version, seed, sim_rate = HEADER.unpack(recording.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a supported input recording")
+    return seed, sim_rate
+
+
+class InputRecorder:
+    def __init__(self, game, path=None) -> None:
+        """
+        Initializes the InputRecorder class that logs the input of a game, and
+        how its frames were split into simulation steps, from the start.
+
+        :param path: File to write, by default a new file in recording_dir.
+        """
+        self.game = game
+        if path is None:
+            folder = Path(game.settings.recording_dir)
+            folder.mkdir(parents=True, exist_ok=True)
+            path = folder / f"input-{time.strftime('%Y%m%d-%H%M%S')}.rec"
+        self.path = Path(path)
+        self.file = open(self.path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, game.seed, game.settings.sim_rate))
+
+        # The save F9 would load; a replay loads this copy instead
+        save_dir = Path(game.settings.save_dir)
+        if (save_dir / MANIFEST).exists():
+            shutil.copytree(
+                save_dir,
+                self.path.with_suffix(".save"),
+                ignore=shutil.ignore_patterns("*.tmp"),
+            )
+
+    def record_events(self, step, events):
+        """
+        Logs the events handled on a simulation step (only presses and
+        releases of the keys that steer the player, save or load drive the
+        simulation).
+        """
+        for event in events:
+            record_type = EVENT_TYPES.get(event.type)
+            if record_type is not None and event.key in RECORDED_KEYS:
+                self.file.write(RECORD_TYPE.pack(record_type))
+                self.file.write(EVENT_RECORD.pack(step, event.key))
+
+    def record_frame(self, steps, alpha):
+        """
+        Logs a rendered frame: the simulation steps run before it and how far
+        between the last two steps it was drawn.
+        """
+        self.file.write(RECORD_TYPE.pack(FRAME))
+        self.file.write(FRAME_RECORD.pack(steps, alpha))
+
+    def close(self):
+        """
+        Ends the recording with the state the game reached.
+        """
+        self.file.write(RECORD_TYPE.pack(END))
+        self.file.write(END_RECORD.pack(self.game.sim_steps, get_checksum(self.game)))
+        self.file.close()
+
+
+class InputReplay:
+    def __init__(self, path) -> None:
+        """
+        Initializes the InputReplay class that feeds a recording back into a
+        game on the simulation steps it was recorded on. The game has to be
+        built with the recording's seed (see read_header), on a copy of
+        save_dir if there is one.
+
+        :raises ValueError: If a record has an unknown type.
+        """
+        self.seed, self.sim_rate = read_header(path)
+        # Save folder the recording started from, or None if it had no save
+        self.save_dir = Path(path).with_suffix(".save")
+        if not self.save_dir.is_dir():
+            self.save_dir = None
+        self.events = {}  # Simulation step -> events handled on it
+        self.frames = []  # (steps before the frame, alpha) of every frame
+        self.end = None  # (last step, checksum) if the recording was closed
+        self.last_step = 0  # Last simulation step the recording covers
+        self.frame = 0  # Next frame to replay
+
+        with open(path, "rb") as recording:
+            data = recording.read()
+        offset = HEADER.size
+        # A record cut short by a crash is where the recording stops
+        while offset + RECORD_TYPE.size + RECORD_SIZE <= len(data):
+            (record_type,) = RECORD_TYPE.unpack_from(data, offset)
+            offset += RECORD_TYPE.size
+            if record_type not in (KEY_DOWN, KEY_UP, FRAME, END):
+                raise ValueError(
+                    f"{path} has a record of unknown type {record_type} "
+                    f"at byte {offset - RECORD_TYPE.size}"
+                )
+            if record_type == FRAME:
+                steps, alpha = FRAME_RECORD.unpack_from(data, offset)
+                self.frames.append((steps, alpha))
+                self.last_step += steps
+            elif record_type == END:
+                self.end = END_RECORD.unpack_from(data, offset)
+                self.last_step = self.end[0]
+            else:
+                step, key = EVENT_RECORD.unpack_from(data, offset)
+                if key in RECORDED_KEYS:  # Older recordings logged every key
+                    event = pygame.event.Event(PYGAME_TYPES[record_type], key=key)
+                    self.events.setdefault(step, []).append(event)
+                self.last_step = max(self.last_step, step + 1)
+            offset += RECORD_SIZE
+
+    def get_events(self, step):
+        """
+        Returns the events to handle on a simulation step.
+        """
+        return self.events.get(step, [])
+
+    def next_frame(self):
+        """
+        Returns (steps, alpha) of the next recorded frame, or None at the end.
+        """
+        if self.frame >= len(self.frames):
+            return None
+        self.frame += 1
+        return self.frames[self.frame - 1]
+
+    def simulate(self, game):
+        """
+        Runs every remaining simulation step without rendering, as fast as
+        the machine allows.
+        """
+        while game.sim_steps < self.last_step:
+            game.simulate()
+        self.frame = len(self.frames)
+
+    def check(self, game):
+        """
+        Returns whether the game ended in the recorded state, or None when
+        the recording has no end record (or the game is not at its end).
+        """
+        if self.end is None or game.sim_steps != self.end[0]:
+            return None
+        return get_checksum(game) == self.end[1]
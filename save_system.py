@@ -0,0 +1,362 @@
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from zipfile import BadZipFile
+
+import numpy as np
+
+from entities import ENTITY_FIELDS
+from map_format import DEFAULT_LAYER
+
+# --- Save Layout ---
+# A save is a folder holding:
+#   manifest.json                - format version, checkpoint number, simulation
+#                                  time, player state and the data file names
+#   chunk_<x>_<y>_<checkpoint>.npz - tiles and plots of one edited chunk
+#   entities_<checkpoint>.npz    - the arrays of every entity
+# Data files are never overwritten. A checkpoint writes new files for what
+# changed, then atomically replaces the manifest, so a crash at any point
+# leaves the previous checkpoint readable. Chunks that were never edited are
+# not saved at all, they come from the map file.
+VERSION = 1
+MANIFEST = "manifest.json"
+
+# Entity arrays in world pixels, converted when a save made at another tile
+# size (see Settings.set_render_scale) is loaded
+PIXEL_FIELDS = ("position", "previous_position", "velocity")
+
+
+def write_atomic(path, write):
+    """
+    Writes a file through a temporary file that replaces it when complete.
+
+    :param write: Function called with the open temporary file.
+    """
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, "wb") as save_file:
+        write(save_file)
+        save_file.flush()
+        os.fsync(save_file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_manifest(save_dir):
+    """
+    Reads the manifest of a save folder.
+
+    :return: The manifest dictionary, or None if there is no save.
+    """
+    path = Path(save_dir) / MANIFEST
+    if not path.exists():
+        return None
+
+    manifest = json.loads(path.read_text())
+    if not isinstance(manifest, dict):
+        raise ValueError(f"{path} is not a save manifest")
+    if manifest.get("version") != VERSION:
+        raise ValueError(f"Unsupported save version {manifest.get('version')}")
+    return manifest
+
+
+class SaveSystem:
+    def __init__(self, game) -> None:
+        """
+        Initializes the SaveSystem class. Saving takes a snapshot of what
+        changed since the last checkpoint on the game thread (a few array
+        copies) and hands it to a background thread that does the file I/O,
+        so a save never stalls a frame.
+        """
+        self.game = game
+        self.settings = game.settings
+        self.save_dir = Path(self.settings.save_dir)
+
+        # --- Checkpoint State ---
+        # An old or damaged save does not stop the game; load() reports it
+        try:
+            manifest = read_manifest(self.save_dir)
+        except (OSError, ValueError):
+            manifest = None
+        # Checkpoints continue the numbering, so no file of the save on disk
+        # is ever overwritten
+        self.checkpoint = manifest.get("checkpoint", 0) if manifest else 0
+        self.chunk_files = {}  # (chunk_x, chunk_y) -> file of its latest save
+        self.entity_file = None  # File of the latest entity save
+        self.saved_entities = None  # Entity arrays of that save
+        # Files of checkpoints this game wrote or loaded, deleted once no
+        # checkpoint needs them (the files of a save never loaded are kept)
+        self.committed_files = set()
+        # Whether the save on disk is one this game has not loaded or replaced
+        self.unloaded_save = (self.save_dir / MANIFEST).exists()
+
+        self.next_autosave = self.settings.autosave_interval
+
+        # --- Writer Thread ---
+        self.jobs = queue.Queue()
+        self.writer = None
+        self.error = None  # Why the last checkpoint failed to write, if it did
+
+    def get_files(self, manifest):
+        """
+        Returns the names of the data files a manifest references.
+        """
+        files = set(manifest["chunks"].values())
+        if manifest["entities"] is not None:
+            files.add(manifest["entities"])
+        return files
+
+    # --- Saving ---
+    def save(self):
+        """
+        Snapshots the game state and queues it to be written in the background.
+        """
+        self.jobs.put(self.snapshot())
+        self.unloaded_save = False
+        if self.writer is None or not self.writer.is_alive():
+            self.writer = threading.Thread(target=self.write_jobs, daemon=True)
+            self.writer.start()
+
+    def update(self, sim_time):
+        """
+        Saves when the autosave interval has passed.
+
+        :param sim_time: Simulation time in milliseconds.
+        """
+        # Never replace a save on disk the player did not load
+        if self.unloaded_save:
+            return
+        if self.settings.autosave_interval and sim_time >= self.next_autosave:
+            self.next_autosave = sim_time + self.settings.autosave_interval
+            self.save()
+
+    def snapshot(self):
+        """
+        Copies everything that changed since the last checkpoint.
+
+        :return: A job for the writer thread. It shares no data with the game.
+        """
+        game = self.game
+        tile_map = game.BG
+        self.checkpoint += 1
+        checkpoint = self.checkpoint
+
+        # --- Edited Chunks ---
+        chunks = {}
+        size = tile_map.chunk_tiles
+        for chunk_x, chunk_y in tile_map.edited_chunks:
+            name = f"chunk_{chunk_x}_{chunk_y}_{checkpoint}.npz"
+            chunks[name] = {
+                "tiles": np.array(
+                    tile_map.tile_map[
+                        chunk_y * size : (chunk_y + 1) * size,
+                        chunk_x * size : (chunk_x + 1) * size,
+                    ]
+                ),
+                "plots": game.farm.get_chunk_state((chunk_x, chunk_y)),
+            }
+            self.chunk_files[chunk_x, chunk_y] = name
+        tile_map.edited_chunks.clear()
+
+        # --- Entities ---
+        entities = {}
+        store = game.entities
+        arrays = {name: getattr(store, name)[: store.count] for name in ENTITY_FIELDS}
+        if self.saved_entities is None or any(
+            not np.array_equal(arrays[name], self.saved_entities[name])
+            for name in ENTITY_FIELDS
+        ):
+            self.saved_entities = {name: array.copy() for name, array in arrays.items()}
+            self.entity_file = f"entities_{checkpoint}.npz"
+            entities[self.entity_file] = self.saved_entities
+
+        manifest = {
+            "version": VERSION,
+            "checkpoint": checkpoint,
+            "sim_time": game.sim_time,
+            "tile_size": game.BG.size,
+            "player": {
+                "entity": game.player.entity,
+                "direction": game.player.direction_key,
+            },
+            "chunks": {f"{x},{y}": name for (x, y), name in self.chunk_files.items()},
+            "entities": self.entity_file,
+        }
+        files = self.get_files(manifest)
+        obsolete = self.committed_files - files
+        self.committed_files = files
+
+        return {
+            "manifest": manifest,
+            "arrays": {**chunks, **entities},
+            "obsolete": obsolete,
+        }
+
+    def write_jobs(self):
+        """
+        Writer thread loop. Jobs are written one at a time, in order.
+        """
+        while True:
+            job = self.jobs.get()
+            try:
+                self.write(job)
+                self.error = None
+            except Exception as error:
+                # Keep the thread alive; the previous checkpoint is still intact
+                self.error = error
+            finally:
+                self.jobs.task_done()
+
+    def write(self, job):
+        """
+        Writes one checkpoint: the new data files, then the manifest that makes
+        them current, then removes the files no checkpoint needs any more.
+        """
+        self.save_dir.mkdir(parents=True, exist_ok=True)
+        for name, arrays in job["arrays"].items():
+            write_atomic(
+                self.save_dir / name,
+                lambda save_file: np.savez(save_file, **arrays),
+            )
+
+        write_atomic(
+            self.save_dir / MANIFEST,
+            lambda save_file: save_file.write(json.dumps(job["manifest"]).encode()),
+        )
+
+        for name in job["obsolete"]:
+            (self.save_dir / name).unlink(missing_ok=True)
+
+    def wait(self):
+        """
+        Blocks until every queued save is on disk.
+        """
+        self.jobs.join()
+
+    # --- Loading ---
+    def load(self):
+        """
+        Restores the game from the latest checkpoint. Every file is read
+        before anything is changed, so a damaged save leaves the game as it
+        was.
+
+        :return: False if there is no save to load.
+        :raises ValueError: If the save cannot be read.
+        """
+        self.wait()
+        manifest = read_manifest(self.save_dir)
+        if manifest is None:
+            return False
+        chunks, arrays = self.read_checkpoint(manifest)
+
+        game = self.game
+        tile_map = game.BG
+        size = tile_map.chunk_tiles
+
+        # --- Tiles and Plots ---
+        # Start from the map file and put the edited chunks on top of it
+        game.load_tile_map()
+        tiles = np.array(game.tile_map) if chunks else game.tile_map
+        for (chunk_x, chunk_y), (chunk_tiles, _) in chunks.items():
+            height, width = chunk_tiles.shape
+            tiles[
+                chunk_y * size : chunk_y * size + height,
+                chunk_x * size : chunk_x * size + width,
+            ] = chunk_tiles
+        game.farm.clear()
+        for _, plots in chunks.values():
+            game.farm.load_chunk_state(plots)
+
+        game.tile_map = tiles
+        tile_map.load_map({**game.tile_layers, DEFAULT_LAYER: tiles})
+        tile_map.touch_chunks(chunks)  # They differ from the map file
+
+        # --- Entities ---
+        store = game.entities
+        if arrays is not None:
+            ratio = tile_map.size / manifest.get("tile_size", tile_map.size)
+            if ratio != 1:
+                for name in PIXEL_FIELDS:
+                    arrays[name] = arrays[name] * np.float32(ratio)
+            count = len(arrays["position"])
+            if count > store.capacity:
+                store.allocate(count)
+            store.count = count
+            for name, array in arrays.items():
+                getattr(store, name)[:count] = array
+            store.spatial_dirty = True
+            self.saved_entities = arrays
+        game.pathfinder.clear()  # Routes are not saved
+
+        # --- Player and Time ---
+        player = game.player
+        player.entity = manifest["player"]["entity"]
+        player.direction_key = manifest["player"]["direction"]
+        player.up = player.down = player.left = player.right = False
+        game.sim_time = manifest["sim_time"]
+        game.accumulator = 0.0
+        self.next_autosave = game.sim_time + self.settings.autosave_interval
+
+        # --- Checkpoint State ---
+        self.checkpoint = manifest["checkpoint"]
+        self.chunk_files = {
+            tuple(map(int, key.split(","))): name
+            for key, name in manifest["chunks"].items()
+        }
+        self.entity_file = manifest["entities"]
+        self.committed_files = self.get_files(manifest)
+        self.unloaded_save = False
+        self.remove_stray_files()
+
+        game.renderer.invalidate()
+        return True
+
+    def read_checkpoint(self, manifest):
+        """
+        Reads the data files of a checkpoint.
+
+        :return: Tuple ({chunk: (tiles, plots)}, entity arrays or None).
+        :raises ValueError: If the manifest or a file is missing or damaged.
+        """
+        try:
+            # Fields applied after the files; checked before anything changes
+            int(manifest["checkpoint"]), float(manifest["sim_time"])
+            int(manifest["player"]["entity"]), manifest["player"]["direction"]
+
+            chunks = {}
+            for key, name in manifest["chunks"].items():
+                chunk_x, chunk_y = map(int, key.split(","))
+                with np.load(self.save_dir / name) as data:
+                    chunks[chunk_x, chunk_y] = (data["tiles"], data["plots"])
+
+            arrays = None
+            if manifest["entities"] is not None:
+                with np.load(self.save_dir / manifest["entities"]) as data:
+                    arrays = {name: data[name] for name in ENTITY_FIELDS}
+        except (
+            OSError,
+            ValueError,
+            KeyError,
+            TypeError,
+            EOFError,
+            BadZipFile,
+        ) as error:
+            raise ValueError(
+                f"The save in {self.save_dir} is damaged: {error}"
+            ) from error
+        return chunks, arrays
+
+    def remove_stray_files(self):
+        """
+        Deletes data files left behind by a checkpoint that never committed
+        (numbered after the loaded one). Files of older checkpoints are kept:
+        they may belong to a save that was replaced without being loaded.
+        """
+        for path in self.save_dir.glob("*.npz*"):
+            number = path.name.split(".")[0].rsplit("_", 1)[-1]
+            if (
+                path.name not in self.committed_files
+                and number.isdigit()
+                and int(number) > self.checkpoint
+            ):
+                path.unlink()
@@ -1,75 +1,198 @@
-import pygame
-from pathlib import Path
-
-
-class Settings:
-    def __init__(self) -> None:
-        """
-        Initialize the game settings, including screen dimensions,
-        player attributes, and file paths.
-        """
-        self.game_name = "Stardew Valley 2.0"  # Game title
-        self.SCREEN_WIDTH = 800  # Screen width
-        self.SCREEN_HEIGHT = 600  # Screen height
-        self.BG = (50, 50, 50)  # Background color (RGB)
-        self.TILE_SIZE = 32  # Size of each tile in pixels
-
-        # Player settings
-        self.player_speed_pixels = 2  # Player speed in pixels
-        self.player_tile_speed = (
-            1  # Player speed in tiles per second (1 tile = 32 pixels)
-        )
-
-        # Movement and animation settings
-        self.movement_delay = 16  # Movement update delay in milliseconds
-        self.animation_delay = 125  # Animation frame delay in milliseconds
-
-        # Game's base directory for file paths
-        self.BASE_DIR = Path(__file__).resolve().parent
-
-        # Frames per second for the game loop
-        self.fps = 60
-
-        # Optional: Add more settings if needed (e.g., sound settings, difficulty, etc.)
-
-    def get_screen_size(self):
-        """
-        Returns the screen size as a tuple (width, height).
-        """
-        return self.SCREEN_WIDTH, self.SCREEN_HEIGHT
-
-    def get_background_color(self):
-        """
-        Returns the background color.
-        """
-        return self.BG
-
-    def get_tile_size(self):
-        """
-        Returns the size of a tile in the game.
-        """
-        return self.TILE_SIZE
-
-    def get_player_speed(self):
-        """
-        Returns the speed of the player in pixels.
-        """
-        return self.player_speed_pixels
-
-    def get_player_tile_speed(self):
-        """
-        Returns the player's speed in tiles per second.
-        """
-        return self.player_tile_speed
-
-    def get_movement_delay(self):
-        """
-        Returns the movement delay in milliseconds.
-        """
-        return self.movement_delay
-
-    def get_animation_delay(self):
-        """
-        Returns the animation frame delay in milliseconds.
-        """
-        return self.animation_delay
+import pygame
+from pathlib import Path
+
+
+class Settings:
+    def __init__(self) -> None:
+        """
+        Initialize the game settings, including screen dimensions,
+        player attributes, and file paths.
+        """
+        self.game_name = "Stardew Valley 2.0"  # Game title
+        self.SCREEN_WIDTH = 800  # Screen width
+        self.SCREEN_HEIGHT = 600  # Screen height
+        self.BG = (50, 50, 50)  # Background color (RGB)
+        self.TILE_SIZE = 32  # Size of each tile in pixels
+
+        # The world is drawn at the screen size divided by render_scale and
+        # every finished frame is scaled up to the window in one pass (change
+        # it with set_render_scale; 1 draws straight to the window)
+        self.render_scale = 1
+
+        # World rendering settings
+        self.CHUNK_TILES = 16  # Width/height of a pre-rendered map chunk in tiles
+        self.chunk_cache_budget = 24 * 1024 * 1024  # Max bytes of cached chunks
+        self.water_tile = 64  # Tile id of animated water
+        self.water_frame_delay = 250  # Milliseconds per water animation frame
+        self.solid_tiles = (self.water_tile,)  # Tile ids that nothing can walk onto
+        self.dirty_rect_rendering = False  # Only redraw what moved (see renderer.py)
+
+        # Player settings
+        self.player_speed_pixels = 2  # Player speed in pixels per simulation step
+        self.player_tile_speed = (
+            1  # Player speed in tiles per second (1 tile = 32 pixels)
+        )
+
+        # Animal settings
+        self.animal_count = 20  # Animals spawned at random spots on the map
+        self.cow_speed = 0.5  # Cow walking speed in pixels per simulation step
+        self.chicken_speed = 0.75  # Chicken walking speed in pixels per simulation step
+
+        # Pathfinding settings (see pathfinding.py)
+        self.path_budget = 500  # Cells searches may expand per simulation step
+        self.path_max_cells = 20_000  # Cells expanded before a goal is unreachable
+        self.path_cache_size = 1024  # Routes kept in the path cache
+        self.flow_field_radius = 64  # Tiles a flow field reaches from its goal
+        self.flow_field_cache = 8  # Flow fields kept
+
+        # Farming settings (times are in milliseconds of simulation time)
+        self.default_crop = "wheat"  # Crop planted on an empty plot
+        self.crop_stage_time = 20_000  # Time between growth stages of a watered crop
+        self.water_time = 60_000  # Time watered soil stays wet
+        self.wither_time = 60_000  # Time a dry, unripe crop survives
+
+        # Day and night (see lighting.py); times are in ms of simulation time
+        self.day_length = 600_000  # Length of a whole day
+        self.day_start = 0.4  # Time of day at the start (0 midnight, 0.5 noon)
+        self.light_buckets = 96  # Steps of the day at which the light changes
+        # Prop tile id -> (radius, color) of the light it gives off at night
+        self.prop_lights = {31: (160, (255, 190, 110))}  # Chicken house window
+
+        # Particles (see particles.py)
+        self.particle_budget = 25_000  # Max particles drawn per frame
+        self.particle_time_ms = 3.0  # Drawing particles slower shrinks the budget
+        self.footstep_dust = True  # Puffs of dust behind the walking player
+        self.rain_drops = 0  # Raindrops falling around the camera (0 = dry)
+        self.rain_capacity = 20_000  # Most raindrops at once
+
+        # Movement and animation settings
+        self.movement_delay = 16  # Movement update delay in milliseconds
+        self.animation_delay = 125  # Animation frame delay in milliseconds
+
+        # Game's base directory for file paths
+        self.BASE_DIR = Path(__file__).resolve().parent
+
+        # Sliced and scaled sprite frames are baked here after the first launch
+        self.use_sprite_cache = True
+        self.sprite_cache_dir = self.BASE_DIR / "cache" / "sprites"
+
+        # Sheets declared in addresses.py are loaded on demand (see assets.py)
+        self.season = "spring"  # Group of sheets loaded ahead of time
+        self.asset_scale = 2  # Pixel art sheets are drawn at this scale
+        self.asset_workers = 2  # Loader threads decoding sheets
+        self.asset_budget = 32 * 1024 * 1024  # Max bytes of loaded sheets
+
+        # Saves are written in the background (see save_system.py)
+        self.save_dir = self.BASE_DIR / "saves" / "slot1"
+        self.autosave_interval = 180_000  # Ms of simulation time (0 = off)
+
+        # Frame profiler (see profiler.py); F3 toggles it, F4 exports a profile
+        self.profiler_enabled = False  # Time the phases of every frame
+        self.profiler_overlay = False  # Show FPS and phase times on screen
+        self.profiler_frames = 600  # Frames kept in the ring buffer
+        self.spike_factor = 2.0  # Frames this much slower than average spike
+        self.spike_min_ms = 20  # Frames faster than this never count as spikes
+        self.profile_dir = self.BASE_DIR / "profiles"
+
+        # Input recording and replay (see replay.py and tools/replay.py)
+        self.seed = None  # Seed of everything random in the world (None = random)
+        self.record_input = False  # Log the input of every session to a file
+        self.recording_dir = self.BASE_DIR / "recordings"
+
+        # Co-op over the network (see coop.py and tools/coop.py)
+        self.coop_host = "127.0.0.1"
+        self.coop_port = 7777  # TCP port players join on; snapshots use UDP
+        self.coop_max_players = 8
+        self.coop_snapshot_interval = 3  # Simulation steps between snapshots
+        self.coop_interest_chunks = 1  # Chunks around a player's chunk it sees
+        self.coop_chunks_per_snapshot = 2  # Most edited chunks sent at once
+        self.coop_input_buffer = 4  # Inputs queued per player before dropping
+        self.coop_save_dir = self.BASE_DIR / "saves" / "coop"  # Server saves
+
+        # Frames per second for rendering (0 = uncapped)
+        self.fps = 60
+
+        # The simulation (input, movement, animation) runs on a fixed timestep
+        self.sim_rate = 60  # Simulation updates per second
+        self.sim_step_ms = 1000 / self.sim_rate  # Length of one update in ms
+        self.max_sim_steps = 5  # Max updates per rendered frame on slow machines
+
+        # Optional: Add more settings if needed (e.g., sound settings, difficulty, etc.)
+
+    def get_screen_size(self):
+        """
+        Returns the screen size as a tuple (width, height).
+        """
+        return self.SCREEN_WIDTH, self.SCREEN_HEIGHT
+
+    def get_render_size(self):
+        """
+        Returns the size of the surface the world is drawn on as a tuple
+        (width, height), before it is scaled up to the window.
+        """
+        return (
+            self.SCREEN_WIDTH // self.render_scale,
+            self.SCREEN_HEIGHT // self.render_scale,
+        )
+
+    def set_render_scale(self, scale):
+        """
+        Sets the factor every finished frame is scaled up by. The sheets and
+        tiles are scaled that much less at load, so the world is drawn with
+        scale * scale times fewer pixels per blit (2 draws the 16 px art at
+        its own size). Lengths in world pixels are converted too, so the
+        game plays the same at every scale.
+
+        :param scale: Integer that divides asset_scale * render_scale (the
+            window pixels per pixel of the art).
+        """
+        pixel_scale = self.asset_scale * self.render_scale
+        if scale < 1 or pixel_scale % scale:
+            raise ValueError(f"Render scale must divide {pixel_scale}, not {scale}")
+        ratio = self.render_scale / scale  # New world pixels per old one
+        self.asset_scale = pixel_scale // scale
+        self.TILE_SIZE = int(self.TILE_SIZE * ratio)
+        self.player_speed_pixels *= ratio
+        self.cow_speed *= ratio
+        self.chicken_speed *= ratio
+        self.prop_lights = {
+            tile_id: (int(radius * ratio), color)
+            for tile_id, (radius, color) in self.prop_lights.items()
+        }
+        self.render_scale = scale
+
+    def get_background_color(self):
+        """
+        Returns the background color.
+        """
+        return self.BG
+
+    def get_tile_size(self):
+        """
+        Returns the size of a tile in the game.
+        """
+        return self.TILE_SIZE
+
+    def get_player_speed(self):
+        """
+        Returns the speed of the player in pixels.
+        """
+        return self.player_speed_pixels
+
+    def get_player_tile_speed(self):
+        """
+        Returns the player's speed in tiles per second.
+        """
+        return self.player_tile_speed
+
+    def get_movement_delay(self):
+        """
+        Returns the movement delay in milliseconds.
+        """
+        return self.movement_delay
+
+    def get_animation_delay(self):
+        """
+        Returns the animation frame delay in milliseconds.
+        """
+        return self.animation_delay
@@ -0,0 +1,62 @@
+import numpy as np
+
+# Cell coordinates are packed into one integer key: column * KEY_STRIDE + row.
+# The offset keeps slightly negative cells (entities at the map edge) positive.
+KEY_STRIDE = 1 << 24
+KEY_OFFSET = 1 << 12
+
+
+class SpatialHash:
+    def __init__(self, cell_size) -> None:
+        """
+        Initializes the SpatialHash class, a uniform grid over the world that
+        finds the points inside a rect without looking at every point.
+
+        :param cell_size: Width and height of a grid cell in pixels.
+        """
+        self.cell_size = cell_size
+        self.keys = np.zeros(0, dtype=np.int64)  # Sorted cell key of every point
+        self.order = np.zeros(0, dtype=np.int64)  # Point id for every sorted key
+
+    def get_key(self, column, row):
+        """
+        Packs a cell column and row into a single key.
+        """
+        return (column + KEY_OFFSET) * KEY_STRIDE + (row + KEY_OFFSET)
+
+    def rebuild(self, points):
+        """
+        Rebuilds the grid from scratch in one vectorized pass.
+
+        :param points: (n, 2) array of world positions; the id of a point is
+                       its index in this array.
+        """
+        cells = np.floor_divide(points, self.cell_size).astype(np.int64)
+        keys = self.get_key(cells[:, 0], cells[:, 1])
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def query(self, rect):
+        """
+        Returns the ids of the points in every cell the rect touches. Points near
+        the rect may be included, callers filter them further if needed.
+
+        :param rect: A rect in world coordinates.
+        """
+        first_column = rect.left // self.cell_size
+        last_column = (rect.right - 1) // self.cell_size
+        first_row = rect.top // self.cell_size
+        last_row = (rect.bottom - 1) // self.cell_size
+
+        # The rows of one column have consecutive keys, so each column of the
+        # rect is a single slice of the sorted keys
+        found = []
+        for column in range(first_column, last_column + 1):
+            start = np.searchsorted(self.keys, self.get_key(column, first_row))
+            end = np.searchsorted(
+                self.keys, self.get_key(column, last_row), side="right"
+            )
+            if end > start:
+                found.append(self.order[start:end])
+
+        return np.concatenate(found) if found else self.order[:0]
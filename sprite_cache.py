@@ -0,0 +1,111 @@
+import hashlib
+import os
+import struct
+from pathlib import Path
+
+import pygame
+
+# --- Baked Sheet Layout ---
+# Header: magic, version, frame count, frame width and frame height.
+# Followed by the RGBA pixels of every frame, one after the other.
+MAGIC = b"SVSC"
+VERSION = 2
+HEADER = struct.Struct("<4sHIII")
+PIXEL_FORMAT = "RGBA"
+
+
+class SpriteCache:
+    def __init__(self, cache_dir) -> None:
+        """
+        Initializes the SpriteCache class that stores sliced and scaled sprite
+        frames on disk so later launches can skip decoding and slicing sheets.
+
+        :param cache_dir: Folder where the baked sheets are written.
+        """
+        self.cache_dir = Path(cache_dir)
+
+        # --- Statistics ---
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, sheet, grid, size, scale):
+        """
+        Builds the cache key of a sheet. The modification time of the source
+        image is part of the key, so editing a sheet invalidates its bake.
+        """
+        sheet = Path(sheet)
+        description = repr(
+            (str(sheet.resolve()), tuple(grid), size, scale, os.stat(sheet).st_mtime_ns)
+        )
+        return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+    def get_path(self, key):
+        """
+        Returns the file used to store the baked sheet with the given key.
+        """
+        return self.cache_dir / f"{key}.bin"
+
+    def load(self, sheet, grid, size, scale):
+        """
+        Loads the baked frames of a sheet with a single file read.
+
+        :return: Flat list of RGBA frame surfaces in row order (not converted
+            to the display format yet), or None on a miss.
+        """
+        path = self.get_path(self.make_key(sheet, grid, size, scale))
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+
+        if len(data) < HEADER.size:
+            self.misses += 1
+            return None
+
+        magic, version, count, width, height = HEADER.unpack_from(data)
+        frame_bytes = width * height * len(PIXEL_FORMAT)
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or len(data) != HEADER.size + count * frame_bytes
+        ):
+            self.misses += 1
+            return None
+
+        frames = []
+        for index in range(count):
+            start = HEADER.size + index * frame_bytes
+            frames.append(
+                pygame.image.frombytes(
+                    data[start : start + frame_bytes], (width, height), PIXEL_FORMAT
+                )
+            )
+
+        self.hits += 1
+        return frames
+
+    def store(self, sheet, grid, size, scale, frames):
+        """
+        Writes the frames of a sheet to the cache.
+
+        :param frames: Flat list of equally sized frame surfaces in row order.
+        """
+        width, height = frames[0].get_size()
+        path = self.get_path(self.make_key(sheet, grid, size, scale))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so a crash never leaves a broken bake
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as cache_file:
+            cache_file.write(HEADER.pack(MAGIC, VERSION, len(frames), width, height))
+            for frame in frames:
+                cache_file.write(pygame.image.tobytes(frame, PIXEL_FORMAT))
+        os.replace(temp_path, path)
+
+    def clear(self):
+        """
+        Deletes every baked sheet from the cache folder.
+        """
+        for path in self.cache_dir.glob("*.bin"):
+            path.unlink()
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+
+class SurfaceCache:
+    def __init__(self, budget_bytes, on_evict=None) -> None:
+        """
+        Initializes an LRU cache of surfaces bounded by a memory budget.
+
+        :param budget_bytes: Approximate number of pixel bytes the cache may hold.
+        :param on_evict: Optional callback called with the key of every entry
+                         evicted to stay within the budget.
+        """
+        self.budget_bytes = budget_bytes
+        self.on_evict = on_evict
+        self.used_bytes = 0
+        self.entries = OrderedDict()  # key -> (surface, size in bytes)
+
+        # --- Statistics ---
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        """
+        Returns the approximate memory used by the pixels of a surface.
+        """
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def get(self, key):
+        """
+        Returns the cached surface for key (marking it as recently used), or None.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key):
+        """
+        Returns the cached surface for key without touching the LRU order or
+        the statistics, or None.
+        """
+        entry = self.entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, surface, size=None):
+        """
+        Stores a surface under key and evicts the least recently used entries
+        until the cache fits in its budget again.
+
+        :param size: Bytes the entry counts for, by default those of the surface.
+        """
+        self.discard(key)
+        if size is None:
+            size = self.surface_bytes(surface)
+        self.entries[key] = (surface, size)
+        self.used_bytes += size
+
+        # Always keep the newest entry, even if it alone is over budget
+        while self.used_bytes > self.budget_bytes and len(self.entries) > 1:
+            old_key, (_, old_size) = self.entries.popitem(last=False)
+            self.used_bytes -= old_size
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(old_key)
+        return surface
+
+    def discard(self, key):
+        """
+        Removes key from the cache if present.
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.used_bytes -= entry[1]
+
+    def keys(self):
+        """
+        Returns the keys of every cached surface, least recently used first.
+        """
+        return list(self.entries)
+
+    def clear(self):
+        """
+        Removes every entry from the cache.
+        """
+        self.entries.clear()
+        self.used_bytes = 0
+
+    def get_stats(self):
+        """
+        Returns a dictionary with the cache counters.
+        """
+        return {
+            "entries": len(self.entries),
+            "used_bytes": self.used_bytes,
+            "budget_bytes": self.budget_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
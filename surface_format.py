@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+# --- Formats ---
+# How a sliced frame is stored, from the fastest to blit to the slowest
+OPAQUE = 0  # Every pixel covers what is below: plain copy, no blending
+COLORKEY = 1  # Pixels are fully opaque or fully clear: RLE-encoded colorkey
+ALPHA = 2  # Some pixels are see-through: per-pixel alpha blending
+FORMAT_NAMES = ("opaque", "colorkey", "alpha")
+
+
+def classify_surface(surface):
+    """
+    Returns the cheapest format that draws a surface exactly as it is.
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return OPAQUE if surface.get_colorkey() is None else COLORKEY
+
+    alpha = pygame.surfarray.pixels_alpha(surface)
+    if alpha.min() == 255:
+        return OPAQUE
+    if np.all((alpha == 0) | (alpha == 255)):
+        return COLORKEY
+    return ALPHA
+
+
+def find_colorkey(surface):
+    """
+    Returns a color that no opaque pixel of a surface uses. Black is
+    preferred: tinting a surface by multiplying its colors keeps it black.
+    """
+    visible = pygame.surfarray.pixels_alpha(surface) > 0
+    rgb = pygame.surfarray.pixels3d(surface)[visible].astype(np.uint32)
+    used = np.unique((rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2])
+    # The smallest packed color missing from the sorted list of used ones
+    gaps = np.flatnonzero(used != np.arange(len(used)))
+    free = int(gaps[0]) if len(gaps) else len(used)
+    return free >> 16, (free >> 8) & 255, free & 255
+
+
+def optimize_surface(surface):
+    """
+    Converts a surface with per-pixel alpha to the display format of its
+    cheapest format. The display mode must be set.
+
+    :return: Tuple (converted surface, format).
+    """
+    kind = classify_surface(surface)
+    if kind == OPAQUE:
+        return surface.convert(), kind
+    if kind == ALPHA:
+        return surface.convert_alpha(), kind
+
+    # The clear pixels keep the key color, the opaque ones are copied exactly
+    key = find_colorkey(surface)
+    converted = pygame.Surface(surface.get_size()).convert()
+    converted.fill(key)
+    converted.blit(surface, (0, 0))
+    converted.set_colorkey(key, pygame.RLEACCEL)
+    return converted, kind
+
+
+def tint_surface(surface, color):
+    """
+    Returns a copy of a surface with its colors multiplied by color. The
+    transparent pixels of a colorkey surface stay transparent.
+    """
+    tinted = surface.copy()
+    tinted.fill(color, special_flags=pygame.BLEND_RGB_MULT)
+    key = surface.get_colorkey()
+    if key is not None:
+        # Multiplying changed the key color too; paint it back
+        clear = pygame.mask.from_surface(surface)
+        clear.invert()
+        clear.to_surface(tinted, setcolor=key, unsetcolor=None)
+    return tinted
+
+
+class SurfaceFormats:
+    def __init__(self) -> None:
+        """
+        Initializes the SurfaceFormats class that converts the frames sliced
+        from every sheet to their cheapest format (see optimize_surface) and
+        counts how many frames of each sheet ended up in each format.
+        """
+        self.sheets = {}  # Sheet name -> frames per format (opaque, colorkey, alpha)
+
+    def optimize(self, name, surfaces):
+        """
+        Converts the frames of a sheet and records their formats.
+
+        :param name: Name of the sheet (a path is reduced to its file name).
+        :return: List of the converted frames, in the same order.
+        """
+        if isinstance(name, Path):
+            name = name.stem
+        counts = [0] * len(FORMAT_NAMES)
+        converted = []
+        for surface in surfaces:
+            surface, kind = optimize_surface(surface)
+            counts[kind] += 1
+            converted.append(surface)
+        self.sheets[name] = counts
+        return converted
+
+    def get_totals(self):
+        """
+        Returns the number of frames in each format over every sheet.
+        """
+        totals = [0] * len(FORMAT_NAMES)
+        for counts in self.sheets.values():
+            totals = [total + count for total, count in zip(totals, counts)]
+        return totals
+
+    def get_report(self):
+        """
+        Returns the statistics as lines of text: one row per sheet with its
+        frames per format, then the totals.
+        """
+        width = max((len(name) for name in self.sheets), default=5)
+        header = "".join(f"{name:>10}" for name in FORMAT_NAMES)
+        lines = [f"{'sheet':<{width}}{header}"]
+        for name, counts in sorted(self.sheets.items()):
+            lines.append(f"{name:<{width}}" + "".join(f"{c:>10}" for c in counts))
+        totals = "".join(f"{count:>10}" for count in self.get_totals())
+        lines.append(f"{'total':<{width}}{totals}")
+        return lines
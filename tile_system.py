@@ -1,103 +1,1067 @@
-import pygame
-from addresses import Tile_dir
-import json
-
-
-class TileSet:
-    def __init__(self, sheet, grid, size=None) -> None:
-        """
-        Initializes the TileSet class to extract tiles from a sprite sheet.
-
-        :param sheet: Path to the spritesheet image.
-        :param grid: Tuple (columns, rows) that defines the grid size.
-        :param size: Optional tile size. If not provided, it will be automatically calculated.
-        """
-        self.sheet = pygame.image.load(str(sheet)).convert_alpha()
-
-        # If size is not provided, calculate it based on the sprite sheet size and grid.
-        if size is None:
-            self.columns, self.rows = grid
-            self.width = self.sheet.get_width() / self.columns
-            self.height = self.sheet.get_height() / self.rows
-        else:
-            self.width, self.height = size
-            self.columns, self.rows = grid
-
-        self.tiles = []
-        self.extract_tiles()
-
-    def extract_tiles(self):
-        """
-        Extracts all tiles from the spritesheet and stores them in the self.tiles list.
-        """
-        for row in range(self.rows):
-            for column in range(self.columns):
-                # Create a new surface to hold the tile (width x height)
-                tile = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-
-                # Blit the specific portion of the sheet to the tile surface
-                tile.blit(
-                    self.sheet,
-                    (0, 0),  # Blit to the top-left corner of the tile surface
-                    (column * self.width, row * self.height, self.width, self.height),
-                )
-
-                tile.set_colorkey(
-                    (0, 0, 0)
-                )  # Assuming black (0,0,0) is the transparent color.
-                self.tiles.append(tile)  # Add the extracted tile to the list
-
-    def get_tile(self, index):
-        """
-        Get a specific tile by index.
-
-        :param index: Index of the tile in the list.
-        :return: The tile surface at the specified index.
-        """
-        return self.tiles[index] if 0 <= index < len(self.tiles) else None
-
-
-class Tile_Map:
-    def __init__(self, game) -> None:
-        """
-        Initializes the Tile_Map class that manages tile-related operations.
-        """
-        self.tiles = Tile_dir(game)
-
-        # Initialize tile set using the grass texture
-        self.tile_set = TileSet(self.tiles.grass, (7, 7))
-
-        self.game = game
-        self.size = game.settings.TILE_SIZE
-
-        # Calculate the number of tiles that fit on the screen
-        self.tile_x = game.settings.SCREEN_WIDTH / self.size
-        self.tile_y = game.settings.SCREEN_HEIGHT / self.size
-
-    def create_tile_screen(self, tile_map):
-        """
-        Creates a surface for the entire tile map to be rendered on the screen.
-
-        :param tile_map: The 2D list representing the tile map.
-        :return: The surface containing the rendered tile map.
-        """
-        tile_screen = pygame.Surface(
-            (self.game.settings.SCREEN_WIDTH, self.game.settings.SCREEN_HEIGHT)
-        )
-
-        # Iterate through the tile map and render each tile at the appropriate position
-        for y, row in enumerate(tile_map):
-            for x, tile in enumerate(row):
-                tile_screen.blit(
-                    self.tile_set.get_tile(tile), (x * self.size, y * self.size)
-                )
-
-        return tile_screen
-
-    def draw_tile_screen(self, game):
-        """
-        Draws the tile map onto the game screen.
-
-        :param game: The game instance to render the tile map.
-        """
-        game.screen.blit(game.tile_BG, (0, 0))
+import numpy as np
+import pygame
+from addresses import Tile_dir
+from map_format import DECOR_LAYER, DEFAULT_LAYER, OVERHEAD_LAYER, PROPS_LAYER
+from surface_cache import SurfaceCache
+from surface_format import SurfaceFormats
+import json
+
+# --- Tile Attributes ---
+# Bit flags stored per tile id and, after loading a map, per map cell
+SOLID = 1  # Nothing can walk onto the tile
+TILE_ID_LIMIT = 1 << 16  # Tile ids are stored as uint16
+
+# Keeps boxes that end exactly on a tile border out of the next tile
+EPSILON = 1e-6
+
+# --- Layers ---
+# Named layers of a map, bottom to top. Ground and decor are baked into the
+# cached chunks, props (trees, rocks, buildings) are drawn Y-sorted together
+# with the entities and overhead tiles (roofs) are drawn over everything.
+GROUND, DECOR, PROPS, OVERHEAD = DEFAULT_LAYER, DECOR_LAYER, PROPS_LAYER, OVERHEAD_LAYER
+# Tiles of the layers besides the ground as (asset sheet, frame): tile id n is
+# entry n - 1, id 0 leaves the cell empty
+LAYER_TILES = {
+    DECOR: [("decor_small", frame) for frame in range(16)]
+    + [("decor", frame) for frame in range(20)]
+    + [("tufts", frame) for frame in range(24)]
+    + [("paths", frame) for frame in range(16)],
+    PROPS: [("trees", frame) for frame in range(4)]
+    + [("bushes", frame) for frame in range(2)]
+    + [("rocks", frame) for frame in range(24)]
+    + [("chicken_house", 0)]
+    + [("fences", frame) for frame in range(16)],
+    OVERHEAD: [("house_roof", frame) for frame in range(35)],
+}
+# Cells a prop sprite may stick out of its own cell (props stand on the
+# bottom center of their cell and grow upwards)
+PROP_REACH = 3
+
+
+class TileSet:
+    def __init__(self, sheet, grid, size=None, cache=None, formats=None) -> None:
+        """
+        Initializes the TileSet class to extract tiles from a sprite sheet.
+
+        :param sheet: Path to the spritesheet image.
+        :param grid: Tuple (columns, rows) that defines the grid size.
+        :param size: Optional tile size. If not provided, it will be automatically calculated.
+        :param cache: Optional SpriteCache holding tiles baked on an earlier launch.
+        :param formats: Optional SurfaceFormats counting the formats of the tiles.
+        """
+        self.columns, self.rows = grid
+        self.tiles = []
+
+        # Reuse the tiles baked on an earlier launch when possible
+        baked = cache.load(sheet, grid, size, 1) if cache is not None else None
+        if baked is not None:
+            self.sheet = None
+            self.width, self.height = size or baked[0].get_size()
+            self.tiles = baked
+        else:
+            self.sheet = pygame.image.load(str(sheet)).convert_alpha()
+
+            # If size is not provided, calculate it based on the sprite sheet size and grid.
+            if size is None:
+                self.width = self.sheet.get_width() // self.columns
+                self.height = self.sheet.get_height() // self.rows
+            else:
+                self.width, self.height = size
+
+            self.extract_tiles()
+            if cache is not None:
+                cache.store(sheet, grid, size, 1, self.tiles)
+
+        # Opaque tiles (like grass) are drawn without any blending
+        self.tiles = (formats or SurfaceFormats()).optimize(sheet, self.tiles)
+
+    def extract_tiles(self):
+        """
+        Extracts all tiles from the spritesheet and stores them in the self.tiles list.
+        """
+        for row in range(self.rows):
+            for column in range(self.columns):
+                # Create a new surface to hold the tile (width x height)
+                tile = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+
+                # Blit the specific portion of the sheet to the tile surface
+                tile.blit(
+                    self.sheet,
+                    (0, 0),  # Blit to the top-left corner of the tile surface
+                    (column * self.width, row * self.height, self.width, self.height),
+                )
+                self.tiles.append(tile)  # Add the extracted tile to the list
+
+    def get_tile(self, index):
+        """
+        Get a specific tile by index.
+
+        :param index: Index of the tile in the list.
+        :return: The tile surface at the specified index.
+        """
+        return self.tiles[index] if 0 <= index < len(self.tiles) else None
+
+
+class Tile_Map:
+    def __init__(self, game) -> None:
+        """
+        Initializes the Tile_Map class that manages tile-related operations.
+        """
+        self.tiles = Tile_dir(game)
+
+        # Initialize tile set using the grass texture
+        self.tile_set = TileSet(
+            self.tiles.grass,
+            (7, 7),
+            cache=game.sprite_cache,
+            formats=game.surface_formats,
+        )
+
+        self.game = game
+        self.size = game.settings.TILE_SIZE
+        # Number of neighbouring cells a tile bigger than a cell draws into
+        self.tile_spill = max(
+            -(-self.tile_set.width // self.size) - 1,
+            -(-self.tile_set.height // self.size) - 1,
+            0,
+        )
+
+        # Calculate the number of tiles that fit on the screen
+        render_width, render_height = game.settings.get_render_size()
+        self.tile_x = render_width / self.size
+        self.tile_y = render_height / self.size
+
+        # --- Chunk Settings ---
+        self.chunk_tiles = game.settings.CHUNK_TILES  # Chunk width/height in tiles
+        self.chunk_size = self.chunk_tiles * self.size  # Chunk width/height in pixels
+        self.chunk_cache = SurfaceCache(
+            game.settings.chunk_cache_budget, on_evict=self.forget_chunk
+        )
+
+        # --- Overlays ---
+        # Objects drawn into the chunks on top of the tiles (e.g. farm plots).
+        # Each needs draw_chunk(chunk, chunk_x, chunk_y),
+        # draw_cell(chunk, tile_x, tile_y, position) and load_map().
+        self.overlays = []
+
+        # --- Animated Tiles ---
+        # Every tile id in here animates; all cells of one id share a clock
+        self.animated_tiles = {}  # tile id -> (frames, frame delay in ms)
+        self.animation_frames = {}  # tile id -> frame currently shown
+        self.chunk_animated_cells = {}  # chunk -> {tile id: [(x, y) in chunk]}
+        self.chunk_animation_frames = {}  # chunk -> {tile id: frame drawn}
+        self.add_animated_tile(
+            game.settings.water_tile,
+            TileSet(
+                self.tiles.water,
+                (4, 1),
+                cache=game.sprite_cache,
+                formats=game.surface_formats,
+            ).tiles,
+            game.settings.water_frame_delay,
+        )
+
+        # --- Tile Attributes ---
+        self.tile_attributes = np.zeros(TILE_ID_LIMIT, dtype=np.uint8)
+        self.tile_attributes[list(game.settings.solid_tiles)] |= SOLID
+
+        # --- Layers ---
+        self.chunk_props = {}  # chunk -> props of the chunk, see get_chunk_props
+        self.empty_overhead = set()  # Chunks without overhead tiles
+        self.pending_sheets = set()  # Sheets of baked tiles that were not loaded
+        game.assets.listeners.append(self.on_sheet_ready)
+
+        # --- Map Data ---
+        self.layers = {}  # Layer name -> 2D array of tile ids
+        self.tile_map = []
+        self.attributes = np.zeros((0, 0), dtype=np.uint8)  # Flags of every cell
+        self.map_width = self.map_height = 0  # Map size in tiles
+        self.pixel_width = self.pixel_height = 0  # Map size in pixels
+        self.edited_chunks = set()  # Chunks changed since the last save
+        # Chunk -> number of the edit that last changed its ground tiles or
+        # plots; co-op servers send chunks whose number a client lacks
+        self.chunk_revisions = {}
+        self.revision = 0  # Number of the last edit
+
+        # --- Edits ---
+        # Cells whose tiles changed are re-baked into the cached chunks once
+        # per frame, however often they changed (see flush_edits)
+        self.pending_cells = set()  # (tile_x, tile_y) of edited ground and decor
+        self.pending_overhead = set()  # (tile_x, tile_y) of edited overhead tiles
+        self.pending_animated = set()  # Chunks whose animated cells may have moved
+        # Called as listener(layer, first_x, first_y, last_x, last_y) with the
+        # inclusive block of cells edited on a layer, right after the edit (the
+        # whole map and layer None when a map is loaded)
+        self.edit_listeners = []
+
+    def load_map(self, tile_map):
+        """
+        Sets the tile map to render. Chunks are rendered lazily when first drawn.
+
+        :param tile_map: 2D array (or nested list) of ground tile ids, or a
+                         dictionary of named layers (see LAYER_TILES) that
+                         includes the ground. Memory-mapped arrays are not
+                         copied, only the chunks drawn are read.
+        """
+        layers = tile_map if isinstance(tile_map, dict) else {GROUND: tile_map}
+        self.layers = {name: np.asanyarray(tiles) for name, tiles in layers.items()}
+        self.tile_map = self.layers[GROUND]
+        self.map_height, self.map_width = self.tile_map.shape
+        self.pixel_width = self.map_width * self.size
+        self.pixel_height = self.map_height * self.size
+        self.clear_chunks()
+        self.chunk_props.clear()
+        self.edited_chunks.clear()
+        self.pending_cells.clear()
+        self.pending_overhead.clear()
+        self.pending_animated.clear()
+
+        # Look up the attributes of every cell once instead of on every query.
+        # Nothing walks through props either.
+        self.attributes = self.tile_attributes[self.tile_map]
+        if PROPS in self.layers:
+            self.attributes[self.layers[PROPS] != 0] |= SOLID
+
+        for overlay in self.overlays:
+            overlay.load_map()
+        self.notify_edit(None, 0, 0, self.map_width - 1, self.map_height - 1)
+
+    # --- Editing ---
+    def set_tile(self, tile_x, tile_y, tile_id, layer=GROUND):
+        """
+        Changes the tile of a single cell, see set_tiles.
+        """
+        self.set_tiles((tile_x,), (tile_y,), tile_id, layer)
+
+    def set_tiles(self, tile_xs, tile_ys, tile_ids, layer=GROUND):
+        """
+        Changes the tiles of many cells of a layer at once (hoeing, laying
+        paths, building fences...). The tile data and collisions change right
+        away; the cached chunks only get the edited cells re-blitted, once per
+        frame in flush_edits. Cells outside the map, or already holding their
+        new tile, are skipped.
+
+        :param tile_xs: Columns of the cells.
+        :param tile_ys: Rows of the cells, in the same order.
+        :param tile_ids: New tile id of every cell, or one id for all of them.
+        :param layer: Layer to edit (see LAYER_TILES); it is created if the
+                      map has none.
+        """
+        tile_xs = np.asarray(tile_xs, dtype=np.int64).ravel()
+        tile_ys = np.asarray(tile_ys, dtype=np.int64).ravel()
+        tile_ids = np.broadcast_to(tile_ids, tile_xs.shape)
+        inside = (
+            (tile_xs >= 0)
+            & (tile_ys >= 0)
+            & (tile_xs < self.map_width)
+            & (tile_ys < self.map_height)
+        )
+        tile_xs, tile_ys, tile_ids = tile_xs[inside], tile_ys[inside], tile_ids[inside]
+
+        tiles = self.get_editable_layer(layer)
+        changed = tiles[tile_ys, tile_xs] != tile_ids
+        if not changed.any():
+            return
+        tile_xs, tile_ys = tile_xs[changed], tile_ys[changed]
+        tiles[tile_ys, tile_xs] = tile_ids[changed]
+
+        keys = set(
+            zip(
+                (tile_xs // self.chunk_tiles).tolist(),
+                (tile_ys // self.chunk_tiles).tolist(),
+            )
+        )
+        cells = zip(tile_xs.tolist(), tile_ys.tolist())
+        if layer == GROUND:
+            self.edited_chunks |= keys  # Saves keep the ground layer
+            self.touch_chunks(keys)
+            self.pending_animated |= keys
+            self.pending_cells.update(cells)
+        elif layer == DECOR:
+            self.pending_cells.update(cells)
+        elif layer == PROPS:
+            # Props are drawn as sprites, the renderer sees them move
+            for key in keys:
+                self.chunk_props.pop(key, None)
+        elif layer == OVERHEAD:
+            self.pending_overhead.update(cells)
+
+        if layer in (GROUND, PROPS):
+            self.refresh_attributes(tile_xs, tile_ys)
+        self.notify_edit(
+            layer, tile_xs.min(), tile_ys.min(), tile_xs.max(), tile_ys.max()
+        )
+
+    def get_editable_layer(self, layer):
+        """
+        Returns the tiles of a layer, ready to be written to. A read-only
+        memory-mapped layer is mapped again copy-on-write, so only the pages
+        that are edited get copied into memory.
+        """
+        tiles = self.layers.get(layer)
+        if tiles is None:
+            tiles = np.zeros(self.tile_map.shape, dtype=self.tile_map.dtype)
+        elif not tiles.flags.writeable:
+            if isinstance(tiles, np.memmap) and tiles.filename is not None:
+                tiles = np.memmap(
+                    tiles.filename,
+                    dtype=tiles.dtype,
+                    mode="c",
+                    offset=tiles.offset,
+                    shape=tiles.shape,
+                )
+            else:
+                tiles = np.array(tiles)
+        else:
+            return tiles
+
+        self.layers[layer] = tiles
+        if layer == GROUND:
+            self.tile_map = tiles
+        return tiles
+
+    def refresh_attributes(self, tile_xs, tile_ys):
+        """
+        Looks up the attributes of cells again after their tiles changed.
+        """
+        attributes = self.tile_attributes[self.tile_map[tile_ys, tile_xs]]
+        if PROPS in self.layers:
+            attributes[self.layers[PROPS][tile_ys, tile_xs] != 0] |= SOLID
+        self.attributes[tile_ys, tile_xs] = attributes
+
+    def touch_chunks(self, keys):
+        """
+        Gives chunks a new revision number: their ground tiles or plots
+        changed (see coop.py).
+        """
+        self.revision += 1
+        for key in keys:
+            self.chunk_revisions[key] = self.revision
+
+    def notify_edit(self, layer, first_x, first_y, last_x, last_y):
+        for listener in self.edit_listeners:
+            listener(layer, int(first_x), int(first_y), int(last_x), int(last_y))
+
+    def flush_edits(self):
+        """
+        Re-blits the cells edited since the last frame into the cached chunks
+        and marks them dirty for the renderer. Called once per frame before
+        drawing. Chunks that are not cached pick the edits up when rendered.
+        """
+        if self.pending_cells:
+            self.flush_cells(self.pending_cells, self.redraw_cells, spill=True)
+        if self.pending_overhead:
+            self.flush_cells(self.pending_overhead, self.redraw_overhead_cells)
+        self.pending_animated.clear()
+
+    def flush_cells(self, pending, redraw, spill=False):
+        """
+        Redraws pending cells chunk by chunk with redraw(key, cells), and
+        marks the block they cover in every chunk dirty.
+
+        :param spill: Whether the tiles may be bigger than a cell, so that the
+                      cells they spill into (right and below) are redrawn too.
+        """
+        cells_by_chunk = {}
+        for tile_x, tile_y in pending:
+            key = (tile_x // self.chunk_tiles, tile_y // self.chunk_tiles)
+            cells_by_chunk.setdefault(key, set()).add(
+                (
+                    (tile_x % self.chunk_tiles) * self.size,
+                    (tile_y % self.chunk_tiles) * self.size,
+                )
+            )
+        pending.clear()
+
+        reach = range(0, self.tile_spill * self.size + 1, self.size)
+        for key, cells in cells_by_chunk.items():
+            if spill and self.tile_spill:
+                left, top = key[0] * self.chunk_size, key[1] * self.chunk_size
+                width = min(self.chunk_size, self.pixel_width - left)
+                height = min(self.chunk_size, self.pixel_height - top)
+                cells = {
+                    (x + dx, y + dy)
+                    for x, y in cells
+                    for dx in reach
+                    for dy in reach
+                    if x + dx < width and y + dy < height
+                }
+            redraw(key, cells)
+
+            xs, ys = zip(*cells)
+            self.game.renderer.mark_dirty(
+                (
+                    key[0] * self.chunk_size + min(xs),
+                    key[1] * self.chunk_size + min(ys),
+                    max(xs) - min(xs) + self.size,
+                    max(ys) - min(ys) + self.size,
+                )
+            )
+
+    def redraw_cells(self, key, cells):
+        """
+        Redraws cells of a cached chunk (ground, decor and overlays).
+
+        :param cells: (x, y) positions of the cells inside the chunk in pixels.
+        """
+        chunk = self.chunk_cache.peek(key)
+        if chunk is None:
+            return
+        if key in self.pending_animated:
+            self.index_animated_cells(key)
+        for x, y in cells:
+            self.draw_cell(chunk, key, x, y)
+
+    def redraw_overhead_cells(self, key, cells):
+        """
+        Redraws cells of the cached overhead tiles of a chunk.
+        """
+        overhead_key = (OVERHEAD,) + key
+        self.empty_overhead.discard(overhead_key)  # It may not be empty anymore
+        chunk = self.chunk_cache.peek(overhead_key)
+        if chunk is None:
+            return
+
+        first_x = key[0] * self.chunk_tiles
+        first_y = key[1] * self.chunk_tiles
+        for x, y in cells:
+            chunk.fill((0, 0, 0, 0), (x, y, self.size, self.size))
+            tile_id = int(
+                self.layers[OVERHEAD][
+                    first_y + y // self.size, first_x + x // self.size
+                ]
+            )
+            tile = self.get_layer_tile(OVERHEAD, tile_id) if tile_id else None
+            if tile is not None:
+                chunk.blit(tile, (x, y))
+
+    # --- Tile Queries ---
+    def world_to_tile(self, x, y):
+        """
+        Returns the (column, row) of the tile containing a world position.
+        """
+        return int(x // self.size), int(y // self.size)
+
+    def in_bounds(self, tile_x, tile_y):
+        """
+        Returns whether a tile position is inside the map.
+        """
+        return 0 <= tile_x < self.map_width and 0 <= tile_y < self.map_height
+
+    def is_solid(self, tile_x, tile_y):
+        """
+        Returns whether a tile blocks movement. Everything outside the map does.
+        """
+        if not self.in_bounds(tile_x, tile_y):
+            return True
+        return bool(self.attributes[tile_y, tile_x] & SOLID)
+
+    def is_area_solid(self, first_x, first_y, last_x, last_y):
+        """
+        Returns whether any tile in an inclusive block of tiles blocks movement.
+        """
+        if (
+            first_x < 0
+            or first_y < 0
+            or last_x >= self.map_width
+            or last_y >= self.map_height
+        ):
+            return True
+        area = self.attributes[first_y : last_y + 1, first_x : last_x + 1]
+        return bool((area & SOLID).any())
+
+    def is_solid_at(self, xs, ys):
+        """
+        Vectorized solidity lookup for many world positions at once.
+
+        :param xs: Array of world x positions.
+        :param ys: Array of world y positions.
+        :return: Boolean array, True where the position is solid or off the map.
+        """
+        tile_x = np.floor_divide(xs, self.size).astype(np.int64)
+        tile_y = np.floor_divide(ys, self.size).astype(np.int64)
+        solid = (
+            (tile_x < 0)
+            | (tile_y < 0)
+            | (tile_x >= self.map_width)
+            | (tile_y >= self.map_height)
+        )
+        inside = ~solid
+        solid[inside] = (self.attributes[tile_y[inside], tile_x[inside]] & SOLID) != 0
+        return solid
+
+    # --- Collision ---
+    def move_and_collide(self, box, dx, dy):
+        """
+        Sweeps a box through the map, first along x then along y, and stops it
+        at the first solid tile (or the map edge) in its way. Only the tiles
+        between the box and its destination are checked.
+
+        :param box: Tuple (left, top, width, height) in world pixels.
+        :param dx: Wanted movement along x.
+        :param dy: Wanted movement along y.
+        :return: Tuple (dx, dy) of the movement that is actually possible.
+        """
+        left, top, width, height = box
+        dx = self.sweep(left, top, width, height, dx, horizontal=True)
+        dy = self.sweep(top, left + dx, height, width, dy, horizontal=False)
+        return dx, dy
+
+    def sweep(self, start, side, length, thickness, delta, horizontal):
+        """
+        Sweeps a box along one axis.
+
+        :param start: Position of the box on the moving axis.
+        :param side: Position of the box on the other axis.
+        :param length: Size of the box on the moving axis.
+        :param thickness: Size of the box on the other axis.
+        :param delta: Wanted movement along the moving axis.
+        :param horizontal: Whether the moving axis is x.
+        :return: The movement that is actually possible.
+        """
+        if not delta:
+            return delta
+
+        # Tiles the box covers on the other axis
+        first_side = int(side // self.size)
+        last_side = int((side + thickness - EPSILON) // self.size)
+
+        if delta > 0:
+            edge = start + length
+            first = int((edge - EPSILON) // self.size) + 1
+            last = int((edge + delta - EPSILON) // self.size)
+            lines = range(first, last + 1)
+        else:
+            edge = start
+            first = int(edge // self.size) - 1
+            last = int((edge + delta) // self.size)
+            lines = range(first, last - 1, -1)
+
+        for line in lines:
+            if horizontal:
+                blocked = self.is_area_solid(line, first_side, line, last_side)
+            else:
+                blocked = self.is_area_solid(first_side, line, last_side, line)
+            if blocked:
+                # Stop flush against the blocking tile
+                if delta > 0:
+                    return line * self.size - edge
+                return (line + 1) * self.size - edge
+
+        return delta
+
+    # --- Animated Tiles ---
+    def add_animated_tile(self, tile_id, frames, frame_delay):
+        """
+        Registers an animated tile type.
+
+        :param tile_id: Tile id used for the type in the map.
+        :param frames: Surfaces of the animation, scaled to the tile size here.
+        :param frame_delay: Milliseconds between animation frames.
+        """
+        frames = [
+            pygame.transform.scale(frame, (self.size, self.size)) for frame in frames
+        ]
+        self.animated_tiles[tile_id] = (frames, frame_delay)
+        self.animation_frames[tile_id] = 0
+
+    def get_tile_surface(self, tile_id):
+        """
+        Returns the surface to draw for a tile id (the current frame for
+        animated tiles), or None for unknown ids.
+        """
+        animated = self.animated_tiles.get(tile_id)
+        if animated is not None:
+            return animated[0][self.animation_frames[tile_id]]
+        return self.tile_set.get_tile(tile_id)
+
+    def update_animated_tiles(self, sim_time, view=None):
+        """
+        Advances the shared clock of every animated tile type. Cached chunks are
+        not touched here; each chunk catches up the next time it is drawn, so
+        off-screen animated tiles cost nothing.
+
+        :param sim_time: Simulation time in milliseconds.
+        :param view: Optional camera viewport (world rect). The cells of changed
+                     types inside it are reported to the renderer as dirty.
+        """
+        changed = []
+        for tile_id, (frames, frame_delay) in self.animated_tiles.items():
+            frame = int(sim_time // frame_delay) % len(frames)
+            if frame != self.animation_frames[tile_id]:
+                self.animation_frames[tile_id] = frame
+                changed.append(tile_id)
+
+        if not changed or view is None:
+            return
+
+        for chunk_x, chunk_y in self.get_visible_chunks(view):
+            cells = self.chunk_animated_cells.get((chunk_x, chunk_y), {})
+            origin_x, origin_y = chunk_x * self.chunk_size, chunk_y * self.chunk_size
+            for tile_id in changed:
+                for x, y in cells.get(tile_id, ()):
+                    self.game.renderer.mark_dirty(
+                        (origin_x + x, origin_y + y, self.size, self.size)
+                    )
+
+    def refresh_animated_cells(self, key, chunk):
+        """
+        Re-blits the animated cells of a cached chunk whose frame is out of date.
+        """
+        cells = self.chunk_animated_cells.get(key)
+        if not cells:
+            return
+
+        drawn = self.chunk_animation_frames[key]
+        for tile_id, positions in cells.items():
+            frame = self.animation_frames[tile_id]
+            if drawn[tile_id] == frame:
+                continue
+            drawn[tile_id] = frame
+            for x, y in positions:
+                self.draw_cell(chunk, key, x, y)
+
+    def index_animated_cells(self, key):
+        """
+        Finds the animated cells of a cached chunk again after its ground
+        tiles were edited. Cells drawn before keep their recorded frame.
+        """
+        first_x = key[0] * self.chunk_tiles
+        first_y = key[1] * self.chunk_tiles
+        region = self.tile_map[
+            first_y : first_y + self.chunk_tiles, first_x : first_x + self.chunk_tiles
+        ]
+        animated = {}
+        for tile_id in self.animated_tiles:
+            rows, columns = np.nonzero(region == tile_id)
+            if len(rows):
+                animated[tile_id] = list(
+                    zip((columns * self.size).tolist(), (rows * self.size).tolist())
+                )
+
+        if animated:
+            drawn = self.chunk_animation_frames.get(key, {})
+            self.chunk_animated_cells[key] = animated
+            self.chunk_animation_frames[key] = {
+                tile_id: drawn.get(tile_id, self.animation_frames[tile_id])
+                for tile_id in animated
+            }
+        else:
+            self.forget_chunk(key)
+
+    def forget_chunk(self, key):
+        """
+        Drops the bookkeeping of a chunk that left the chunk cache.
+        """
+        self.chunk_animated_cells.pop(key, None)
+        self.chunk_animation_frames.pop(key, None)
+
+    # --- Overlays ---
+    def draw_cell_overlays(self, chunk, key, x, y):
+        """
+        Draws the overlays of one cell of a chunk.
+
+        :param key: (chunk_x, chunk_y) of the chunk.
+        :param x: X position of the cell inside the chunk in pixels.
+        :param y: Y position of the cell inside the chunk in pixels.
+        """
+        tile_x = key[0] * self.chunk_tiles + x // self.size
+        tile_y = key[1] * self.chunk_tiles + y // self.size
+        for overlay in self.overlays:
+            overlay.draw_cell(chunk, tile_x, tile_y, (x, y))
+
+    def redraw_cell(self, tile_x, tile_y):
+        """
+        Queues a single cell (tile and overlays) to be redrawn in its cached
+        chunk by flush_edits, and flags the chunk as edited for the next save
+        and for co-op clients.
+        """
+        key = (tile_x // self.chunk_tiles, tile_y // self.chunk_tiles)
+        self.edited_chunks.add(key)
+        self.touch_chunks((key,))
+        self.pending_cells.add((tile_x, tile_y))
+
+    def draw_cell(self, chunk, key, x, y):
+        """
+        Redraws one cell of a rendered chunk exactly as render_chunk drew it.
+        Tiles can be bigger than a cell, so the tiles above and to the left of
+        the cell that spill into it are drawn again (clipped to the cell).
+
+        :param key: (chunk_x, chunk_y) of the chunk.
+        :param x: X position of the cell inside the chunk in pixels.
+        :param y: Y position of the cell inside the chunk in pixels.
+        """
+        cell = pygame.Rect(x, y, self.size, self.size)
+        chunk.set_clip(cell)
+        chunk.fill(self.game.settings.BG, cell)
+
+        column, row = x // self.size, y // self.size
+        first_x = key[0] * self.chunk_tiles
+        first_y = key[1] * self.chunk_tiles
+        for y_cell in range(max(row - self.tile_spill, 0), row + 1):
+            for x_cell in range(max(column - self.tile_spill, 0), column + 1):
+                tile_id = int(self.tile_map[first_y + y_cell, first_x + x_cell])
+                tile = self.get_tile_surface(tile_id)
+                if tile is not None:
+                    chunk.blit(tile, (x_cell * self.size, y_cell * self.size))
+
+        if DECOR in self.layers:
+            tile_id = int(self.layers[DECOR][first_y + row, first_x + column])
+            if tile_id:
+                self.draw_decor(chunk, tile_id, x, y)
+
+        self.draw_cell_overlays(chunk, key, x, y)
+        chunk.set_clip(None)
+
+    # --- Chunks ---
+    def render_chunk(self, chunk_x, chunk_y):
+        """
+        Renders a single chunk of the tile map onto its own surface.
+
+        :param chunk_x: Column of the chunk.
+        :param chunk_y: Row of the chunk.
+        :return: The surface containing the rendered chunk.
+        """
+        first_x = chunk_x * self.chunk_tiles
+        first_y = chunk_y * self.chunk_tiles
+        last_x = min(first_x + self.chunk_tiles, self.map_width)
+        last_y = min(first_y + self.chunk_tiles, self.map_height)
+
+        # Chunks on the right and bottom edges may be smaller than the rest
+        chunk = pygame.Surface(
+            ((last_x - first_x) * self.size, (last_y - first_y) * self.size)
+        )
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert()
+
+        # Converting the slice to lists avoids slow per-tile NumPy indexing
+        region = self.tile_map[first_y:last_y, first_x:last_x].tolist()
+        animated = {}
+        for y, row in enumerate(region):
+            for x, tile_id in enumerate(row):
+                tile = self.get_tile_surface(tile_id)
+                if tile is not None:
+                    chunk.blit(tile, (x * self.size, y * self.size))
+                if tile_id in self.animated_tiles:
+                    animated.setdefault(tile_id, []).append(
+                        (x * self.size, y * self.size)
+                    )
+
+        if DECOR in self.layers:
+            region = self.layers[DECOR][first_y:last_y, first_x:last_x].tolist()
+            for y, row in enumerate(region):
+                for x, tile_id in enumerate(row):
+                    if tile_id:
+                        self.draw_decor(chunk, tile_id, x * self.size, y * self.size)
+
+        for overlay in self.overlays:
+            overlay.draw_chunk(chunk, chunk_x, chunk_y)
+
+        # Remember the animated cells so only they are redrawn later
+        key = (chunk_x, chunk_y)
+        if animated:
+            self.chunk_animated_cells[key] = animated
+            self.chunk_animation_frames[key] = {
+                tile_id: self.animation_frames[tile_id] for tile_id in animated
+            }
+        else:
+            self.forget_chunk(key)
+
+        return chunk
+
+    def get_chunk(self, chunk_x, chunk_y):
+        """
+        Returns the rendered chunk, rendering and caching it on a cache miss.
+        """
+        key = (chunk_x, chunk_y)
+        chunk = self.chunk_cache.get(key)
+        if chunk is None:
+            chunk = self.chunk_cache.put(key, self.render_chunk(chunk_x, chunk_y))
+        else:
+            self.refresh_animated_cells(key, chunk)
+        return chunk
+
+    def clear_chunks(self):
+        """
+        Drops every rendered chunk, they are rendered again when next drawn.
+        """
+        self.chunk_cache.clear()
+        self.chunk_animated_cells.clear()
+        self.chunk_animation_frames.clear()
+        self.empty_overhead.clear()
+
+    def get_visible_chunks(self, rect):
+        """
+        Yields the (chunk_x, chunk_y) coordinates of every chunk overlapping rect.
+
+        :param rect: A rect in world coordinates (usually the camera viewport).
+        """
+        first_x = max(0, rect.left // self.chunk_size)
+        first_y = max(0, rect.top // self.chunk_size)
+        last_x = min(
+            (self.pixel_width - 1) // self.chunk_size,
+            (rect.right - 1) // self.chunk_size,
+        )
+        last_y = min(
+            (self.pixel_height - 1) // self.chunk_size,
+            (rect.bottom - 1) // self.chunk_size,
+        )
+
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                yield chunk_x, chunk_y
+
+    # --- Layer Tiles ---
+    def get_layer_tile(self, layer, tile_id):
+        """
+        Returns the surface of a tile of a layer besides the ground, or None
+        while its sheet is loading. Chunks baked without it are rendered again
+        once the sheet is ready (see on_sheet_ready).
+        """
+        sheet, frame = LAYER_TILES[layer][tile_id - 1]
+        frames = self.game.assets.get_frames(sheet)
+        if frames is None:
+            self.pending_sheets.add(sheet)
+            return None
+        return frames[frame]
+
+    def on_sheet_ready(self, name):
+        """
+        Asset listener: re-bakes the chunks when a sheet they missed arrives.
+        """
+        if name in self.pending_sheets:
+            self.pending_sheets.discard(name)
+            self.clear_chunks()
+            self.game.renderer.invalidate()
+
+    def draw_decor(self, chunk, tile_id, x, y):
+        """
+        Draws a decor tile centered in a cell of a chunk (decor can be smaller
+        than a cell).
+
+        :param x: X position of the cell inside the chunk in pixels.
+        :param y: Y position of the cell inside the chunk in pixels.
+        """
+        tile = self.get_layer_tile(DECOR, tile_id)
+        if tile is not None:
+            half = self.size // 2
+            chunk.blit(tile, tile.get_rect(center=(x + half, y + half)))
+
+    # --- Props ---
+    def get_chunk_props(self, chunk_x, chunk_y):
+        """
+        Returns the props of a chunk ordered by the bottom of their cell, where
+        they stand on the ground. Props never move, so this is done once per
+        chunk.
+
+        :return: Tuple of arrays (bottoms in world pixels, columns, rows, tile ids).
+        """
+        key = (chunk_x, chunk_y)
+        props = self.chunk_props.get(key)
+        if props is None:
+            first_x = chunk_x * self.chunk_tiles
+            first_y = chunk_y * self.chunk_tiles
+            region = self.layers[PROPS][
+                first_y : first_y + self.chunk_tiles,
+                first_x : first_x + self.chunk_tiles,
+            ]
+            # nonzero walks the cells row by row, so they come out sorted
+            rows, columns = np.nonzero(region)
+            tile_ids = region[rows, columns]
+            rows += first_y
+            columns += first_x
+            props = ((rows + 1) * self.size, columns, rows, tile_ids)
+            self.chunk_props[key] = props
+        return props
+
+    def get_visible_props(self, view):
+        """
+        Returns the props that may overlap a rect, ordered by the bottom of
+        their cell.
+
+        :param view: A rect in world coordinates (usually the camera viewport).
+        :return: Tuple of arrays (bottoms in world pixels, columns, rows, tile ids).
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if PROPS not in self.layers:
+            return empty, empty, empty, empty
+
+        reach = PROP_REACH * self.size
+        area = pygame.Rect(view).inflate(reach * 2, reach * 2)
+        chunks = [self.get_chunk_props(*key) for key in self.get_visible_chunks(area)]
+        if not chunks:
+            return empty, empty, empty, empty
+        bottoms, columns, rows, tile_ids = (
+            np.concatenate(part) for part in zip(*chunks)
+        )
+
+        left = columns * self.size
+        inside = (
+            (left + self.size + reach > view.left)
+            & (left - reach < view.right)
+            & (bottoms > view.top)
+            & (bottoms - self.size - reach < view.bottom)
+        )
+        # Each chunk is a sorted run, which the stable sort merges in linear time
+        order = np.argsort(bottoms[inside], kind="stable")
+        return tuple(
+            array[inside][order] for array in (bottoms, columns, rows, tile_ids)
+        )
+
+    def get_prop_sprites(self, columns, rows, tile_ids):
+        """
+        Returns the sprite of every prop with its world position, standing on
+        the bottom center of its cell. Props of sheets still loading are drawn
+        as the asset manager's placeholder.
+
+        :return: List of (surface, (x, y)).
+        """
+        assets = self.game.assets
+        tiles = LAYER_TILES[PROPS]
+        sprites = []
+        for column, row, tile_id in zip(
+            columns.tolist(), rows.tolist(), tile_ids.tolist()
+        ):
+            surface = assets.get_frame(*tiles[tile_id - 1])
+            width, height = surface.get_size()
+            sprites.append(
+                (
+                    surface,
+                    (
+                        column * self.size + (self.size - width) // 2,
+                        (row + 1) * self.size - height,
+                    ),
+                )
+            )
+        return sprites
+
+    # --- Overhead ---
+    def render_overhead(self, chunk_x, chunk_y):
+        """
+        Renders the overhead tiles of a chunk onto a transparent surface.
+
+        :return: The surface, or None if the chunk has no overhead tiles.
+        """
+        first_x = chunk_x * self.chunk_tiles
+        first_y = chunk_y * self.chunk_tiles
+        last_x = min(first_x + self.chunk_tiles, self.map_width)
+        last_y = min(first_y + self.chunk_tiles, self.map_height)
+        region = self.layers[OVERHEAD][first_y:last_y, first_x:last_x]
+        if not region.any():
+            return None
+
+        chunk = pygame.Surface(
+            ((last_x - first_x) * self.size, (last_y - first_y) * self.size),
+            pygame.SRCALPHA,
+        )
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert_alpha()
+
+        for y, row in enumerate(region.tolist()):
+            for x, tile_id in enumerate(row):
+                if tile_id:
+                    tile = self.get_layer_tile(OVERHEAD, tile_id)
+                    if tile is not None:
+                        chunk.blit(tile, (x * self.size, y * self.size))
+        return chunk
+
+    def get_overhead(self, chunk_x, chunk_y):
+        """
+        Returns the rendered overhead tiles of a chunk, or None if it has none.
+        They share the budget of the chunk cache.
+        """
+        key = (OVERHEAD, chunk_x, chunk_y)
+        if key in self.empty_overhead:
+            return None
+
+        chunk = self.chunk_cache.get(key)
+        if chunk is None:
+            chunk = self.render_overhead(chunk_x, chunk_y)
+            if chunk is None:
+                self.empty_overhead.add(key)
+                return None
+            self.chunk_cache.put(key, chunk)
+        return chunk
+
+    def draw_overhead(self, game, area=None):
+        """
+        Draws the overhead tiles inside the camera viewport, on top of the
+        sprites.
+
+        :param game: The game instance to render the tiles.
+        :param area: Optional screen rect to restrict drawing to.
+        """
+        if OVERHEAD not in self.layers:
+            return
+
+        view = game.camera.get_rect()
+        if area is not None:
+            game.screen.set_clip(area)
+            view = pygame.Rect(
+                game.camera.x + area.x, game.camera.y + area.y, area.w, area.h
+            )
+
+        for chunk_x, chunk_y in self.get_visible_chunks(view):
+            chunk = self.get_overhead(chunk_x, chunk_y)
+            if chunk is not None:
+                game.screen.blit(
+                    chunk,
+                    game.camera.apply(
+                        chunk_x * self.chunk_size, chunk_y * self.chunk_size
+                    ),
+                )
+
+        if area is not None:
+            game.screen.set_clip(None)
+
+    def create_tile_screen(self, tile_map):
+        """
+        Creates a surface for the entire tile map in one piece.
+        Only meant for small maps and tools; the game itself draws chunks.
+
+        :param tile_map: The 2D list representing the tile map.
+        :return: The surface containing the rendered tile map.
+        """
+        tile_screen = pygame.Surface(
+            (len(tile_map[0]) * self.size, len(tile_map) * self.size)
+        )
+
+        # Iterate through the tile map and render each tile at the appropriate position
+        for y, row in enumerate(tile_map):
+            for x, tile_id in enumerate(row):
+                tile = self.get_tile_surface(tile_id)
+                if tile is not None:
+                    tile_screen.blit(tile, (x * self.size, y * self.size))
+
+        return tile_screen
+
+    def draw_tile_screen(self, game, area=None):
+        """
+        Draws the chunks of the tile map that are inside the camera viewport.
+
+        :param game: The game instance to render the tile map.
+        :param area: Optional screen rect to restrict drawing to. Only the
+                     chunks overlapping it are drawn.
+        """
+        view = game.camera.get_rect()
+        if area is not None:
+            game.screen.set_clip(area)
+            view = pygame.Rect(
+                game.camera.x + area.x, game.camera.y + area.y, area.w, area.h
+            )
+
+        # Maps smaller than the screen leave part of the viewport uncovered
+        if (
+            self.pixel_width < game.camera.width
+            or self.pixel_height < game.camera.height
+        ):
+            game.screen.fill(game.settings.BG, area)
+
+        for chunk_x, chunk_y in self.get_visible_chunks(view):
+            game.screen.blit(
+                self.get_chunk(chunk_x, chunk_y),
+                game.camera.apply(chunk_x * self.chunk_size, chunk_y * self.chunk_size),
+            )
+
+        if area is not None:
+            game.screen.set_clip(None)
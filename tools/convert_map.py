@@ -0,0 +1,31 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from map_format import read_json_map, read_map, write_json_map, write_map
+
+parser = argparse.ArgumentParser(
+    description="Convert tile maps between the JSON and binary (.bin) formats."
+)
+parser.add_argument("source", type=Path, help="Map to read (.json or .bin)")
+parser.add_argument("destination", type=Path, help="Map to write (.json or .bin)")
+args = parser.parse_args()
+
+# Pick the reader and writer from the file extensions
+if args.source.suffix == ".bin":
+    layers = read_map(args.source)
+else:
+    layers = read_json_map(args.source)
+
+if args.destination.suffix == ".bin":
+    write_map(args.destination, layers)
+else:
+    write_json_map(args.destination, layers)
+
+height, width = next(iter(layers.values())).shape
+print(
+    f"Converted {len(layers)} layer(s) of {width}x{height} tiles to {args.destination}"
+)
@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+parser = argparse.ArgumentParser(
+    description="Play co-op on one machine: run a server that simulates the "
+    "world, then join it with game windows or with headless bots that walk "
+    "around and farm at random (see coop.py)."
+)
+commands = parser.add_subparsers(dest="command", required=True)
+server_parser = commands.add_parser("server", help="Run a headless server")
+server_parser.add_argument(
+    "--load", action="store_true", help="Continue the last co-op save"
+)
+server_parser.add_argument(
+    "--report", type=float, default=5.0, help="Seconds between statistics lines"
+)
+client_parser = commands.add_parser("client", help="Join a server with a window")
+client_parser.add_argument(
+    "--render-scale", type=int, default=1, help="Render scale of the window"
+)
+bots_parser = commands.add_parser("bots", help="Join a server with headless bots")
+bots_parser.add_argument("--count", type=int, default=8, help="Number of bots")
+bots_parser.add_argument(
+    "--seconds", type=float, default=20.0, help="How long the bots play"
+)
+bots_parser.add_argument(
+    "--serve", action="store_true", help="Run the server in this process too"
+)
+for command in (server_parser, client_parser, bots_parser):
+    command.add_argument("--host", help="Address of the server")
+    command.add_argument("--port", type=int, help="Port of the server")
+args = parser.parse_args()
+
+# Only game clients open a window
+if args.command != "client":
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(BASE_DIR))
+
+from coop import CoopClient, CoopConnection, CoopServer
+from entities import DOWN, LEFT, RIGHT, UP
+from player import DOWN_KEY, LEFT_KEY, RIGHT_KEY, UP_KEY, USE, WATER
+from settings import Settings
+
+settings = Settings()
+host = args.host or settings.coop_host
+port = args.port or settings.coop_port
+
+# Keys held to walk in every direction
+WALKS = {DOWN: DOWN_KEY, UP: UP_KEY, LEFT: LEFT_KEY, RIGHT: RIGHT_KEY}
+
+
+class Bot(CoopConnection):
+    def __init__(self, seed) -> None:
+        """
+        Initializes the Bot class, a client without a game that walks in a
+        random direction for a while, then stops and farms for a moment.
+        """
+        super().__init__()
+        self.random = random.Random(seed)
+        self.direction = DOWN
+        self.keys = 0
+        self.steps_left = 0  # Steps until the bot picks what to do next
+        self.entities_seen = 0
+
+    def next_input(self):
+        """
+        Returns the bot's input for the next step.
+        """
+        actions = 0
+        self.steps_left -= 1
+        if self.steps_left <= 0:
+            self.steps_left = self.random.randint(30, 120)
+            if self.keys or self.random.random() < 0.3:
+                self.keys = 0
+                actions = self.random.choice((USE, WATER))
+            else:
+                self.direction = self.random.choice(list(WALKS))
+                self.keys = WALKS[self.direction]
+        return self.keys, self.direction, actions
+
+    def on_snapshot(self, snapshot):
+        self.entities_seen += len(snapshot.entities)
+
+
+def make_server():
+    """
+    Builds a headless game and a server for it.
+    """
+    from main import StardewValley2
+
+    settings.save_dir = settings.coop_save_dir
+    settings.fps = 0
+    game = StardewValley2(settings)
+    if args.command == "server" and args.load:
+        try:
+            if not game.save_system.load():
+                sys.exit(f"No co-op save in {settings.save_dir}")
+        except ValueError as error:
+            sys.exit(f"Could not load the co-op save: {error}")
+    return CoopServer(game)
+
+
+async def report(server, interval):
+    """
+    Prints the server's statistics every interval seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        print(server.get_report())
+
+
+async def run_server():
+    server = make_server()
+    print(f"Serving on {host}:{port}")
+    reporter = asyncio.create_task(report(server, args.report))
+    await server.run(host, port)
+    reporter.cancel()
+
+
+async def run_bots():
+    """
+    Joins the server with every bot and plays at the simulation rate.
+    """
+    if args.serve:
+        server = make_server()
+        serving = asyncio.create_task(server.run(host, port))
+        reporter = asyncio.create_task(report(server, 5.0))
+        await asyncio.sleep(0.5)  # Until it listens
+
+    bots = []
+    for seed in range(args.count):
+        bot = Bot(seed)
+        try:
+            await bot.connect(host, port)
+        except ConnectionError as error:
+            print(f"Bot {seed} could not join: {error}")
+            break
+        bots.append(bot)
+    print(f"{len(bots)} bots joined {host}:{port}")
+
+    loop = asyncio.get_running_loop()
+    step = settings.sim_step_ms / 1000
+    start = next_step = loop.time()
+    while loop.time() - start < args.seconds:
+        for bot in bots:
+            if bot.connected:
+                bot.send_input(*bot.next_input())
+        next_step += step
+        await asyncio.sleep(max(next_step - loop.time(), 0))
+    elapsed = loop.time() - start
+
+    for number, bot in enumerate(bots):
+        snapshots = max(bot.snapshots_received, 1)
+        print(
+            f"bot {number}: {bot.snapshots_received} snapshots, "
+            f"{bot.bytes_received / snapshots:.0f} bytes and "
+            f"{bot.entities_seen / snapshots:.1f} entities each, "
+            f"{bot.bytes_received / elapsed / 1024:.1f} KiB/s, "
+            f"{len(bot.inputs)} inputs waiting"
+        )
+        bot.close()
+    if args.serve:
+        await asyncio.sleep(0.1)  # Let the server end the sessions
+        reporter.cancel()
+        serving.cancel()
+
+
+def run_client():
+    from main import StardewValley2
+
+    # The client's own saves and recordings would not match the server's world
+    settings.set_render_scale(args.render_scale)
+    settings.autosave_interval = 0
+    settings.record_input = False
+    settings.save_dir = Path(tempfile.mkdtemp(prefix="coop-")) / "slot1"
+    game = StardewValley2(settings)
+    client = CoopClient(game)
+    try:
+        asyncio.run(client.run(host, port))
+        print("The server closed the session")
+    except ConnectionError as error:
+        sys.exit(f"Could not join {host}:{port}: {error}")
+    finally:
+        game.assets.shutdown()
+
+
+if args.command == "server":
+    asyncio.run(run_server())
+elif args.command == "bots":
+    asyncio.run(run_bots())
+else:
+    run_client()
@@ -1,26 +1,39 @@
-import random
-
-# Set the dimensions of the tilemap to cover the 800x600 screen
-num_columns = 23
-num_rows = 25
-
-# Maximum tile value
-max_tile_value = 49
-
-# Generate the tilemap array with random values from 0 to 15
-tilemap = [
-    [random.randint(0, max_tile_value) for _ in range(num_columns)]
-    for _ in range(num_rows)
-]
-
-import json
-
-# Assuming the tilemap is already generated
-tilemap = [[random.randint(0, 15) for _ in range(25)] for _ in range(19)]
-
-# Open the file in write mode
-with open("tile_map.json", "w") as f:
-    # Write the tilemap to the JSON file
-    json.dump({"tilemap": tilemap}, f)
-
-print("Tilemap saved to tile_map.json")
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from map_format import write_json_map, write_map_bands
+from map_generator import LAYERS, MapGenerator
+
+parser = argparse.ArgumentParser(
+    description="Generate a tile map from a seed. Binary (.bin) maps are "
+    "streamed to disk chunk by chunk, so they can be as big as the disk allows."
+)
+parser.add_argument("destination", type=Path, help="Map to write (.json or .bin)")
+parser.add_argument("--width", type=int, default=25, help="Map width in tiles")
+parser.add_argument("--height", type=int, default=19, help="Map height in tiles")
+parser.add_argument("--seed", type=int, default=0, help="Seed of the world")
+parser.add_argument(
+    "--chunk-size", type=int, default=256, help="Tiles per generated chunk side"
+)
+args = parser.parse_args()
+
+generator = MapGenerator(args.seed)
+
+start = time.perf_counter()
+if args.destination.suffix == ".bin":
+    bands = generator.generate_bands(args.width, args.height, args.chunk_size)
+    write_map_bands(args.destination, list(LAYERS), args.width, args.height, bands)
+else:
+    # The JSON format holds the whole map at once, only use it for small maps
+    layers = generator.generate_chunk(0, 0, args.width, args.height)
+    write_json_map(args.destination, layers)
+
+print(
+    f"Generated a {args.width}x{args.height} map with seed {args.seed} "
+    f"in {time.perf_counter() - start:.1f} s to {args.destination}"
+)
@@ -0,0 +1,97 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+parser = argparse.ArgumentParser(
+    description="Replay an input recording (record one by setting "
+    "Settings.record_input) on the same simulation steps and frames, to "
+    "reproduce a performance problem and check a fix for it."
+)
+parser.add_argument("recording", type=Path, help="Recording to replay (.rec)")
+parser.add_argument(
+    "--headless", action="store_true", help="Run without opening a window"
+)
+parser.add_argument(
+    "--no-render",
+    action="store_true",
+    help="Only run the simulation, as fast as possible (implies --headless)",
+)
+parser.add_argument(
+    "--realtime", action="store_true", help="Cap rendering at the game's FPS"
+)
+parser.add_argument(
+    "--profile", action="store_true", help="Export a frame profile at the end"
+)
+args = parser.parse_args()
+
+# Must be set before pygame opens a window
+if args.headless or args.no_render:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(BASE_DIR))
+
+from main import StardewValley2
+from replay import InputReplay
+from settings import Settings
+
+try:
+    replay = InputReplay(args.recording)
+except ValueError as error:
+    sys.exit(f"Could not read the recording: {error}")
+settings = Settings()
+if replay.sim_rate != settings.sim_rate:
+    sys.exit(f"Recorded at {replay.sim_rate} steps per second, not {settings.sim_rate}")
+
+# Same world and save as the recording; keep the replay away from the real
+# saves. Autosaves stay on: F9 loads the latest one, as when recording.
+settings.seed = replay.seed
+settings.record_input = False
+settings.save_dir = Path(tempfile.mkdtemp(prefix="replay-")) / "slot1"
+if replay.save_dir is not None:
+    shutil.copytree(replay.save_dir, settings.save_dir)
+settings.profiler_enabled = args.profile
+if not args.realtime:
+    settings.fps = 0
+
+game = StardewValley2(settings)
+game.replay = replay
+
+start = time.perf_counter()
+if args.no_render:
+    replay.simulate(game)
+    elapsed = time.perf_counter() - start
+    print(
+        f"Simulated {game.sim_steps} steps in {elapsed:.2f} s "
+        f"({game.sim_steps / settings.sim_rate / max(elapsed, 1e-9):.1f}x real time)"
+    )
+else:
+    frame_times = []
+    while replay.frame < len(replay.frames):
+        frame_start = time.perf_counter()
+        game.run_frame()
+        frame_times.append((time.perf_counter() - frame_start) * 1000)
+    elapsed = time.perf_counter() - start
+    frame_times.sort()
+    print(
+        f"Replayed {len(frame_times)} frames ({game.sim_steps} steps) in "
+        f"{elapsed:.2f} s: p50 {statistics.median(frame_times):.2f} ms, "
+        f"p99 {frame_times[int(len(frame_times) * 0.99)]:.2f} ms, "
+        f"max {frame_times[-1]:.2f} ms"
+    )
+    if args.profile:
+        print(f"{len(game.profiler.spikes)} spikes, profile written to")
+        print(*game.profiler.export(), sep="\n")
+
+matches = replay.check(game)
+if matches is not None:
+    print("Final state matches the recording" if matches else "Final state DIFFERS")
+game.assets.shutdown()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(BASE_DIR))
+
+
+def time_startup():
+    """
+    Builds the game once in this process and returns how long it took.
+    Module imports are left out, they cost the same with or without a cache.
+    """
+    from main import StardewValley2
+
+    start = time.perf_counter()
+    StardewValley2()
+    return time.perf_counter() - start
+
+
+def run_child(env):
+    """
+    Starts the game in a fresh process (so nothing is cached in memory)
+    and returns its startup time in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, __file__, "--child"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+parser = argparse.ArgumentParser(
+    description="Compare cold (no sprite cache) and warm game startup times."
+)
+parser.add_argument("--runs", type=int, default=5, help="Warm starts to average")
+parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+if args.child:
+    print(time_startup())
+    sys.exit()
+
+from settings import Settings
+from sprite_cache import SpriteCache
+
+# Run without opening a window
+env = dict(os.environ, SDL_VIDEODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+
+# Cold start: empty sprite cache, every sheet is decoded and sliced
+SpriteCache(Settings().sprite_cache_dir).clear()
+cold = run_child(env)
+
+# Warm starts: every sheet comes from the baked cache
+warm = [run_child(env) for _ in range(args.runs)]
+warm_mean = statistics.mean(warm)
+
+print(f"Cold start:            {cold * 1000:8.1f} ms")
+print(f"Warm start (mean of {args.runs}): {warm_mean * 1000:8.1f} ms")
+print(f"Warm start (best):     {min(warm) * 1000:8.1f} ms")
+print(f"Speedup:               {cold / warm_mean:8.2f}x")
@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+parser = argparse.ArgumentParser(
+    description="Load every sprite sheet and report how many of its frames "
+    "are drawn as opaque, colorkey or alpha surfaces (see surface_format.py)."
+)
+parser.add_argument(
+    "--render-scale", type=int, default=1, help="Render scale to load the sheets at"
+)
+args = parser.parse_args()
+
+# Run without opening a window
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# Make the game modules importable when running from the tools folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import StardewValley2
+from settings import Settings
+
+settings = Settings()
+settings.set_render_scale(args.render_scale)
+game = StardewValley2(settings)
+
+# The asset manager only loads sheets once they are used
+for name in game.tile_directory.sheets:
+    game.assets.request(name)
+game.assets.wait()
+game.assets.shutdown()
+
+print(*game.surface_formats.get_report(), sep="\n")